@@ -1,8 +1,12 @@
+import argparse
 import os
 import sys
 from pathlib import Path
+from typing import Optional, cast
 
 import ingenialogger
+from ingeniamotion import MotionController
+from PySide6.QtCore import QTimer
 from PySide6.QtGui import QIcon
 from PySide6.QtQml import QQmlApplicationEngine
 from PySide6.QtQuick import QQuickView
@@ -13,15 +17,48 @@ from PySide6.QtWidgets import QApplication
 import k2basecamp.resources  # noqa: F401
 from k2basecamp.controllers.bootloader_controller import BootloaderController
 from k2basecamp.controllers.connection_controller import ConnectionController
+from k2basecamp.models.base_model import DEFAULT_NUMBER_OF_DRIVES
 from k2basecamp.services.motion_controller_service import MotionControllerService
-from k2basecamp.utils.enums import Drive
+from k2basecamp.services.simulated_motion_controller import SimulatedMotionController
+from k2basecamp.utils.types import simulation_settings
+
+METRICS_EXPORT_INTERVAL_MS = 5000
+# Node / slave ID of the first simulated drive, the rest follow it.
+FIRST_SIMULATED_NODE_ID = 31
 
 if __name__ == "__main__":
     # Init the logger util.
     ingenialogger.configure_logger(level=ingenialogger.LoggingLevel.INFO)
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--simulation",
+        action="store_true",
+        help="Use simulated drives instead of real ones.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help=(
+            "Export the task metrics to this file periodically, in the Prometheus "
+            "text format."
+        ),
+    )
+    parser.add_argument(
+        "--drives",
+        type=int,
+        default=DEFAULT_NUMBER_OF_DRIVES,
+        help=(
+            "Number of drives of the collection. The views show the first two."
+            f" Defaults to {DEFAULT_NUMBER_OF_DRIVES}."
+        ),
+    )
+    # The remaining arguments are for Qt.
+    args, qt_args = parser.parse_known_args()
+    if args.drives < 1:
+        parser.error("--drives must be 1 or higher.")
+
     # Create the application.
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setWindowIcon(
         QIcon(
             os.fspath(
@@ -36,8 +73,17 @@ if __name__ == "__main__":
     engine = QQmlApplicationEngine()
 
     # Init the controllers and make them availble to our .qml files.
-    mcs = MotionControllerService()
-    connection_controller = ConnectionController(mcs)
+    mc: Optional[MotionController] = None
+    if args.simulation:
+        node_ids = list(
+            range(FIRST_SIMULATED_NODE_ID, FIRST_SIMULATED_NODE_ID + args.drives)
+        )
+        mc = cast(
+            MotionController,
+            SimulatedMotionController(simulation_settings(node_ids=node_ids)),
+        )
+    mcs = MotionControllerService(mc)
+    connection_controller = ConnectionController(mcs, number_of_drives=args.drives)
     bootloader_controller = BootloaderController(mcs)
     engine.setInitialProperties(
         {
@@ -46,6 +92,13 @@ if __name__ == "__main__":
         }
     )
 
+    if args.metrics_file is not None:
+        metrics_timer = QTimer()
+        metrics_timer.timeout.connect(
+            lambda: mcs.task_metrics.export(args.metrics_file)
+        )
+        metrics_timer.start(METRICS_EXPORT_INTERVAL_MS)
+
     engine.load(qml_file)
     if not engine.rootObjects():
         sys.exit(-1)
@@ -53,6 +106,9 @@ if __name__ == "__main__":
     # Start the application.
     ret = app.exec()
     mcs.stop_motion_controller_thread()
-    mcs.stop_poller_thread(Drive.Axis1.name)
-    mcs.stop_poller_thread(Drive.Axis2.name)
+    mcs.stop_recordings()
+    mcs.telemetry.stop()
+    mcs.process_data.stop()
+    if args.metrics_file is not None:
+        mcs.task_metrics.export(args.metrics_file)
     sys.exit(ret)
@@ -1,13 +1,21 @@
 import os
+from functools import partial
+from typing import Optional
 
 import ingenialogger
 from ingenialink import CAN_BAUDRATE
 from PySide6.QtCore import QJsonArray, QObject, Signal, Slot
 from PySide6.QtQml import QmlElement
 
+from k2basecamp.models.base_model import DEFAULT_NUMBER_OF_DRIVES
 from k2basecamp.models.bootloader_model import BootloaderModel
 from k2basecamp.services.motion_controller_service import MotionControllerService
-from k2basecamp.utils.enums import CanDevice, ConnectionProtocol, Drive
+from k2basecamp.utils.enums import (
+    CanDevice,
+    ConnectionProtocol,
+    DriveId,
+    FirmwareStage,
+)
 from k2basecamp.utils.types import thread_report
 
 # To be used on the @QmlElement decorator
@@ -70,6 +78,16 @@ class BootloaderController(QObject):
         progress (int): The progress as a percentage.
     """
 
+    firmware_installation_stage_changed = Signal(
+        int, str, arguments=["node_id", "stage"]
+    )
+    """Triggers when a drive advances to another stage during the installation.
+
+    Args:
+        node_id (int): the node / slave ID of the drive.
+        stage (str): the name of the new stage, see utils.enums.FirmwareStage.
+    """
+
     firmware_installation_started = Signal()
     """Triggers when the installation of firmware begins.
 
@@ -82,6 +100,10 @@ class BootloaderController(QObject):
         self.mcs = mcs
         self.bootloader_model = BootloaderModel()
         self.errors: list[str] = []
+        self.__firmware_check: Optional[
+            tuple[str, ConnectionProtocol, tuple[int, ...]]
+        ] = None
+        self.mcs.firmware_stage_update_triggered.connect(self.update_firmware_stage)
 
     @Slot(result=QJsonArray)
     def get_interface_name_list(self) -> QJsonArray:
@@ -98,12 +120,15 @@ class BootloaderController(QObject):
     @Slot()
     def scan_servos(self) -> None:
         """Scan for servos in the network."""
+        # The slaves found by a previous EtherCAT scan are not expected again.
+        self.bootloader_model.set_number_of_drives(DEFAULT_NUMBER_OF_DRIVES)
+        self.check_firmware()
         self.mcs.scan_servos(self.scan_servos_callback, self.bootloader_model)
 
     @Slot(str)
     def select_firmware(self, firmware: str) -> None:
         """Update the BootloaderModel, setting the firmware property to the url of the
-        file that was uploaded in the UI.
+        file that was uploaded in the UI, and check the file in the background.
 
         Args:
             firmware: the url of the firmware file.
@@ -111,23 +136,23 @@ class BootloaderController(QObject):
         firmware_path = firmware.removeprefix("file:///")
         self.bootloader_model.firmware = firmware_path
         self.firmware_changed.emit(os.path.basename(firmware_path))
-        self.update_install_button_state()
+        self.check_firmware()
 
     @Slot()
     def reset_firmware(self) -> None:
         """Resets the firmware file in the BootloaderModel."""
         self.bootloader_model.firmware = None
         self.firmware_changed.emit("")
-        self.update_install_button_state()
+        self.check_firmware()
 
     @Slot()
     def install_firmware(self) -> None:
         """Install the firmwares that are saved in the BootloaderModel to the drives.
         If the installation process provides a progress report, it will be handled by
         the install_firmware_progress_callback - function.
-        Depending on the connection protocol, the installation has to be done
-        sequentially (one drive after the other) or can be done in parallel (this is
-        handled automatically by ingeniamotion).
+        On CANopen, the drives the firmware file is for are updated by ingeniamotion.
+        On EtherCAT, every slave of the BootloaderModel is updated, one after the
+        other, and its stage is reported with firmware_installation_stage_changed.
         """
         if not self.bootloader_model.install_prerequisites_met():
             self.error_triggered.emit(
@@ -135,18 +160,18 @@ class BootloaderController(QObject):
                 + "right parameters for the selected connection protocol."
             )
             return
-        if (
-            self.bootloader_model.firmware
-            and self.bootloader_model.left_id
-            and self.bootloader_model.right_id
-        ):
+        node_ids = [
+            node_id
+            for node_id in self.bootloader_model.ids.values()
+            if node_id is not None
+        ]
+        if self.bootloader_model.firmware and node_ids:
             self.mcs.install_firmware(
                 self.install_firmware_callback,
                 self.progress_callback,
                 self.bootloader_model,
                 self.bootloader_model.firmware,
-                self.bootloader_model.left_id,
-                self.bootloader_model.right_id,
+                node_ids,
             )
             self.mcs.error_triggered.connect(self.error_message_callback)
         self.firmware_installation_started.emit()
@@ -159,6 +184,15 @@ class BootloaderController(QObject):
         """
         self.firmware_installation_progress_changed.emit(progress)
 
+    def update_firmware_stage(self, node_id: int, stage: FirmwareStage) -> None:
+        """Forward the stage of a drive during the installation to the UI.
+
+        Args:
+            node_id: the node / slave ID of the drive.
+            stage: the new stage.
+        """
+        self.firmware_installation_stage_changed.emit(node_id, stage.name)
+
     @Slot(int)
     def select_connection(self, connection: int) -> None:
         """Update the BootloaderModel, setting the connection property to the value that
@@ -168,7 +202,7 @@ class BootloaderController(QObject):
             connection: the selected connection.
         """
         self.bootloader_model.connection = ConnectionProtocol(connection)
-        self.update_install_button_state()
+        self.check_firmware()
 
     @Slot(str)
     def select_interface(self, interface: str) -> None:
@@ -212,11 +246,8 @@ class BootloaderController(QObject):
             node_id: the selected node / slave ID.
             drive: the drive the ID belongs to.
         """
-        if drive == Drive.Axis1.value:
-            self.bootloader_model.left_id = node_id
-        else:
-            self.bootloader_model.right_id = node_id
-        self.update_install_button_state()
+        self.bootloader_model.ids[DriveId(drive)] = node_id
+        self.check_firmware()
 
     def scan_servos_callback(self, thread_report: thread_report) -> None:
         """Callback after the scan operation was completed. If values where returned,
@@ -228,11 +259,13 @@ class BootloaderController(QObject):
         """
         if thread_report.output is not None:
             servo_ids: list[int] = thread_report.output
-            self.bootloader_model.left_id = servo_ids[0]
-            if len(servo_ids) > 1:
-                self.bootloader_model.right_id = servo_ids[1]
+            # On EtherCAT every slave that was found is updated.
+            if self.bootloader_model.connection == ConnectionProtocol.EtherCAT:
+                self.bootloader_model.set_number_of_drives(len(servo_ids))
+            for drive, servo_id in zip(self.bootloader_model.drives, servo_ids):
+                self.bootloader_model.ids[drive] = servo_id
             self.servo_ids_changed.emit(QJsonArray.fromVariantList(servo_ids))
-            self.update_install_button_state()
+            self.check_firmware()
 
     def error_message_callback(self, report: thread_report) -> None:
         """Callback when an error occured in a MotionControllerThread.
@@ -257,6 +290,68 @@ class BootloaderController(QObject):
         """
         self.firmware_installation_complete_triggered.emit()
 
+    def check_firmware(self) -> None:
+        """Check the selected firmware file against the connection and the drives in
+        the background. The install button is disabled until the check passes.
+        Checks are repeated whenever the file, the connection or the drives change,
+        the file is only parsed again if its contents changed.
+        """
+        self.bootloader_model.firmware_image = None
+        self.update_install_button_state()
+        firmware = self.bootloader_model.firmware
+        ids = list(self.bootloader_model.ids.values())
+        if firmware is None or None in ids:
+            self.__firmware_check = None
+            return
+        node_ids = [node_id for node_id in ids if node_id is not None]
+        connection = self.bootloader_model.connection
+        self.__firmware_check = (firmware, connection, tuple(node_ids))
+        self.mcs.check_firmware(
+            partial(self.check_firmware_callback, self.__firmware_check),
+            firmware,
+            connection,
+            node_ids,
+            coalesce_key="check_firmware",
+            error_callback=partial(
+                self.check_firmware_error_callback, self.__firmware_check
+            ),
+        )
+
+    def check_firmware_callback(
+        self,
+        firmware_check: tuple[str, ConnectionProtocol, tuple[int, ...]],
+        thread_report: thread_report,
+    ) -> None:
+        """Callback after the firmware file passed the check. Enables the install
+        button, unless the check was superseded by a newer one.
+
+        Args:
+            firmware_check: the file, connection and IDs that were checked.
+            thread_report: the result of the operation that triggered
+                the callback.
+        """
+        if firmware_check != self.__firmware_check:
+            return
+        self.bootloader_model.firmware_image = thread_report.output
+        self.update_install_button_state()
+
+    def check_firmware_error_callback(
+        self,
+        firmware_check: tuple[str, ConnectionProtocol, tuple[int, ...]],
+        report: thread_report,
+    ) -> None:
+        """Callback after the firmware file failed the check. Emits a signal to the
+        UI that contains the reason, unless the check was superseded by a newer one.
+        The install button stays disabled.
+
+        Args:
+            firmware_check: the file, connection and IDs that were checked.
+            report: the error thread report.
+        """
+        if firmware_check != self.__firmware_check:
+            return
+        self.error_triggered.emit(str(report.exceptions))
+
     def update_install_button_state(self) -> None:
         """Helper function that calculates the state of the install button using the
         BootloaderModel and emits a signal to the UI with the resulting state.
@@ -1,19 +1,33 @@
 import os
 from collections import defaultdict
 from functools import partial
+from typing import Callable, Union
 
 import ingenialogger
+import numpy as np
+import numpy.typing as npt
 from ingenialink import CAN_BAUDRATE, NET_DEV_EVT, SERVO_STATE
+from PySide6.QtCharts import QAbstractSeries, QXYSeries
 from PySide6.QtCore import QJsonArray, QObject, Signal, Slot
 from PySide6.QtQml import QmlElement
 
+from k2basecamp.models.base_model import DEFAULT_NUMBER_OF_DRIVES
 from k2basecamp.models.connection_model import ConnectionModel
+from k2basecamp.models.plot_model import PlotModel
 from k2basecamp.services.motion_controller_service import (
     MAX_VELOCITY_REGISTER,
     MotionControllerService,
 )
-from k2basecamp.utils.enums import CanDevice, ConnectionProtocol, Drive
-from k2basecamp.utils.types import thread_report
+from k2basecamp.services.process_data_service import VELOCITY_FEEDBACK_REGISTER
+from k2basecamp.utils.enums import (
+    CanDevice,
+    ConnectionProtocol,
+    ConnectionStage,
+    Drive,
+    DriveId,
+    TaskPriority,
+)
+from k2basecamp.utils.types import error_snapshot, thread_report
 
 # To be used on the @QmlElement decorator
 # (QML_IMPORT_MINOR_VERSION is optional)
@@ -41,20 +55,13 @@ class ConnectionController(QObject):
     drive_disconnected_triggered: Signal = Signal()
     """Triggers when a drive is disconnected."""
 
-    velocity_left_changed = Signal(float, float, arguments=["timestamp", "velocity"])
-    """Triggers when the poller returns a new value.
-
-    Args:
-        timestamp (float): timestamp of the new data point.
-        velocity (float): velocity of the new data point.
-    """
-
-    velocity_right_changed = Signal(float, float, arguments=["timestamp", "velocity"])
-    """Triggers when the poller returns a new value.
+    velocity_changed = Signal(float, int, arguments=["timestamp", "drive"])
+    """Triggers when the poller returns a new batch of values. The values are stored
+    in the plot model of the drive.
 
     Args:
-        timestamp (float): timestamp of the new data point.
-        velocity (float): velocity of the new data point.
+        timestamp (float): timestamp of the newest data point.
+        drive (int): the drive the values belong to.
     """
 
     dictionary_changed = Signal(str, int, arguments=["dictionary", "drive"])
@@ -103,17 +110,32 @@ class ConnectionController(QObject):
     net_state_changed = Signal(int, arguments=["net_state"])
     """Triggers when the state of the network changes."""
 
+    connection_stage_changed = Signal(int, int, arguments=["stage", "drive"])
+    """Triggers when a drive advances to another stage while connecting."""
+
     max_velocity_value_received = Signal(float, int, arguments=["new_value", "drive"])
     """Triggers when we received the current value for CL_VEL_REF_MAX in the drive."""
 
-    def __init__(self, mcs: MotionControllerService) -> None:
+    def __init__(
+        self,
+        mcs: MotionControllerService,
+        number_of_drives: int = DEFAULT_NUMBER_OF_DRIVES,
+    ) -> None:
         super().__init__()
         self.mcs = mcs
         self.mcs.error_triggered.connect(self.handle_error)
         self.mcs.servo_state_update_triggered.connect(self.update_servo_state)
         self.mcs.net_state_update_triggered.connect(self.update_net_state)
-        self.connection_model = ConnectionModel()
-        self.__number_of_errors: dict[Drive, int] = defaultdict(int)
+        self.mcs.connection_stage_update_triggered.connect(self.update_connection_stage)
+        self.connection_model = ConnectionModel(number_of_drives=number_of_drives)
+        self.plot_models = {
+            drive: PlotModel() for drive in self.connection_model.drives
+        }
+        self.__number_of_errors: dict[DriveId, int] = defaultdict(int)
+        self.__velocity_subscriptions: dict[DriveId, int] = {}
+        self.__velocity_monitorings: dict[DriveId, int] = {}
+        self.__velocity_callbacks: dict[DriveId, Callable[..., None]] = {}
+        self.__high_rate_drives: set[DriveId] = set()
 
     @Slot()
     def connect(self) -> None:
@@ -137,11 +159,9 @@ class ConnectionController(QObject):
         Args:
             drive: the drive to enable
         """
-        target = Drive(drive)
-        if target == Drive.Axis1:
-            self.mcs.enable_motor(self.enable_motor_l_callback, target)
-        else:
-            self.mcs.enable_motor(self.enable_motor_r_callback, target)
+        target = DriveId(drive)
+        self.plot_models[target].clear()
+        self.mcs.enable_motor(partial(self.enable_motor_callback, target), target)
 
     @Slot(int)
     def disable_motor(self, drive: int) -> None:
@@ -150,44 +170,82 @@ class ConnectionController(QObject):
         Args:
             drive: the drive to disable
         """
-        if drive == Drive.Axis1.value:
-            self.mcs.run(
-                self.disable_motor_l_callback,
-                "motion.motor_disable",
-                Drive.Axis1.name,
-            )
-        else:
-            self.mcs.run(
-                self.disable_motor_r_callback,
-                "motion.motor_disable",
-                Drive.Axis2.name,
-            )
+        target = DriveId(drive)
+        self.mcs.run(
+            partial(self.disable_motor_callback, target),
+            "motion.motor_disable",
+            target.name,
+            priority=TaskPriority.Control,
+        )
 
-    @Slot()
-    def handle_new_velocity_data_r(
-        self, timestamps: list[float], data: list[list[float]]
-    ) -> None:
-        """Handles new velocity data coming from a PollerThread. Emits a signal with the
-        data prepared in a format that the UI can handle.
+    @Slot(int, bool)
+    def set_high_rate_velocity(self, drive: int, enabled: bool) -> None:
+        """Choose whether the velocity of a drive is captured at a high rate with
+        the monitoring buffer of the drive, instead of being polled. If the
+        velocity is already being plotted, the plot restarts with the new source.
 
         Args:
-            timestamps: contains the timestamp of the new data point.
-            data: contains the value of the new data point.
+            drive: the drive.
+            enabled: True to capture the velocity with the monitoring buffer.
         """
-        self.velocity_right_changed.emit(timestamps[0], data[0][0])
+        target = DriveId(drive)
+        if enabled:
+            self.__high_rate_drives.add(target)
+        else:
+            self.__high_rate_drives.discard(target)
+        callback = self.__velocity_callbacks.get(target)
+        if callback is not None:
+            self.plot_models[target].clear()
+            self.__subscribe_velocity(target, callback)
+
+    def handle_new_velocity_data(
+        self,
+        drive: DriveId,
+        timestamps: npt.NDArray[np.float64],
+        data: npt.NDArray[np.float64],
+    ) -> None:
+        """Handles a batch of velocity data polled from the drive. Stores the
+        whole batch in the plot model of the drive and emits a signal so the UI can
+        redraw the plot.
 
-    @Slot()
-    def handle_new_velocity_data_l(
-        self, timestamps: list[float], data: list[list[float]]
+        Args:
+            drive: the drive the data belongs to.
+            timestamps: contains the timestamps of the new data points.
+            data: contains the values of the new data points, one row per register.
+        """
+        plot_model = self.plot_models[drive]
+        plot_model.append(timestamps, data[0])
+        if plot_model.last_timestamp is not None:
+            self.velocity_changed.emit(plot_model.last_timestamp, int(drive))
+
+    @Slot(QAbstractSeries, int, float, float, int)
+    def update_plot(
+        self,
+        series: QAbstractSeries,
+        drive: int,
+        x_min: float,
+        x_max: float,
+        columns: int,
     ) -> None:
-        """Handles new velocity data coming from a PollerThread. Emits a signal with the
-        data prepared in a format that the UI can handle.
+        """Replace the points of a series in the UI with the points of the plot model
+        of a given drive that are within the visible range. The points are decimated
+        to about one minimum / maximum pair per column, so the cost of redrawing the
+        series does not grow with the number of stored points.
 
         Args:
-            timestamps: contains the timestamp of the new data point.
-            data: contains the value of the new data point.
+            series: the series to update.
+            drive: the drive the series belongs to.
+            x_min: the start of the visible range.
+            x_max: the end of the visible range.
+            columns: the width of the plot area in pixels.
         """
-        self.velocity_left_changed.emit(timestamps[0], data[0][0])
+        if not isinstance(series, QXYSeries):
+            logger.warning(f"Series of type {type(series)} can not be updated.")
+            return
+        timestamps, values = self.plot_models[DriveId(drive)].decimate(
+            x_min, x_max, columns
+        )
+        series.replaceNp(timestamps, values)
 
     @Slot(result=QJsonArray)
     def get_interface_name_list(self) -> QJsonArray:
@@ -217,12 +275,7 @@ class ConnectionController(QObject):
             velocity: the velocity
             drive: the drive
         """
-        self.mcs.run(
-            self.log_report,
-            "motion.set_velocity",
-            velocity,
-            servo=Drive(drive).name,
-        )
+        self.mcs.set_velocity(self.log_report, DriveId(drive), velocity)
 
     @Slot(float, int)
     def set_max_velocity(self, max_velocity: float, drive: int) -> None:
@@ -233,7 +286,7 @@ class ConnectionController(QObject):
             max_velocity: the value to set the register to
             drive: the drive
         """
-        self.mcs.set_max_velocity(self.log_report, Drive(drive), max_velocity)
+        self.mcs.set_max_velocity(self.log_report, DriveId(drive), max_velocity)
 
     @Slot(str, int)
     def select_dictionary(self, dictionary: str, drive: int) -> None:
@@ -248,34 +301,19 @@ class ConnectionController(QObject):
         """
         dictionary = dictionary.removeprefix("file:///")
         dictionary_type = self.mcs.check_dictionary_format(dictionary)
-        if drive == Drive.Axis1.value:
-            self.connection_model.left_dictionary = dictionary
-            self.connection_model.left_dictionary_type = dictionary_type
-        elif drive == Drive.Axis2.value:
-            self.connection_model.right_dictionary = dictionary
-            self.connection_model.right_dictionary_type = dictionary_type
-        elif drive == Drive.Both.value:
-            self.connection_model.left_dictionary = dictionary
-            self.connection_model.left_dictionary_type = dictionary_type
-            self.connection_model.right_dictionary = dictionary
-            self.connection_model.right_dictionary_type = dictionary_type
+        self.mcs.load_error_index(self.log_report, dictionary)
+        for target in self.__get_targets(drive):
+            self.connection_model.dictionaries[target] = dictionary
+            self.connection_model.dictionary_types[target] = dictionary_type
         self.dictionary_changed.emit(os.path.basename(dictionary), drive)
         self.update_connect_button_state()
 
     @Slot(int)
     def reset_dictionary(self, drive: int) -> None:
         """Resets the dictionary file in the DriveModel."""
-        if drive == Drive.Axis1.value:
-            self.connection_model.left_dictionary = None
-            self.connection_model.left_dictionary_type = None
-        elif drive == Drive.Axis2.value:
-            self.connection_model.right_dictionary = None
-            self.connection_model.right_dictionary_type = None
-        elif drive == Drive.Both.value:
-            self.connection_model.left_dictionary = None
-            self.connection_model.left_dictionary_type = None
-            self.connection_model.right_dictionary = None
-            self.connection_model.right_dictionary_type = None
+        for target in self.__get_targets(drive):
+            self.connection_model.dictionaries[target] = None
+            self.connection_model.dictionary_types[target] = None
         self.dictionary_changed.emit("", drive)
         self.update_connect_button_state()
 
@@ -289,13 +327,8 @@ class ConnectionController(QObject):
             drive: the drive
         """
         config = config.removeprefix("file:///")
-        if drive == Drive.Axis1.value:
-            self.connection_model.left_config = config
-        elif drive == Drive.Axis2.value:
-            self.connection_model.right_config = config
-        elif drive == Drive.Both.value:
-            self.connection_model.left_config = config
-            self.connection_model.right_config = config
+        for target in self.__get_targets(drive):
+            self.connection_model.configs[target] = config
         self.config_changed.emit(os.path.basename(config), drive)
 
     @Slot(int)
@@ -305,13 +338,8 @@ class ConnectionController(QObject):
         Args:
             drive: the drive.
         """
-        if drive == Drive.Axis1.value:
-            self.connection_model.left_config = None
-        elif drive == Drive.Axis2.value:
-            self.connection_model.right_config = None
-        elif drive == Drive.Both.value:
-            self.connection_model.left_config = None
-            self.connection_model.right_config = None
+        for target in self.__get_targets(drive):
+            self.connection_model.configs[target] = None
         self.config_changed.emit("", drive)
 
     @Slot(int)
@@ -367,10 +395,7 @@ class ConnectionController(QObject):
             node_id: the selected node / slave ID
             drive: the drive the ID belongs to
         """
-        if drive == Drive.Axis1.value:
-            self.connection_model.left_id = node_id
-        else:
-            self.connection_model.right_id = node_id
+        self.connection_model.ids[DriveId(drive)] = node_id
         self.update_connect_button_state()
 
     @Slot()
@@ -387,17 +412,16 @@ class ConnectionController(QObject):
         """
         self.drive_connected_triggered.emit()
         # Get the current value of the MAX_VELOCITY_REGISTER register
-        for drive in [Drive.Axis1, Drive.Axis2]:
+        for drive in self.connection_model.drives:
             self.mcs.get_number_of_errors(self.__set_number_of_errors, drive)
-            self.mcs.run(
+            self.mcs.get_register(
                 partial(self.get_max_velocity_value_callback, drive),
-                "communication.get_register",
+                drive,
                 MAX_VELOCITY_REGISTER,
-                drive.name,
             )
 
     def get_max_velocity_value_callback(
-        self, drive: Drive, t_report: thread_report
+        self, drive: DriveId, t_report: thread_report
     ) -> None:
         """Callback after we received the value for a certain register from the drive.
 
@@ -413,7 +437,7 @@ class ConnectionController(QObject):
                     + f"{type(new_value)}"
                 )
                 return
-            self.max_velocity_value_received.emit(new_value, drive.value)
+            self.max_velocity_value_received.emit(new_value, int(drive))
         else:
             logger.warning(f"Could not read register. Exception: {t_report.exceptions}")
 
@@ -425,67 +449,40 @@ class ConnectionController(QObject):
                 the callback
         """
 
-        self.update_servo_state(Drive.Axis2, SERVO_STATE.DISABLED)
-        self.update_servo_state(Drive.Axis1, SERVO_STATE.DISABLED)
+        for drive in reversed(self.connection_model.drives):
+            self.update_servo_state(drive, SERVO_STATE.DISABLED)
+        for plot_model in self.plot_models.values():
+            plot_model.clear()
         self.drive_disconnected_triggered.emit()
         self.update_connect_button_state()
 
-    def enable_motor_l_callback(self, thread_report: thread_report) -> None:
-        """Callback after the motor of a drive was enabled.
-        Starts an instance of PollerThread to continuously monitor the velocity of the
-        motor.
-        Binds the new_data_available_triggered signal of the new PollerThread to a
-        function that handles the communication with the UI.
-
-        Args:
-            thread_report: the result of the operation that triggered
-                the callback
-        """
-        poller_thread = self.mcs.create_poller_thread(
-            Drive.Axis1.name, [{"name": "CL_VEL_FBK_VALUE", "axis": 1}]
-        )
-        poller_thread.new_data_available_triggered.connect(
-            self.handle_new_velocity_data_l
-        )
-        poller_thread.start()
-
-    def enable_motor_r_callback(self, thread_report: thread_report) -> None:
+    def enable_motor_callback(
+        self, drive: DriveId, thread_report: thread_report
+    ) -> None:
         """Callback after the motor of a drive was enabled.
-        Starts an instance of PollerThread to continuously monitor the velocity of the
-        motor.
-        Emits a signal to the UI.
+        Subscribes to the velocity of the motor to continuously monitor it.
+        The new data is handled by a function that handles the communication with the
+        UI.
 
         Args:
+            drive: the drive whose motor was enabled.
             thread_report: the result of the operation that triggered
                 the callback
         """
-        poller_thread = self.mcs.create_poller_thread(
-            Drive.Axis2.name, [{"name": "CL_VEL_FBK_VALUE", "axis": 1}]
-        )
-        poller_thread.new_data_available_triggered.connect(
-            self.handle_new_velocity_data_r
-        )
-        poller_thread.start()
+        self.__subscribe_velocity(drive, partial(self.handle_new_velocity_data, drive))
 
-    def disable_motor_l_callback(self, thread_report: thread_report) -> None:
-        """Callback after the motor of a drive was disabled.
-        Stops the corresponding poller thread.
-
-        Args:
-            thread_report: the result of the operation that triggered
-                the callback
-        """
-        self.mcs.stop_poller_thread(Drive.Axis1.name)
-
-    def disable_motor_r_callback(self, thread_report: thread_report) -> None:
+    def disable_motor_callback(
+        self, drive: DriveId, thread_report: thread_report
+    ) -> None:
         """Callback after the motor of a drive was disabled.
-        Stops the corresponding poller thread.
+        Cancels the subscription to the velocity of the motor.
 
         Args:
+            drive: the drive whose motor was disabled.
             thread_report: the result of the operation that triggered
                 the callback
         """
-        self.mcs.stop_poller_thread(Drive.Axis2.name)
+        self.__unsubscribe_velocity(drive)
 
     def scan_servos_callback(self, thread_report: thread_report) -> None:
         """Callback after the scan operation was completed. If values where returned,
@@ -497,8 +494,9 @@ class ConnectionController(QObject):
         """
         if thread_report.output is not None:
             servo_ids: list[int] = thread_report.output
-            self.connection_model.left_id = servo_ids[0]
-            self.connection_model.right_id = servo_ids[1]
+            # The drives of the collection take the IDs in the order they were found.
+            for drive, servo_id in zip(self.connection_model.drives, servo_ids):
+                self.connection_model.ids[drive] = servo_id
             self.servo_ids_changed.emit(QJsonArray.fromVariantList(servo_ids))
             self.update_connect_button_state()
 
@@ -513,26 +511,39 @@ class ConnectionController(QObject):
             report: The error thread report.
         """
         if report.drive is not None:
-            self.mcs.get_number_of_errors(self.update_number_of_errors, report.drive)
+            self.__get_error_snapshot(report.drive)
         else:
             self.error_triggered.emit(str(report.exceptions))
 
-    def update_number_of_errors(self, report: thread_report) -> None:
+    def show_new_errors(self, report: thread_report) -> None:
         """Callback to update the number of errors of a given drive.
-        If there is a new error, display it in a pop-up window.
+        If there are new errors, display all of them in a pop-up window.
 
         Args:
-            report: the result of the get_number_of_errors method call.
+            report: the result of the get_error_snapshot method call.
         """
-        if report.drive is None or report.output is None:
+        if report.drive is None or not isinstance(report.output, error_snapshot):
+            return
+        snapshot = report.output
+        known_errors = self.__number_of_errors[report.drive]
+        self.__number_of_errors[report.drive] = snapshot.count
+        # Another snapshot may have reported some of the errors already.
+        new_errors = (
+            snapshot.count - known_errors
+            if snapshot.count >= known_errors
+            else snapshot.count
+        )
+        if new_errors <= 0 or not snapshot.errors:
             return
-        current_number_of_errors = report.output
-        if current_number_of_errors > self.__number_of_errors[report.drive]:
-            self.mcs.get_last_error_message(self.show_last_error, report.drive)
-            self.__number_of_errors[report.drive] = current_number_of_errors
+        self.error_triggered.emit(
+            "\n".join(
+                f"{report.drive.name}: {error.description}"
+                for error in snapshot.errors[-new_errors:]
+            )
+        )
 
-    @Slot(Drive, SERVO_STATE)
-    def update_servo_state(self, drive: Drive, state: SERVO_STATE) -> None:
+    @Slot(DriveId, SERVO_STATE)
+    def update_servo_state(self, drive: DriveId, state: SERVO_STATE) -> None:
         """Send a signal to the GUI to update the servo state image of the affected
         drive.
 
@@ -540,12 +551,24 @@ class ConnectionController(QObject):
             drive: the affected drive
             state: the new state
         """
-        self.servo_state_changed.emit(state.value, drive.value)
+        self.servo_state_changed.emit(state.value, int(drive))
         if state == SERVO_STATE.FAULT:
-            self.mcs.get_number_of_errors(self.update_number_of_errors, drive)
+            self.__get_error_snapshot(drive)
+
+    @Slot(DriveId, ConnectionStage)
+    def update_connection_stage(self, drive: DriveId, stage: ConnectionStage) -> None:
+        """Send a signal to the GUI to report the progress of the connection of a
+        drive.
+
+        Args:
+            drive: the affected drive
+            stage: the new stage
+        """
+        logger.info(f"{drive.name}: {stage.name}")
+        self.connection_stage_changed.emit(stage.value, int(drive))
 
-    @Slot(Drive, NET_DEV_EVT)
-    def update_net_state(self, drive: Drive, state: NET_DEV_EVT) -> None:
+    @Slot(DriveId, NET_DEV_EVT)
+    def update_net_state(self, drive: DriveId, state: NET_DEV_EVT) -> None:
         """Send a signal to the GUI to update the interface when the network state
         changes.
         Also stops related poller threads if the drive was disconnected.
@@ -569,19 +592,6 @@ class ConnectionController(QObject):
         """
         logger.debug(report)
 
-    def show_last_error(self, report: thread_report) -> None:
-        """Callback to display the last error.
-
-        Args:
-            report: the result of the get_last_error method call.
-        """
-        if report.output:
-            if report.drive:
-                error_message = f"{report.drive.name}: {report.output}"
-            else:
-                error_message = report.output
-            self.error_triggered.emit(error_message)
-
     def update_connect_button_state(self) -> None:
         """Helper function that calculates the state of the connect button using the
         DriveModel and emits a signal to the UI with the resulting state.
@@ -590,6 +600,68 @@ class ConnectionController(QObject):
             self.connection_model.connect_button_state().value
         )
 
+    def __get_targets(self, drive: int) -> list[DriveId]:
+        """The drives a selection in the UI applies to.
+
+        Args:
+            drive: the drive, or Drive.Both for every drive of the collection.
+
+        Returns:
+            The drives.
+        """
+        if drive == Drive.Both.value:
+            return self.connection_model.drives
+        return [DriveId(drive)]
+
+    def __subscribe_velocity(
+        self, drive: DriveId, callback: Callable[..., None]
+    ) -> None:
+        """Subscribe to the velocity feedback of a given drive. It is polled, or
+        captured with the monitoring buffer if a high rate was selected for the
+        drive.
+
+        Args:
+            drive: the drive.
+            callback: receives the polled velocity data.
+        """
+        self.__unsubscribe_velocity(drive)
+        self.__velocity_callbacks[drive] = callback
+        registers: list[dict[str, Union[int, str]]] = [
+            {"name": VELOCITY_FEEDBACK_REGISTER, "axis": 1}
+        ]
+        if drive in self.__high_rate_drives:
+            self.__velocity_monitorings[drive] = self.mcs.start_monitoring(
+                drive.name, registers, callback
+            )
+        else:
+            self.__velocity_subscriptions[drive] = self.mcs.subscribe_registers(
+                drive.name, registers, callback
+            )
+
+    def __unsubscribe_velocity(self, drive: DriveId) -> None:
+        """Cancel the subscription to the velocity feedback of a given drive.
+
+        Args:
+            drive: the drive.
+        """
+        subscription_id = self.__velocity_subscriptions.pop(drive, None)
+        if subscription_id is not None:
+            self.mcs.unsubscribe_registers(subscription_id)
+        monitoring_id = self.__velocity_monitorings.pop(drive, None)
+        if monitoring_id is not None:
+            self.mcs.stop_monitoring(monitoring_id)
+        self.__velocity_callbacks.pop(drive, None)
+
+    def __get_error_snapshot(self, drive: DriveId) -> None:
+        """Read the errors of a given drive that are newer than the known ones.
+
+        Args:
+            drive: the drive.
+        """
+        self.mcs.get_error_snapshot(
+            self.show_new_errors, drive, self.__number_of_errors[drive]
+        )
+
     def __set_number_of_errors(self, t_report: thread_report) -> None:
         """Store the current number of errors of a given drive."""
         if t_report.drive is None or t_report.output is None:
@@ -3,12 +3,19 @@ from typing import Optional
 from ingenialink import CAN_BAUDRATE
 from PySide6.QtCore import QObject
 
-from k2basecamp.utils.enums import CanDevice, ConnectionProtocol
+from k2basecamp.utils.enums import CanDevice, ConnectionProtocol, Drive, DriveId
+
+DEFAULT_NUMBER_OF_DRIVES = 2
+# The drives shown on the left and on the right of the views.
+LEFT_DRIVE = DriveId(Drive.Axis1.value)
+RIGHT_DRIVE = DriveId(Drive.Axis2.value)
 
 
 class BaseModel(QObject):
     """Holds the state of the application.
     Is created and manipulated by the ConnectionController.
+    The node / slave ID of every drive of the collection is stored in ids, left_id
+    and right_id are shortcuts to the IDs of Axis1 and Axis2.
     """
 
     def __init__(
@@ -19,11 +26,51 @@ class BaseModel(QObject):
         interface: Optional[str] = None,
         left_id: Optional[int] = None,
         right_id: Optional[int] = None,
+        number_of_drives: int = DEFAULT_NUMBER_OF_DRIVES,
     ) -> None:
         super().__init__()
         self.connection = connection
         self.can_device = can_device
         self.can_baudrate = can_baudrate
         self.interface = interface
-        self.left_id = left_id
-        self.right_id = right_id
+        self.ids: dict[DriveId, Optional[int]] = dict.fromkeys(
+            DriveId.axes(number_of_drives)
+        )
+        if left_id is not None:
+            self.left_id = left_id
+        if right_id is not None:
+            self.right_id = right_id
+
+    @property
+    def drives(self) -> list[DriveId]:
+        """The drives of the collection, Axis1 to AxisN."""
+        return list(self.ids)
+
+    def set_number_of_drives(self, number_of_drives: int) -> None:
+        """Change the number of drives of the collection. The settings of the drives
+        that remain are kept.
+
+        Args:
+            number_of_drives: the new number of drives.
+        """
+        self.ids = {
+            drive: self.ids.get(drive) for drive in DriveId.axes(number_of_drives)
+        }
+
+    @property
+    def left_id(self) -> Optional[int]:
+        """The node / slave ID of Axis1."""
+        return self.ids.get(LEFT_DRIVE)
+
+    @left_id.setter
+    def left_id(self, node_id: Optional[int]) -> None:
+        self.ids[LEFT_DRIVE] = node_id
+
+    @property
+    def right_id(self) -> Optional[int]:
+        """The node / slave ID of Axis2."""
+        return self.ids.get(RIGHT_DRIVE)
+
+    @right_id.setter
+    def right_id(self, node_id: Optional[int]) -> None:
+        self.ids[RIGHT_DRIVE] = node_id
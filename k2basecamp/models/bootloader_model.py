@@ -1,12 +1,15 @@
-from typing import Union
+from typing import Optional, Union
 
 from k2basecamp.models.base_model import BaseModel
 from k2basecamp.utils.enums import ButtonState, ConnectionProtocol
+from k2basecamp.utils.types import firmware_image
 
 
 class BootloaderModel(BaseModel):
     """Holds the state of the application.
     Is created and manipulated by the ConnectionController.
+    The firmware image is set once the firmware file has been checked against the
+    connection and the drives.
     """
 
     def __init__(
@@ -15,6 +18,7 @@ class BootloaderModel(BaseModel):
     ) -> None:
         super().__init__()
         self.firmware = firmware
+        self.firmware_image: Optional[firmware_image] = None
 
     def install_prerequisites_met(self) -> bool:
         """Calculate if the application is in the right state to perform the
@@ -23,15 +27,13 @@ class BootloaderModel(BaseModel):
         Returns:
             bool: true if it is, false if not.
         """
+        ids = list(self.ids.values())
         return (
-            (
-                (
-                    self.left_id is not None
-                    and self.right_id is not None
-                    and self.firmware is not None
-                )
-            )
-            and self.left_id != self.right_id
+            self.firmware is not None
+            and self.firmware_image is not None
+            and len(ids) > 0
+            and None not in ids
+            and len(set(ids)) == len(ids)
             and (
                 (
                     self.connection == ConnectionProtocol.CANopen
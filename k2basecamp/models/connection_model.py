@@ -1,12 +1,20 @@
-from typing import Union
+from typing import Optional, Union
 
-from k2basecamp.models.base_model import BaseModel
-from k2basecamp.utils.enums import ButtonState, ConnectionProtocol
+from k2basecamp.models.base_model import (
+    DEFAULT_NUMBER_OF_DRIVES,
+    LEFT_DRIVE,
+    RIGHT_DRIVE,
+    BaseModel,
+)
+from k2basecamp.utils.enums import ButtonState, ConnectionProtocol, DriveId
 
 
 class ConnectionModel(BaseModel):
     """Holds the state of the application.
     Is created and manipulated by the ConnectionController.
+    The dictionary, dictionary type and configuration of every drive of the
+    collection are stored by drive, the left_* and right_* properties are shortcuts
+    to the ones of Axis1 and Axis2.
     """
 
     def __init__(
@@ -17,14 +25,96 @@ class ConnectionModel(BaseModel):
         right_dictionary_type: Union[ConnectionProtocol, None] = None,
         left_config: Union[str, None] = None,
         right_config: Union[str, None] = None,
+        number_of_drives: int = DEFAULT_NUMBER_OF_DRIVES,
     ) -> None:
-        super().__init__()
-        self.left_dictionary = left_dictionary
-        self.left_dictionary_type = left_dictionary_type
-        self.right_dictionary = right_dictionary
-        self.right_dictionary_type = right_dictionary_type
-        self.left_config = left_config
-        self.right_config = right_config
+        super().__init__(number_of_drives=number_of_drives)
+        self.dictionaries: dict[DriveId, Optional[str]] = dict.fromkeys(self.drives)
+        self.dictionary_types: dict[DriveId, Optional[ConnectionProtocol]] = (
+            dict.fromkeys(self.drives)
+        )
+        self.configs: dict[DriveId, Optional[str]] = dict.fromkeys(self.drives)
+        for drive, dictionary, dictionary_type, config in [
+            (LEFT_DRIVE, left_dictionary, left_dictionary_type, left_config),
+            (RIGHT_DRIVE, right_dictionary, right_dictionary_type, right_config),
+        ]:
+            if drive in self.ids:
+                self.dictionaries[drive] = dictionary
+                self.dictionary_types[drive] = dictionary_type
+                self.configs[drive] = config
+
+    def set_number_of_drives(self, number_of_drives: int) -> None:
+        """Change the number of drives of the collection. The settings of the drives
+        that remain are kept.
+
+        Args:
+            number_of_drives: the new number of drives.
+        """
+        super().set_number_of_drives(number_of_drives)
+        self.dictionaries = {
+            drive: self.dictionaries.get(drive) for drive in self.drives
+        }
+        self.dictionary_types = {
+            drive: self.dictionary_types.get(drive) for drive in self.drives
+        }
+        self.configs = {drive: self.configs.get(drive) for drive in self.drives}
+
+    @property
+    def left_dictionary(self) -> Optional[str]:
+        """The dictionary of Axis1."""
+        return self.dictionaries.get(LEFT_DRIVE)
+
+    @left_dictionary.setter
+    def left_dictionary(self, dictionary: Optional[str]) -> None:
+        self.dictionaries[LEFT_DRIVE] = dictionary
+
+    @property
+    def left_dictionary_type(self) -> Optional[ConnectionProtocol]:
+        """The connection protocol of the dictionary of Axis1."""
+        return self.dictionary_types.get(LEFT_DRIVE)
+
+    @left_dictionary_type.setter
+    def left_dictionary_type(
+        self, dictionary_type: Optional[ConnectionProtocol]
+    ) -> None:
+        self.dictionary_types[LEFT_DRIVE] = dictionary_type
+
+    @property
+    def right_dictionary(self) -> Optional[str]:
+        """The dictionary of Axis2."""
+        return self.dictionaries.get(RIGHT_DRIVE)
+
+    @right_dictionary.setter
+    def right_dictionary(self, dictionary: Optional[str]) -> None:
+        self.dictionaries[RIGHT_DRIVE] = dictionary
+
+    @property
+    def right_dictionary_type(self) -> Optional[ConnectionProtocol]:
+        """The connection protocol of the dictionary of Axis2."""
+        return self.dictionary_types.get(RIGHT_DRIVE)
+
+    @right_dictionary_type.setter
+    def right_dictionary_type(
+        self, dictionary_type: Optional[ConnectionProtocol]
+    ) -> None:
+        self.dictionary_types[RIGHT_DRIVE] = dictionary_type
+
+    @property
+    def left_config(self) -> Optional[str]:
+        """The configuration of Axis1."""
+        return self.configs.get(LEFT_DRIVE)
+
+    @left_config.setter
+    def left_config(self, config: Optional[str]) -> None:
+        self.configs[LEFT_DRIVE] = config
+
+    @property
+    def right_config(self) -> Optional[str]:
+        """The configuration of Axis2."""
+        return self.configs.get(RIGHT_DRIVE)
+
+    @right_config.setter
+    def right_config(self, config: Optional[str]) -> None:
+        self.configs[RIGHT_DRIVE] = config
 
     def connect_button_state(self) -> ButtonState:
         """Calculate the state the "Connect"-button should be in based on the
@@ -33,16 +123,15 @@ class ConnectionModel(BaseModel):
         Returns:
             utils.enums.ButtonState: the button state.
         """
+        ids = list(self.ids.values())
         if (
-            self.left_dictionary is None
-            or self.left_dictionary_type is None
-            or self.connection != self.left_dictionary_type
-            or self.right_dictionary is None
-            or self.right_dictionary_type is None
-            or self.connection != self.right_dictionary_type
-            or self.left_id is None
-            or self.right_id is None
-            or self.left_id == self.right_id
+            any(
+                self.dictionaries[drive] is None
+                or self.dictionary_types[drive] != self.connection
+                for drive in self.drives
+            )
+            or None in ids
+            or len(set(ids)) != len(ids)
             or (
                 self.connection == ConnectionProtocol.CANopen
                 and (self.can_device is None or self.can_baudrate is None)
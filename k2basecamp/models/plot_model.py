@@ -0,0 +1,127 @@
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+from PySide6.QtCore import QObject
+
+PLOT_BUFFER_CAPACITY = 50000
+
+
+class PlotModel(QObject):
+    """Holds the data points of a plot.
+    The points are stored in a fixed-capacity ring buffer, so memory usage stays the
+    same no matter how long the motors are running: once the buffer is full, the
+    oldest points are overwritten.
+    Every point is written twice (at ``i`` and ``i + capacity``), which makes the
+    stored points always available as a contiguous, time-ordered view.
+    """
+
+    def __init__(self, capacity: int = PLOT_BUFFER_CAPACITY) -> None:
+        super().__init__()
+        self.capacity = capacity
+        self.__timestamps = np.zeros(2 * capacity, dtype=np.float64)
+        self.__values = np.zeros(2 * capacity, dtype=np.float64)
+        self.__head = 0
+        self.__size = 0
+
+    def __len__(self) -> int:
+        return self.__size
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        """The timestamp of the newest point, None if the model is empty."""
+        if self.__size == 0:
+            return None
+        return float(self.__timestamps[self.__head + self.__size - 1])
+
+    def append(
+        self,
+        timestamps: npt.NDArray[np.float64],
+        values: npt.NDArray[np.float64],
+    ) -> None:
+        """Add a batch of points to the model.
+
+        Args:
+            timestamps: the timestamps of the points, in ascending order.
+            values: the values of the points.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)[-self.capacity :]
+        values = np.asarray(values, dtype=np.float64)[-self.capacity :]
+        number_of_points = len(timestamps)
+        if number_of_points == 0:
+            return
+        start = (self.__head + self.__size) % self.capacity
+        indexes = (start + np.arange(number_of_points)) % self.capacity
+        for buffer, batch in [(self.__timestamps, timestamps), (self.__values, values)]:
+            buffer[indexes] = batch
+            buffer[indexes + self.capacity] = batch
+        overflow = max(0, self.__size + number_of_points - self.capacity)
+        self.__size = min(self.capacity, self.__size + number_of_points)
+        self.__head = (self.__head + overflow) % self.capacity
+
+    def clear(self) -> None:
+        """Remove all points from the model."""
+        self.__head = 0
+        self.__size = 0
+
+    def data(
+        self,
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """All the points stored in the model, ordered by time.
+
+        Returns:
+            The timestamps and values of the points (read-only views, no copy is
+            made).
+        """
+        end = self.__head + self.__size
+        timestamps = self.__timestamps[self.__head : end]
+        values = self.__values[self.__head : end]
+        timestamps.flags.writeable = False
+        values.flags.writeable = False
+        return timestamps, values
+
+    def window(
+        self, x_min: float, x_max: float
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """The points whose timestamp is within the given range.
+
+        Args:
+            x_min: the start of the range.
+            x_max: the end of the range.
+
+        Returns:
+            The timestamps and values of the points in the range.
+        """
+        timestamps, values = self.data()
+        start = np.searchsorted(timestamps, x_min, side="left")
+        end = np.searchsorted(timestamps, x_max, side="right")
+        return timestamps[start:end], values[start:end]
+
+    def decimate(
+        self, x_min: float, x_max: float, columns: int
+    ) -> tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """Reduce the points within the given range to what can actually be drawn:
+        the range is split into ``columns`` buckets (usually one per pixel column of
+        the plot) and each bucket is replaced by its minimum and maximum value.
+        The cost of drawing the result only depends on the width of the plot, not on
+        the number of stored points.
+
+        Args:
+            x_min: the start of the range.
+            x_max: the end of the range.
+            columns: the number of buckets.
+
+        Returns:
+            The timestamps and values of the decimated points.
+        """
+        timestamps, values = self.window(x_min, x_max)
+        if columns < 1 or x_max <= x_min or len(timestamps) <= 2 * columns:
+            return timestamps, values
+        buckets = ((timestamps - x_min) * (columns / (x_max - x_min))).astype(np.int64)
+        np.clip(buckets, 0, columns - 1, out=buckets)
+        # Index of the first point of every non-empty bucket.
+        starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+        decimated_values = np.empty(2 * len(starts), dtype=np.float64)
+        decimated_values[0::2] = np.minimum.reduceat(values, starts)
+        decimated_values[1::2] = np.maximum.reduceat(values, starts)
+        return np.repeat(timestamps[starts], 2), decimated_values
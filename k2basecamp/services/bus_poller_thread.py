@@ -0,0 +1,331 @@
+import threading
+import time
+from typing import Any, Optional, Union
+
+import ingenialogger
+import numpy as np
+from ingenialink.exceptions import ILError
+from ingeniamotion import MotionController
+from ingeniamotion.exceptions import IMException
+from PySide6.QtCore import QThread, Signal
+
+from k2basecamp.utils.enums import BackpressurePolicy
+from k2basecamp.utils.types import polled_data
+
+DEFAULT_AXIS = 1
+DEFAULT_BUS_BUDGET = 500.0
+DEFAULT_SAMPLING_TIME = 0.125
+DEFAULT_REFRESH_TIME = 0.125
+# Maximum number of samples per drive held back while the consumer is busy.
+MAX_PENDING_SAMPLES = 10000
+
+logger = ingenialogger.get_logger(__name__)
+
+
+class BusPollerThread(QThread):
+    """Thread that polls the registers of every drive connected to the same network,
+    instead of one poller thread per drive competing for the adapter.
+    The register reads of all the drives are scheduled in a single loop: the drive
+    whose sample is most overdue is read next, so the drives take turns when the
+    bus can not keep up with the requested sampling times. The total number of
+    register reads per second is limited by the bus budget.
+    Every refresh period, the samples of all the drives are delivered at once in a
+    single merged batch. Like a PollerThread, a new batch is only emitted once the
+    consumer has acknowledged the previous one (see :meth:`acknowledge`).
+    Drives whose registers are received through PDOs are not read, the samples of
+    their poller are added to the batch instead.
+    """
+
+    new_data_available_triggered: Signal = Signal(object)
+    """Signal emitted when new data is available.
+
+    Args:
+        batch (dict[str, polled_data]): the data of every drive that was sampled
+            since the previous batch, by drive alias.
+    """
+
+    def __init__(
+        self,
+        mc: MotionController,
+        bus: str,
+        bus_budget: float = DEFAULT_BUS_BUDGET,
+        refresh_time: float = DEFAULT_REFRESH_TIME,
+        backpressure_policy: BackpressurePolicy = BackpressurePolicy.Coalesce,
+    ) -> None:
+        """The constructor for BusPollerThread class
+
+        Args:
+            mc: MotionController instance.
+            bus: the network the polled drives are connected to.
+            bus_budget: maximum number of register reads per second, for all the
+                drives together. Defaults to 500.
+            refresh_time: Refresh time. Defaults to 0.125.
+            backpressure_policy: What to do with new data while the consumer has
+                not acknowledged the previous batch. Defaults to
+                BackpressurePolicy.Coalesce.
+        """
+        super().__init__()
+        self.__mc = mc
+        self.__bus = bus
+        self.__bus_budget = bus_budget
+        self.__refresh_time = refresh_time
+        self.__backpressure_policy = backpressure_policy
+        # Set here rather than in run, so a stop requested before the thread
+        # actually started is not overridden.
+        self.__running = True
+        self.__condition = threading.Condition()
+        self.__awaiting_acknowledge = False
+        self.__pending: dict[str, polled_data] = {}
+        self.__start_time = time.monotonic()
+        self.__bus_available_at = self.__start_time
+        self.__registers: dict[str, list[dict[str, Union[int, str]]]] = {}
+        self.__sampling_times: dict[str, float] = {}
+        self.__next_samples: dict[str, float] = {}
+        self.__samples: dict[str, tuple[list[float], list[list[float]]]] = {}
+        self.__failing_drives: set[str] = set()
+        self.__pollers: dict[str, Any] = {}
+        self.__poller_offsets: dict[str, float] = {}
+
+    @property
+    def bus(self) -> str:
+        """The network the polled drives are connected to."""
+        return self.__bus
+
+    @property
+    def start_time(self) -> float:
+        """The time.monotonic timestamp the emitted timestamps are relative to."""
+        return self.__start_time
+
+    @property
+    def drives(self) -> list[str]:
+        """The aliases of the polled drives."""
+        with self.__condition:
+            return list(self.__registers)
+
+    def drive_registers(self, drive: str) -> list[dict[str, Union[int, str]]]:
+        """The polled registers of a drive.
+
+        Args:
+            drive: drive alias.
+
+        Returns:
+            The registers, in the order of the rows of the emitted data. Empty if
+            the drive is not polled.
+        """
+        with self.__condition:
+            return list(self.__registers.get(drive, []))
+
+    def set_drive(
+        self,
+        drive: str,
+        registers: list[dict[str, Union[int, str]]],
+        sampling_time: float = DEFAULT_SAMPLING_TIME,
+        poller: Optional[Any] = None,
+    ) -> None:
+        """Start polling a drive, or replace its registers if it is already polled.
+        The samples of its previous registers that were not delivered yet are
+        dropped.
+
+        Args:
+            drive: drive alias.
+            registers: Registers to be read.
+            sampling_time: Sampling time. Defaults to 0.125.
+            poller: if set, a poller that already receives the registers, e.g.
+                through PDOs. It is read every refresh period instead of reading the
+                registers. Defaults to None.
+        """
+        with self.__condition:
+            self.__forget_drive(drive)
+            self.__registers[drive] = registers
+            if poller is not None:
+                poller.start()
+                self.__pollers[drive] = poller
+                self.__poller_offsets[drive] = time.monotonic() - self.__start_time
+            else:
+                self.__sampling_times[drive] = sampling_time
+                self.__next_samples[drive] = time.monotonic()
+                self.__samples[drive] = ([], [[] for _ in registers])
+            self.__condition.notify_all()
+
+    def remove_drive(self, drive: str) -> None:
+        """Stop polling a drive.
+
+        Args:
+            drive: drive alias.
+        """
+        with self.__condition:
+            self.__forget_drive(drive)
+            self.__condition.notify_all()
+
+    def set_refresh_time(self, refresh_time: float) -> None:
+        """Change how often the batches are delivered.
+
+        Args:
+            refresh_time: Refresh time.
+        """
+        with self.__condition:
+            self.__refresh_time = refresh_time
+            self.__condition.notify_all()
+
+    def run(self) -> None:
+        """Start the thread. Read the registers of the drives as they become due,
+        within the bus budget, and deliver their samples every refresh period."""
+        with self.__condition:
+            next_refresh = time.monotonic() + self.__refresh_time
+            while self.__running:
+                now = time.monotonic()
+                if now >= next_refresh:
+                    next_refresh = now + self.__refresh_time
+                    self.__collect_samples()
+                if self.__pending and not self.__awaiting_acknowledge:
+                    batch = self.__pending
+                    self.__pending = {}
+                    self.__awaiting_acknowledge = True
+                    self.new_data_available_triggered.emit(batch)
+                drive = self.__due_drive(now)
+                if drive is not None:
+                    self.__read_drive(drive, now)
+                    continue
+                timeout = min(next_refresh, self.__next_read()) - time.monotonic()
+                if timeout > 0:
+                    # Woken up early by stop, acknowledge or a change of the drives.
+                    self.__condition.wait(timeout)
+            for drive in list(self.__registers):
+                self.__forget_drive(drive)
+
+    def stop(self) -> None:
+        """Stop the thread. Takes effect immediately, or as soon as the register
+        being read has been received."""
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+
+    def acknowledge(self) -> None:
+        """Notify that the last emitted batch has been consumed, so the next one
+        can be emitted."""
+        with self.__condition:
+            self.__awaiting_acknowledge = False
+            self.__condition.notify_all()
+
+    def __forget_drive(self, drive: str) -> None:
+        """Drop the registers, the schedule and the samples of a drive, and stop its
+        poller. Must be called with the lock held.
+
+        Args:
+            drive: drive alias.
+        """
+        self.__registers.pop(drive, None)
+        self.__sampling_times.pop(drive, None)
+        self.__next_samples.pop(drive, None)
+        self.__samples.pop(drive, None)
+        self.__pending.pop(drive, None)
+        self.__failing_drives.discard(drive)
+        self.__poller_offsets.pop(drive, None)
+        poller = self.__pollers.pop(drive, None)
+        if poller is not None:
+            poller.stop()
+
+    def __due_drive(self, now: float) -> Optional[str]:
+        """The drive to read next, if the bus budget allows a read now.
+
+        Args:
+            now: the current time.monotonic timestamp.
+
+        Returns:
+            The drive whose sample is most overdue, None if no sample is due.
+        """
+        if now < self.__bus_available_at or not self.__next_samples:
+            return None
+        drive = min(self.__next_samples, key=self.__next_samples.__getitem__)
+        return drive if self.__next_samples[drive] <= now else None
+
+    def __next_read(self) -> float:
+        """When the next register read can take place.
+
+        Returns:
+            The time.monotonic timestamp, infinite if no drive is read.
+        """
+        if not self.__next_samples:
+            return float("inf")
+        return max(self.__bus_available_at, min(self.__next_samples.values()))
+
+    def __read_drive(self, drive: str, now: float) -> None:
+        """Take a sample of a drive by reading all its registers. Must be called with
+        the lock held, which is released during the reads.
+
+        Args:
+            drive: drive alias.
+            now: the current time.monotonic timestamp.
+        """
+        registers = self.__registers[drive]
+        # A drive that falls behind is not read in bursts to catch up, it just
+        # takes its turn again after the other due drives.
+        self.__next_samples[drive] = max(
+            self.__next_samples[drive] + self.__sampling_times[drive], now
+        )
+        self.__bus_available_at = now + len(registers) / self.__bus_budget
+        values: Optional[list[float]] = None
+        self.__condition.release()
+        try:
+            values = [
+                float(
+                    self.__mc.communication.get_register(
+                        str(register["name"]),
+                        servo=drive,
+                        axis=int(register.get("axis", DEFAULT_AXIS)),
+                    )
+                )
+                for register in registers
+            ]
+        except (ILError, IMException, ValueError) as e:
+            if drive not in self.__failing_drives:
+                logger.error(f"The registers of {drive} could not be read: {e}")
+        finally:
+            self.__condition.acquire()
+        if self.__registers.get(drive) is not registers or drive in self.__pollers:
+            # The drive was changed or removed during the read.
+            return
+        if values is None:
+            self.__failing_drives.add(drive)
+            return
+        self.__failing_drives.discard(drive)
+        timestamps, data = self.__samples[drive]
+        timestamps.append(now - self.__start_time)
+        for row, value in zip(data, values):
+            row.append(value)
+
+    def __collect_samples(self) -> None:
+        """Move the samples of every drive to the pending batch, according to the
+        backpressure policy. Must be called with the lock held."""
+        for drive, registers in self.__registers.items():
+            poller = self.__pollers.get(drive)
+            if poller is not None:
+                time_vectors, data, lost_samples = poller.data
+                if lost_samples:
+                    logger.error(f"Some poller samples of {drive} were lost.")
+                timestamps = (
+                    np.asarray(time_vectors, dtype=np.float64)
+                    + self.__poller_offsets[drive]
+                )
+            else:
+                time_vectors, data = self.__samples[drive]
+                self.__samples[drive] = ([], [[] for _ in registers])
+                timestamps = np.asarray(time_vectors, dtype=np.float64)
+            if len(timestamps) == 0:
+                continue
+            values = np.asarray(data, dtype=np.float64)
+            pending = self.__pending.get(drive)
+            if (
+                pending is not None
+                and self.__backpressure_policy == BackpressurePolicy.Coalesce
+            ):
+                timestamps = np.concatenate((pending.timestamps, timestamps))
+                values = np.concatenate((pending.data, values), axis=1)
+                if len(timestamps) > MAX_PENDING_SAMPLES:
+                    logger.warning(
+                        f"The consumer of {drive} is not keeping up, dropping"
+                        f" {len(timestamps) - MAX_PENDING_SAMPLES} samples."
+                    )
+                    timestamps = timestamps[-MAX_PENDING_SAMPLES:]
+                    values = values[:, -MAX_PENDING_SAMPLES:]
+            self.__pending[drive] = polled_data(registers, timestamps, values)
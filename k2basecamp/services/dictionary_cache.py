@@ -0,0 +1,402 @@
+import contextlib
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Optional
+
+import ingenialink
+import ingenialogger
+from ingenialink.dictionary import Dictionary, Interface
+from ingenialink.exceptions import ILError
+from ingenialink.servo import DictionaryFactory
+from PySide6.QtCore import QStandardPaths
+
+from k2basecamp.utils.types import error_description
+
+DEVICE_PATH = ("Body", "Device")
+ERROR_PATH = ("Body", "Errors", "Error")
+ERROR_LABEL_LANGUAGE = "en_US"
+DEFAULT_CAPACITY = 16
+CACHE_DIRECTORY_NAME = os.path.join("k2basecamp", "dictionaries")
+
+logger = ingenialogger.get_logger(__name__)
+
+
+class DictionaryCache:
+    """Cache of information read from dictionary (XDF) files.
+    The attributes of the Device element are keyed by the path, size and
+    modification time of the file, so a file that changes on disk is read again.
+    Parsed dictionaries are keyed by the hash of the contents of the file. They are
+    kept pickled in memory and in the cache directory, so a dictionary is parsed
+    once per version, and every request gets its own copy: ingenialink stores the
+    values of the registers of a drive in its dictionary. The error indexes (the
+    Errors section of the dictionaries) are keyed by the hash of the contents too,
+    so the drives that use the same dictionary share them.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        cache_directory: Optional[str] = None,
+    ) -> None:
+        """The constructor for DictionaryCache class
+
+        Args:
+            capacity: maximum number of files to keep information of, and of parsed
+                dictionaries to keep in memory. Defaults to 16.
+            cache_directory: where the parsed dictionaries are stored. Defaults to
+                None, i.e. a folder in the cache location of the platform.
+        """
+        self.capacity = capacity
+        if cache_directory is None:
+            cache_directory = os.path.join(
+                QStandardPaths.writableLocation(
+                    QStandardPaths.StandardLocation.CacheLocation
+                ),
+                CACHE_DIRECTORY_NAME,
+            )
+        self.cache_directory = cache_directory
+        self.__lock = threading.Lock()
+        self.__device_attributes: OrderedDict[tuple[str, int, int], dict[str, str]] = (
+            OrderedDict()
+        )
+        self.__content_hashes: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self.__dictionaries: OrderedDict[tuple[str, Interface], bytes] = OrderedDict()
+        self.__dictionary_locks: dict[tuple[str, Interface], threading.Lock] = {}
+        self.__error_indexes: OrderedDict[str, dict[int, error_description]] = (
+            OrderedDict()
+        )
+        self.__hits = 0
+        self.__misses = 0
+        self.__error_index_hits = 0
+        self.__error_index_misses = 0
+        self.__dictionaries_parsed = 0
+        self.__dictionaries_loaded = 0
+        self.__dictionaries_shared = 0
+
+    @property
+    def hits(self) -> int:
+        """The number of requests that were served from the cache."""
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """The number of requests that required reading the file."""
+        return self.__misses
+
+    @property
+    def error_index_hits(self) -> int:
+        """The number of error indexes that were served from the cache."""
+        return self.__error_index_hits
+
+    @property
+    def error_index_misses(self) -> int:
+        """The number of error indexes that required reading the file."""
+        return self.__error_index_misses
+
+    @property
+    def dictionaries_parsed(self) -> int:
+        """The number of dictionaries that had to be parsed."""
+        return self.__dictionaries_parsed
+
+    @property
+    def dictionaries_loaded(self) -> int:
+        """The number of dictionaries that were loaded from the cache directory."""
+        return self.__dictionaries_loaded
+
+    @property
+    def dictionaries_shared(self) -> int:
+        """The number of dictionaries that were copied from memory."""
+        return self.__dictionaries_shared
+
+    def get_device_attributes(self, path: str) -> dict[str, str]:
+        """Get the attributes of the Device element of a dictionary, e.g. its
+        Interface, family or firmwareVersion.
+
+        Args:
+            path: path to the dictionary.
+
+        Raises:
+            FileNotFoundError: If the file was not found.
+            ingenialink.exceptions.ILError: If the file has the wrong format.
+
+        Returns:
+            The attributes of the Device element.
+        """
+        key = file_fingerprint(path)
+        with self.__lock:
+            attributes = self.__device_attributes.get(key)
+            if attributes is not None:
+                self.__device_attributes.move_to_end(key)
+                self.__hits += 1
+                return dict(attributes)
+            self.__misses += 1
+        attributes = read_device_attributes(path)
+        with self.__lock:
+            self.__device_attributes[key] = attributes
+            while len(self.__device_attributes) > self.capacity:
+                self.__device_attributes.popitem(last=False)
+        return dict(attributes)
+
+    def get_dictionary(self, path: str, interface: Interface) -> Dictionary:
+        """Get a parsed dictionary, parsing it only if it is not cached yet.
+        Every request gets its own copy, unpickled from the cached one, with the
+        requested path.
+
+        Args:
+            path: path to the dictionary.
+            interface: connection interface.
+
+        Raises:
+            FileNotFoundError: If the file was not found.
+            ingenialink.exceptions.ILDictionaryParseError: If the file has the wrong
+                format.
+
+        Returns:
+            The parsed dictionary.
+        """
+        key = (self.__get_content_hash(path), interface)
+        with self.__lock:
+            dictionary_lock = self.__dictionary_locks.setdefault(key, threading.Lock())
+        # Requests of the same dictionary wait for each other instead of parsing it
+        # at the same time.
+        with dictionary_lock:
+            with self.__lock:
+                data = self.__dictionaries.get(key)
+                if data is not None:
+                    self.__dictionaries.move_to_end(key)
+                    self.__dictionaries_shared += 1
+            dictionary = None
+            if data is None:
+                dictionary = self.__load_dictionary(key)
+                if dictionary is None:
+                    dictionary = DictionaryFactory.create_dictionary(path, interface)
+                    self.__dictionaries_parsed += 1
+                    data = pickle.dumps(dictionary, protocol=pickle.HIGHEST_PROTOCOL)
+                    self.__store_dictionary(key, data)
+                else:
+                    self.__dictionaries_loaded += 1
+                    data = pickle.dumps(dictionary, protocol=pickle.HIGHEST_PROTOCOL)
+                with self.__lock:
+                    self.__dictionaries[key] = data
+                    while len(self.__dictionaries) > self.capacity:
+                        self.__dictionaries.popitem(last=False)
+        # The dictionary that was just parsed or loaded is not shared, it is only
+        # kept pickled.
+        if dictionary is None:
+            dictionary = pickle.loads(data)
+        # The cached dictionary may have been parsed from a different file with the
+        # same contents.
+        dictionary.path = path
+        return dictionary
+
+    def get_error_index(self, path: str) -> dict[int, error_description]:
+        """Get the errors defined in a dictionary, reading them only if they are
+        not cached yet. The same instance is returned for every request of the same
+        dictionary version: error indexes must be treated as read-only.
+
+        Args:
+            path: path to the dictionary.
+
+        Raises:
+            FileNotFoundError: If the file was not found.
+            ingenialink.exceptions.ILError: If the file has the wrong format.
+
+        Returns:
+            The errors, by code.
+        """
+        content_hash = self.__get_content_hash(path)
+        with self.__lock:
+            error_index = self.__error_indexes.get(content_hash)
+            if error_index is not None:
+                self.__error_indexes.move_to_end(content_hash)
+                self.__error_index_hits += 1
+                return error_index
+            self.__error_index_misses += 1
+        error_index = read_error_index(path)
+        with self.__lock:
+            # Keep the instance of a concurrent request, so it is shared.
+            error_index = self.__error_indexes.setdefault(content_hash, error_index)
+            while len(self.__error_indexes) > self.capacity:
+                self.__error_indexes.popitem(last=False)
+        return error_index
+
+    def __get_content_hash(self, path: str) -> str:
+        """Get the hash of the contents of a file. Hashes are cached by file
+        fingerprint, so the file is only read when it changes.
+
+        Args:
+            path: path to the file.
+
+        Raises:
+            FileNotFoundError: If the file was not found.
+
+        Returns:
+            The SHA-256 hash of the file.
+        """
+        fingerprint = file_fingerprint(path)
+        with self.__lock:
+            content_hash = self.__content_hashes.get(fingerprint)
+        if content_hash is None:
+            with open(path, "rb") as file:
+                content_hash = hashlib.sha256(file.read()).hexdigest()
+            with self.__lock:
+                self.__content_hashes[fingerprint] = content_hash
+                while len(self.__content_hashes) > self.capacity:
+                    self.__content_hashes.popitem(last=False)
+        return content_hash
+
+    def __get_cache_path(self, key: tuple[str, Interface]) -> str:
+        """Where a parsed dictionary is stored in the cache directory.
+
+        Args:
+            key: the content hash of the dictionary and the connection interface.
+
+        Returns:
+            The path of the pickled dictionary. It depends on the ingenialink
+            version, as pickles are only valid for the version that created them.
+        """
+        content_hash, interface = key
+        return os.path.join(
+            self.cache_directory,
+            f"{content_hash}_{interface.name}_{ingenialink.__version__}.pickle",
+        )
+
+    def __load_dictionary(self, key: tuple[str, Interface]) -> Optional[Dictionary]:
+        """Load a parsed dictionary from the cache directory.
+
+        Args:
+            key: the content hash of the dictionary and the connection interface.
+
+        Returns:
+            The dictionary, None if it is not in the cache directory.
+        """
+        cache_path = self.__get_cache_path(key)
+        try:
+            with open(cache_path, "rb") as file:
+                dictionary = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding invalid cached dictionary {cache_path}: {e}")
+            with contextlib.suppress(OSError):
+                os.remove(cache_path)
+            return None
+        if not isinstance(dictionary, Dictionary):
+            return None
+        return dictionary
+
+    def __store_dictionary(self, key: tuple[str, Interface], data: bytes) -> None:
+        """Store a parsed dictionary in the cache directory. Failing to do so is not
+        an error, the dictionary will simply be parsed again next time.
+
+        Args:
+            key: the content hash of the dictionary and the connection interface.
+            data: the pickled dictionary.
+        """
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            # Write to a temporary file first, so a cached dictionary is never
+            # read while it is being written.
+            with tempfile.NamedTemporaryFile(
+                dir=self.cache_directory, suffix=".tmp", delete=False
+            ) as file:
+                file.write(data)
+            os.replace(file.name, self.__get_cache_path(key))
+        except OSError as e:
+            logger.warning(f"Could not cache dictionary {key[0]}: {e}")
+
+
+def file_fingerprint(path: str) -> tuple[str, int, int]:
+    """Identify the current contents of a file without reading it.
+
+    Args:
+        path: path to the file.
+
+    Raises:
+        FileNotFoundError: If the file was not found.
+
+    Returns:
+        The absolute path, size and modification time (in ns) of the file.
+    """
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def read_device_attributes(path: str) -> dict[str, str]:
+    """Read the attributes of the Device element of a dictionary.
+    The file is parsed incrementally and parsing stops at the Device element, which
+    is near the top of the file, so the (much bigger) rest of the dictionary is never
+    read.
+
+    Args:
+        path: path to the dictionary.
+
+    Raises:
+        FileNotFoundError: If the file was not found.
+        ingenialink.exceptions.ILError: If the file has the wrong format.
+
+    Returns:
+        The attributes of the Device element.
+    """
+    # Tags of the elements that enclose the current one, starting at the root.
+    open_elements: list[str] = []
+    with open(path, "rb") as file:
+        try:
+            for event, element in ET.iterparse(file, events=("start", "end")):
+                if event == "end":
+                    open_elements.pop()
+                elif tuple(open_elements[1:]) + (element.tag,) == DEVICE_PATH:
+                    return dict(element.attrib)
+                else:
+                    open_elements.append(element.tag)
+        except ET.ParseError as e:
+            raise ILError("Invalid file format") from e
+    raise ILError("Invalid file format")
+
+
+def read_error_index(path: str) -> dict[int, error_description]:
+    """Read the errors defined in the Errors section of a dictionary.
+
+    Args:
+        path: path to the dictionary.
+
+    Raises:
+        FileNotFoundError: If the file was not found.
+        ingenialink.exceptions.ILError: If the file has the wrong format.
+
+    Returns:
+        The errors, by code.
+    """
+    error_index: dict[int, error_description] = {}
+    # Tags of the elements that enclose the current one, starting at the root.
+    open_elements: list[str] = []
+    with open(path, "rb") as file:
+        try:
+            for event, element in ET.iterparse(file, events=("start", "end")):
+                if event == "start":
+                    open_elements.append(element.tag)
+                    continue
+                if tuple(open_elements[1:]) == ERROR_PATH:
+                    code = int(element.attrib["id"], 16)
+                    labels = {
+                        label.attrib.get("lang"): label.text or ""
+                        for label in element.iter("Label")
+                    }
+                    error_index[code] = error_description(
+                        code,
+                        element.attrib.get("affected_module", ""),
+                        element.attrib.get("error_type", ""),
+                        labels.get(
+                            ERROR_LABEL_LANGUAGE, next(iter(labels.values()), "")
+                        ),
+                    )
+                    element.clear()
+                open_elements.pop()
+        except (ET.ParseError, KeyError, ValueError) as e:
+            raise ILError("Invalid file format") from e
+    return error_index
@@ -0,0 +1,339 @@
+import hashlib
+import io
+import json
+import os
+import re
+import struct
+import threading
+import zipfile
+from binascii import crc_hqx
+from collections import OrderedDict
+
+import ingenialogger
+from ingenialink.exceptions import ILError
+from ingenialink.utils.mcb import MCB
+
+from k2basecamp.services.dictionary_cache import file_fingerprint
+from k2basecamp.utils.enums import ConnectionProtocol
+from k2basecamp.utils.types import firmware_image
+
+FIRMWARE_EXTENSIONS = (".sfu", ".lfu", ".zfu")
+ENSEMBLE_MAPPING = "mapping.json"
+DEFAULT_CAPACITY = 8
+SFU_LINE_PATTERN = re.compile(r"[0-9A-Fa-f]{2}( [0-9A-Fa-f]{2})+")
+
+logger = ingenialogger.get_logger(__name__)
+
+
+class FirmwareCache:
+    """Cache of parsed firmware files.
+    A firmware file is parsed and its checksums verified once per version: the
+    parsed images are keyed by the hash of the contents of the file, so installing
+    the same firmware again, even from another path, only requires hashing the
+    file. Hashes are keyed by the path, size and modification time of the file, so
+    a file that changes on disk is read again.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """The constructor for FirmwareCache class
+
+        Args:
+            capacity: maximum number of parsed images to keep. Defaults to 8.
+        """
+        self.capacity = capacity
+        self.__lock = threading.Lock()
+        self.__content_hashes: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+        self.__images: OrderedDict[str, firmware_image] = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self) -> int:
+        """The number of images that were served from the cache."""
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """The number of images that had to be parsed."""
+        return self.__misses
+
+    def get_image(self, path: str) -> firmware_image:
+        """Get the parsed image of a firmware file.
+
+        Args:
+            path: path to the firmware file.
+
+        Raises:
+            FileNotFoundError: If the file was not found.
+            ingenialink.exceptions.ILError: If the file is not a firmware file, or
+                it is truncated or corrupt.
+
+        Returns:
+            The parsed image.
+        """
+        fingerprint = file_fingerprint(path)
+        with self.__lock:
+            content_hash = self.__content_hashes.get(fingerprint)
+            image = self.__images.get(content_hash) if content_hash else None
+            if image is not None:
+                self.__content_hashes.move_to_end(fingerprint)
+                self.__images.move_to_end(image.content_hash)
+                self.__hits += 1
+                return image
+            self.__misses += 1
+        with open(path, "rb") as file:
+            contents = file.read()
+        content_hash = hashlib.sha256(contents).hexdigest()
+        with self.__lock:
+            image = self.__images.get(content_hash)
+        if image is None:
+            image = read_firmware_image(os.path.basename(path), contents)
+            logger.info(f"Firmware {path} parsed: {image.commands} commands.")
+        with self.__lock:
+            self.__content_hashes[fingerprint] = content_hash
+            self.__images[content_hash] = image
+            while len(self.__content_hashes) > self.capacity:
+                self.__content_hashes.popitem(last=False)
+            while len(self.__images) > self.capacity:
+                self.__images.popitem(last=False)
+        return image
+
+    def check_image(
+        self, path: str, connection: ConnectionProtocol, node_ids: list[int]
+    ) -> firmware_image:
+        """Check that a firmware file can be installed to some drives, before the
+        installation starts.
+
+        Args:
+            path: path to the firmware file.
+            connection: the protocol the drives are updated with.
+            node_ids: the node / slave IDs of the drives.
+
+        Raises:
+            FileNotFoundError: If the file was not found.
+            ingenialink.exceptions.ILError: If the file is not a firmware file, it is
+                truncated or corrupt, it can not be installed with the protocol or
+                it is for more drives than the selected ones.
+
+        Returns:
+            The parsed image.
+        """
+        image = self.get_image(path)
+        check_image(image, connection, node_ids)
+        return image
+
+
+def read_firmware_image(name: str, contents: bytes) -> firmware_image:
+    """Parse a firmware file and verify its checksums.
+
+    Args:
+        name: the name of the file, its extension determines the format.
+        contents: the contents of the file.
+
+    Raises:
+        ingenialink.exceptions.ILError: If the file is not a firmware file, or it is
+            truncated or corrupt. The MCB errors of .lfu files are not raised, they
+            are stored in the image.
+
+    Returns:
+        The parsed image.
+    """
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in FIRMWARE_EXTENSIONS:
+        raise ILError(
+            f"{name} is not a firmware file. Supported files are"
+            f" {', '.join(FIRMWARE_EXTENSIONS)}."
+        )
+    if not contents:
+        raise ILError(f"The firmware file {name} is empty.")
+    image = firmware_image(
+        content_hash=hashlib.sha256(contents).hexdigest(),
+        extension=extension,
+        size=len(contents),
+    )
+    if extension == ".sfu":
+        image.commands = count_sfu_commands(name, contents)
+    elif extension == ".lfu":
+        try:
+            image.commands = count_mcb_frames(contents)
+        except ILError as e:
+            image.mcb_error = f"{name}: {e}"
+    else:
+        image.ensemble = read_ensemble(name, contents)
+        image.commands = sum(
+            drive_image.commands or 0 for drive_image in image.ensemble.values()
+        )
+    return image
+
+
+def count_sfu_commands(name: str, contents: bytes) -> int:
+    """Check that a .sfu file is made of lines of hexadecimal bytes, the command and
+    the data of every MCB message.
+
+    Args:
+        name: the name of the file.
+        contents: the contents of the file.
+
+    Raises:
+        ingenialink.exceptions.ILError: If any line is not a valid message.
+
+    Returns:
+        The number of messages.
+    """
+    try:
+        text = contents.decode("ascii")
+    except UnicodeDecodeError:
+        raise ILError(f"{name} is not a text firmware file.")
+    commands = 0
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if SFU_LINE_PATTERN.fullmatch(line) is None:
+            raise ILError(f"{name} is truncated or corrupt at line {number}.")
+        commands += 1
+    return commands
+
+
+def count_mcb_frames(contents: bytes) -> int:
+    """Walk the MCB frames of a .lfu file and verify their CRCs.
+
+    Args:
+        contents: the contents of the file.
+
+    Raises:
+        ingenialink.exceptions.ILError: If the file is truncated or a CRC is wrong.
+
+    Returns:
+        The number of frames.
+    """
+    frames = 0
+    position = 0
+    crc_start = MCB.MCB_FRAME_SIZE - MCB.MCB_CRC_SIZE
+    while position < len(contents):
+        frame = contents[position : position + MCB.MCB_FRAME_SIZE]
+        if len(frame) < MCB.MCB_FRAME_SIZE:
+            raise ILError(f"Truncated frame at byte {position}.")
+        (expected_crc,) = struct.unpack("<H", frame[crc_start:])
+        if crc_hqx(frame[:crc_start], 0) != expected_crc:
+            raise ILError(f"Wrong CRC in the frame at byte {position}.")
+        (cmd,) = struct.unpack("<H", frame[MCB.MCB_HEADER_H_SIZE : MCB.MCB_HEADER_SIZE])
+        position += MCB.MCB_FRAME_SIZE
+        # Extended frames are followed by their data.
+        if cmd & 1:
+            (size,) = struct.unpack(
+                "<H", frame[MCB.DATA_START_BYTE : MCB.DATA_START_BYTE + 2]
+            )
+            if position + size > len(contents):
+                raise ILError(f"Truncated frame data at byte {position}.")
+            position += size
+        frames += 1
+    return frames
+
+
+def read_ensemble(name: str, contents: bytes) -> dict[int, firmware_image]:
+    """Verify the CRCs of an ensemble (.zfu) file and parse the image of every drive
+    of its mapping.
+
+    Args:
+        name: the name of the file.
+        contents: the contents of the file.
+
+    Raises:
+        ingenialink.exceptions.ILError: If the file is not a valid ensemble, or it or
+            any of its images is truncated or corrupt.
+
+    Returns:
+        The image of every drive, by slave ID offset.
+    """
+    try:
+        with zipfile.ZipFile(io.BytesIO(contents)) as ensemble:
+            corrupt_member = ensemble.testzip()
+            if corrupt_member is not None:
+                raise ILError(f"{name} is corrupt: wrong CRC of {corrupt_member}.")
+            mapping = json.loads(ensemble.read(ENSEMBLE_MAPPING))
+            images: dict[int, firmware_image] = {}
+            for drive in mapping["drives"]:
+                drive_file = str(drive["fw_file"])
+                drive_image = read_firmware_image(drive_file, ensemble.read(drive_file))
+                if drive_image.ensemble:
+                    raise ILError(f"{name} contains another ensemble.")
+                images[int(drive["slave_id_offset"])] = drive_image
+    except (zipfile.BadZipFile, EOFError):
+        raise ILError(f"{name} is truncated or is not an ensemble firmware file.")
+    except (KeyError, TypeError, ValueError) as e:
+        raise ILError(f"{name} has an invalid {ENSEMBLE_MAPPING}: {e}")
+    if not images:
+        raise ILError(f"{name} has no drives.")
+    return images
+
+
+def check_image(
+    image: firmware_image, connection: ConnectionProtocol, node_ids: list[int]
+) -> None:
+    """Check that a parsed image can be installed to some drives.
+    Over CANopen the images are sent frame by frame, so .lfu images must be valid MCB
+    frames. Over EtherCAT the files are transferred as they are.
+    An ensemble is installed to consecutive drives, one per image of its mapping.
+
+    Args:
+        image: the parsed image.
+        connection: the protocol the drives are updated with.
+        node_ids: the node / slave IDs of the drives.
+
+    Raises:
+        ingenialink.exceptions.ILError: If the image can not be installed.
+    """
+    images = list(image.ensemble.values()) if image.ensemble else [image]
+    if connection == ConnectionProtocol.CANopen:
+        for drive_image in images:
+            if drive_image.mcb_error is not None:
+                raise ILError(
+                    "The firmware is truncated, corrupt or not a CANopen image:"
+                    f" {drive_image.mcb_error}"
+                )
+    elif connection != ConnectionProtocol.EtherCAT:
+        raise ILError("Connection type not implemented.")
+    if image.ensemble:
+        offsets = sorted(image.ensemble)
+        if len(node_ids) < len(offsets):
+            raise ILError(
+                f"The firmware is for an ensemble of {len(offsets)} drives, but only"
+                f" {len(node_ids)} are selected."
+            )
+        for ensemble_ids in ensemble_groups(image, node_ids):
+            missing_ids = [
+                node_id for node_id in ensemble_ids if node_id not in node_ids
+            ]
+            if missing_ids:
+                raise ILError(
+                    "The firmware is for an ensemble of consecutive drives, the"
+                    f" drives {', '.join(map(str, missing_ids))} are not selected."
+                )
+
+
+def ensemble_groups(image: firmware_image, node_ids: list[int]) -> list[list[int]]:
+    """Split some drives into the ensembles an image is installed to.
+    Every ensemble starts at the lowest drive that is not in a previous ensemble
+    and is made of the consecutive drives given by the offsets of its mapping. An
+    image that is not an ensemble is installed to every drive on its own.
+
+    Args:
+        image: the parsed image.
+        node_ids: the node / slave IDs of the drives.
+
+    Returns:
+        The node / slave IDs of every ensemble, first drive first. They may
+        include drives that are not in node_ids, if the drives do not make
+        complete ensembles.
+    """
+    if not image.ensemble:
+        return [[node_id] for node_id in node_ids]
+    offsets = sorted(image.ensemble)
+    remaining = sorted(set(node_ids))
+    groups: list[list[int]] = []
+    while remaining:
+        group = [remaining[0] + offset - offsets[0] for offset in offsets]
+        remaining = [node_id for node_id in remaining if node_id not in group]
+        groups.append(group)
+    return groups
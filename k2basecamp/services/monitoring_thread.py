@@ -0,0 +1,170 @@
+import threading
+import time
+from typing import Any, Optional, Union
+
+import ingenialogger
+import numpy as np
+from ingenialink.exceptions import ILError
+from ingeniamotion import MotionController
+from ingeniamotion.exceptions import IMException
+from PySide6.QtCore import QThread, Signal
+
+DEFAULT_PRESCALER = 1
+DEFAULT_BLOCK_DURATION = 0.1
+# Time, in seconds, a block is waited for on top of its duration.
+READ_TIMEOUT = 1.0
+# Number of consecutive empty blocks after which the monitoring is given up.
+MAX_EMPTY_BLOCKS = 5
+
+logger = ingenialogger.get_logger(__name__)
+
+
+class MonitoringThread(QThread):
+    """Thread that captures registers of a drive with its monitoring buffer,
+    instead of reading them one by one like a poller.
+    The drive samples the registers at its position & velocity loop rate divided by
+    the prescaler, i.e. up to several kHz, and stores them in its monitoring buffer.
+    The buffer is read out in blocks of a fixed duration, so the bus load depends
+    on the number of blocks rather than on the number of samples. Within a block the
+    samples are contiguous, there can be a short gap between blocks while the
+    monitoring is rearmed. If no data is received, the monitoring is rearmed after a
+    growing delay, and the thread stops after MAX_EMPTY_BLOCKS empty blocks in a
+    row.
+    """
+
+    new_data_available_triggered: Signal = Signal(object, object)
+    """Signal emitted when a block of data has been read.
+
+    Args:
+        timestamps (numpy.ndarray): the timestamps of every sample in the block,
+            relative to the start of the thread.
+        data (numpy.ndarray): the values of the block, one row per register.
+    """
+
+    def __init__(
+        self,
+        mc: MotionController,
+        drive: str,
+        registers: list[dict[str, Union[int, str]]],
+        prescaler: int = DEFAULT_PRESCALER,
+        block_duration: float = DEFAULT_BLOCK_DURATION,
+    ) -> None:
+        """The constructor for MonitoringThread class
+
+        Args:
+            mc: MotionController instance.
+            drive: drive alias.
+            registers: registers to be captured.
+            prescaler: the sampling rate is the position & velocity loop rate of
+                the drive divided by the prescaler. Defaults to 1.
+            block_duration: duration of every block read from the monitoring
+                buffer, in seconds. Limited by the size of the buffer of the drive.
+                Defaults to 0.1.
+        """
+        super().__init__()
+        self.__mc = mc
+        self.__drive = drive
+        self.__registers = registers
+        self.__prescaler = prescaler
+        self.__block_duration = block_duration
+        # Set here rather than in run, so a stop requested before the thread
+        # actually started is not overridden.
+        self.__running = True
+        self.__stop_event = threading.Event()
+        self.__lock = threading.Lock()
+        self.__monitoring: Optional[Any] = None
+        self.sampling_frequency: Optional[float] = None
+
+    @property
+    def drive(self) -> str:
+        """The alias of the captured drive."""
+        return self.__drive
+
+    @property
+    def registers(self) -> list[dict[str, Union[int, str]]]:
+        """The captured registers, in the order of the rows of the emitted data."""
+        return self.__registers
+
+    def run(self) -> None:
+        """Start the thread. Configure the monitoring of the drive and read its
+        buffer block after block until the thread is stopped."""
+        try:
+            monitoring = self.__mc.capture.create_monitoring(
+                self.__registers,
+                self.__prescaler,
+                self.__block_duration,
+                servo=self.__drive,
+            )
+            self.__mc.capture.enable_monitoring(servo=self.__drive)
+        except (ILError, IMException, ValueError) as e:
+            logger.error(f"The monitoring of {self.__drive} could not be started: {e}")
+            return
+        self.sampling_frequency = monitoring.sampling_freq
+        with self.__lock:
+            self.__monitoring = monitoring
+            running = self.__running
+        logger.info(
+            f"Capturing {len(self.__registers)} registers of {self.__drive} at"
+            f" {self.sampling_frequency} Hz."
+        )
+        start_time = time.monotonic()
+        # The drive starts filling the buffer when the monitoring is armed.
+        armed_time = start_time
+        empty_blocks = 0
+        try:
+            while running:
+                data = monitoring.read_monitoring_data(
+                    timeout=self.__block_duration + READ_TIMEOUT
+                )
+                with self.__lock:
+                    running = self.__running
+                if not running:
+                    break
+                if len(data) > 0 and len(data[0]) > 0:
+                    empty_blocks = 0
+                    self.__emit_block(data, armed_time - start_time)
+                else:
+                    empty_blocks += 1
+                    if empty_blocks >= MAX_EMPTY_BLOCKS:
+                        logger.error(
+                            f"The monitoring of {self.__drive} stopped: no data was"
+                            f" received in {empty_blocks} blocks."
+                        )
+                        break
+                    logger.warning(
+                        f"No monitoring data was received from {self.__drive},"
+                        " rearming."
+                    )
+                    if self.__stop_event.wait(self.__block_duration * empty_blocks):
+                        break
+                monitoring.rearm_monitoring()
+                armed_time = time.monotonic()
+        except (ILError, IMException) as e:
+            logger.error(f"The monitoring of {self.__drive} stopped: {e}")
+        finally:
+            try:
+                self.__mc.capture.disable_monitoring(servo=self.__drive)
+            except (ILError, IMException) as e:
+                logger.error(f"The monitoring of {self.__drive} was not disabled: {e}")
+
+    def stop(self) -> None:
+        """Stop the thread. Interrupts the block that is being read."""
+        with self.__lock:
+            self.__running = False
+            self.__stop_event.set()
+            if self.__monitoring is not None:
+                self.__monitoring.stop_reading_data()
+
+    def __emit_block(self, data: list[list[Union[int, float]]], start: float) -> None:
+        """Timestamp a block of samples and emit it.
+
+        Args:
+            data: the values of the block, one list per register.
+            start: when the monitoring was armed, i.e. when the first sample was
+                taken, relative to the start of the thread.
+        """
+        values = np.asarray(data, dtype=np.float64)
+        samples = values.shape[1]
+        period = 1 / self.sampling_frequency if self.sampling_frequency else 0.0
+        timestamps = start + np.arange(samples) * period
+        self.new_data_available_triggered.emit(timestamps, values)
@@ -1,28 +1,94 @@
-import xml.etree.ElementTree as ET
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial, wraps
-from typing import Any, Callable, Optional, Union
+from typing import Any, Callable, Hashable, Iterable, Optional, Union
 
+import can
+import canopen
+import ingenialogger
 from ingenialink import NET_DEV_EVT, SERVO_STATE
+from ingenialink.canopen.network import CAN_CHANNELS, CAN_DEVICE, CanopenNetwork
 from ingenialink.exceptions import ILError
 from ingeniamotion import MotionController
 from ingeniamotion.enums import OperationMode
-from PySide6.QtCore import QObject, Signal, Slot
+from ingeniamotion.errors import Errors
+from PySide6.QtCore import QObject, Qt, Signal, Slot
 
 from k2basecamp.models.base_model import BaseModel
 from k2basecamp.models.bootloader_model import BootloaderModel
 from k2basecamp.models.connection_model import ConnectionModel
-from k2basecamp.services.motion_controller_thread import MotionControllerThread
-from k2basecamp.services.poller_thread import PollerThread
-from k2basecamp.utils.enums import ConnectionProtocol, Drive, stringify_can_device_enum
-from k2basecamp.utils.types import motion_controller_task, thread_report
+from k2basecamp.services.bus_poller_thread import DEFAULT_BUS_BUDGET
+from k2basecamp.services.dictionary_cache import DictionaryCache
+from k2basecamp.services.firmware_cache import FirmwareCache, ensemble_groups
+from k2basecamp.services.motion_controller_thread import (
+    TASK_EXCEPTIONS,
+    MotionControllerThread,
+)
+from k2basecamp.services.process_data_service import (
+    DEFAULT_REFRESH_RATE,
+    ProcessDataService,
+)
+from k2basecamp.services.recorder_thread import RecorderThread
+from k2basecamp.services.register_cache import RegisterCache, register_value
+from k2basecamp.services.task_metrics import TaskMetrics
+from k2basecamp.services.telemetry_service import TelemetryService
+from k2basecamp.services.topology_cache import TopologyCache
+from k2basecamp.utils.enums import (
+    ConnectionProtocol,
+    ConnectionStage,
+    DriveId,
+    FirmwareStage,
+    TaskPriority,
+    stringify_can_device_enum,
+)
+from k2basecamp.utils.types import (
+    drive_error,
+    error_description,
+    error_snapshot,
+    motion_controller_task,
+    register_write,
+    thread_report,
+)
 
-DEVICE_NODE = "Body//Device"
 INTERFACE_CAN = "CAN"
 INTERFACE_ETH = "ETH"
 DEFAULT_DICTIONARY_PATH = "k2basecamp/assets/eve-net-c_can_2.4.1.xdf"
-EXPECTED_NODE_NR_SCAN = 2
+DEFAULT_WORKER_THREADS = 2
+CANOPEN_CHANNEL = 0
+# The device type (0x1000) is read to check that a node answers.
+CANOPEN_DEVICE_TYPE_INDEX = 0x1000
+CANOPEN_PING_TIMEOUT = 0.05
 MAX_VELOCITY_REGISTER = "CL_VEL_REF_MAX"
 MAX_PROFILER_VELOCITY_REGISTER = "PROF_MAX_VEL"
+# Time to live, in seconds, of the cached values of the configuration and limit
+# registers, that only change when the application writes them. Other registers,
+# e.g. feedbacks, status and errors, are always read from the drive.
+CONFIGURATION_REGISTER_TTL = 60.0
+REGISTER_CACHE_TTLS = {
+    register: CONFIGURATION_REGISTER_TTL
+    for register in [
+        MAX_VELOCITY_REGISTER,
+        MAX_PROFILER_VELOCITY_REGISTER,
+        "PROF_MAX_ACC",
+        "PROF_MAX_DEC",
+        "CL_POS_REF_MAX_RANGE",
+        "CL_POS_REF_MIN_RANGE",
+        "CL_CUR_REF_MAX",
+        "DRV_PROT_USER_OVER_VOLT",
+        "DRV_PROT_USER_UNDER_VOLT",
+        "MOT_RATED_CURRENT",
+        "MOT_PAIR_POLES",
+    ]
+}
+# Maximum time, in seconds, an error snapshot can wait in the queue. A dropped
+# snapshot is not lost: the next one reads every error newer than the known ones.
+ERROR_SNAPSHOT_DEADLINE = 5.0
+# Maximum time, in seconds, a task that must run while the workers are idle (see
+# MotionControllerService.run_exclusively) waits for the workers.
+EXCLUSIVE_TASK_TIMEOUT = 5.0
+
+logger = ingenialogger.get_logger(__name__)
 
 
 class MotionControllerService(QObject):
@@ -35,34 +101,137 @@ class MotionControllerService(QObject):
     error_triggered = Signal(thread_report, arguments=["thread_report"])
     """Triggers when an error occurs while communicating with the drive"""
 
-    servo_state_update_triggered: Signal = Signal(Drive, SERVO_STATE)
+    servo_state_update_triggered: Signal = Signal(DriveId, SERVO_STATE)
     """Triggers when the servo state is updated."""
 
-    net_state_update_triggered: Signal = Signal(Drive, NET_DEV_EVT)
+    net_state_update_triggered: Signal = Signal(DriveId, NET_DEV_EVT)
     """Triggers when the network state is updated."""
 
-    def __init__(self) -> None:
-        """The constructor for MotionControllerService class"""
+    connection_stage_update_triggered: Signal = Signal(DriveId, ConnectionStage)
+    """Triggers when a drive advances to another stage while connecting."""
+
+    firmware_stage_update_triggered: Signal = Signal(int, FirmwareStage)
+    """Triggers when a drive, identified by its node / slave ID, advances to another
+    stage while its firmware is installed."""
+
+    def __init__(
+        self,
+        mc: Optional[MotionController] = None,
+        worker_threads: int = DEFAULT_WORKER_THREADS,
+        bus_budget: float = DEFAULT_BUS_BUDGET,
+    ) -> None:
+        """The constructor for MotionControllerService class
+
+        Args:
+            mc: the MotionController used to communicate with the drives, e.g. a
+                SimulatedMotionController. Defaults to None, i.e. a new
+                MotionController.
+            worker_threads: number of threads that execute the tasks of the drives,
+                which are assigned to them in turns. It also limits how many
+                configurations are loaded at the same time. Defaults to 2, i.e. a
+                thread per drive for two drives.
+            bus_budget: maximum number of register reads per second the telemetry
+                makes on each network. Defaults to 500.
+        """
         super().__init__()
-        self.__mc: MotionController = MotionController()
-        self.registers_cache: dict[str, dict[int, dict[str, Any]]] = {}
-        self.__poller_threads: dict[str, PollerThread] = {}
-        # Create a thread to communicate with the drive
-        self.__motion_controller_thread = MotionControllerThread()
-        self.__motion_controller_thread.task_completed.connect(self.execute_callback)
-        self.__motion_controller_thread.task_errored.connect(self.error_triggered)
-        self.__motion_controller_thread.start()
+        self.__mc: MotionController = MotionController() if mc is None else mc
+        self.__worker_threads = max(1, worker_threads)
+        self.registers_cache = RegisterCache(ttls=REGISTER_CACHE_TTLS)
+        self.dictionary_cache = DictionaryCache()
+        self.firmware_cache = FirmwareCache()
+        self.topology_cache = TopologyCache()
+        # Optional cyclic exchange of the velocity setpoints and feedback
+        self.process_data = ProcessDataService(
+            self.__mc, exception_callback=self.__process_data_errored
+        )
+        # Share one register poller between all the drives of a network
+        self.telemetry = TelemetryService(
+            self.__mc, process_data=self.process_data, bus_budget=bus_budget
+        )
+        self.__recorders: dict[int, RecorderThread] = {}
+        # The errors of the dictionary of every connected drive, by code
+        self.__error_indexes: dict[DriveId, dict[int, error_description]] = {}
+        self.__connected_dictionaries: set[str] = set()
+        self.task_metrics = TaskMetrics()
+        # The tasks of the drives are spread over a fixed number of worker threads,
+        # so a slow operation on one drive does not block the drives of the other
+        # workers, and the number of threads does not grow with the number of
+        # drives. Tasks that do not target a single drive run on a general purpose
+        # thread.
+        self.__general_thread = self.__create_thread("MotionControllerThread")
+        self.__workers = [
+            self.__create_thread(
+                f"MotionControllerThread (worker {worker + 1})", f"worker{worker + 1}"
+            )
+            for worker in range(self.__worker_threads)
+        ]
+
+    def __create_thread(
+        self, name: str, metrics_label: Optional[str] = None
+    ) -> MotionControllerThread:
+        """Create and start a MotionControllerThread.
+
+        Args:
+            name: the name of the thread.
+            metrics_label: the label of the metrics of its queue. Defaults to None,
+                i.e. "general".
+
+        Returns:
+            The thread.
+        """
+        thread = MotionControllerThread(self.task_metrics, name=metrics_label)
+        thread.setObjectName(name)
+        # Queued even if emitted from the GUI thread, so callbacks are never invoked
+        # from within the request that triggers them, see set_velocity.
+        thread.task_completed.connect(
+            self.execute_callback,
+            Qt.ConnectionType.QueuedConnection,  # type: ignore[arg-type]
+        )
+        # Tasks whose deadline expired are only logged and recorded in the metrics.
+        # Errors are queued too, as tasks that are cancelled by an emergency stop
+        # are reported from the GUI thread.
+        thread.task_errored.connect(
+            self.error_triggered,
+            Qt.ConnectionType.QueuedConnection,  # type: ignore[arg-type]
+        )
+        thread.start()
+        return thread
+
+    def __get_thread(self, drive: Optional[DriveId]) -> MotionControllerThread:
+        """The thread that executes the tasks of a drive.
+
+        Args:
+            drive: the drive, None for the tasks that do not target a single drive.
+
+        Returns:
+            The thread.
+        """
+        if drive is None:
+            return self.__general_thread
+        return self.__workers[(drive - 1) % len(self.__workers)]
+
+    @property
+    def __threads(self) -> list[MotionControllerThread]:
+        """Every MotionControllerThread of the service."""
+        return [self.__general_thread, *self.__workers]
 
     def run(
         self,
         report_callback: Callable[[thread_report], None],
         command: Union[Callable[..., Any], str],
         *args: Any,
+        priority: TaskPriority = TaskPriority.Configuration,
+        deadline: Optional[float] = None,
+        coalesce_key: Optional[Hashable] = None,
+        error_callback: Optional[Callable[[thread_report], Any]] = None,
         **kwargs: Any,
     ) -> None:
         """
         Add an ingeniamotion method or a custom method to the MotionControllerThread
         task queue.
+        Tasks that target a single drive (i.e. with a DriveId argument, or a drive alias
+        as argument or as servo keyword argument) are executed in order on the thread
+        of that drive. Other tasks are executed on the general purpose thread.
 
         Args:
             report_callback: When the task finishes, the report is sent back emitting
@@ -72,9 +241,25 @@ class MotionControllerService(QObject):
                 "communication.get_register" or a callable function, for instance,
                 self.get_register.
             args: Positional arguments to pass to the command function.
+            priority: Priority of the task. Tasks with a higher priority are executed
+                first. Defaults to TaskPriority.Configuration.
+            deadline: Maximum time in seconds the task can wait in the queue. If it is
+                exceeded, the task is dropped. Only Configuration and Diagnostics
+                tasks can have a deadline: a Control command must not be lost.
+                Defaults to None (no deadline).
+            coalesce_key: If set, a task with the same key that is still waiting in
+                the queue is replaced by this one. Defaults to None.
+            error_callback: If set, the report of the task is sent to this
+                callback if the task fails or is dropped, instead of being emitted
+                with the error_triggered signal. Defaults to None.
             kwargs: Optional arguments to pass to the command function.
 
+        Raises:
+            ValueError: If a Control task has a deadline.
+
         """
+        if deadline is not None and priority == TaskPriority.Control:
+            raise ValueError("Control tasks can not have a deadline.")
         if isinstance(command, str):
             module_name, method_name = command.split(".")
             module = getattr(self.__mc, module_name)
@@ -82,17 +267,54 @@ class MotionControllerService(QObject):
         else:
             method = command
 
-        thread = self.__motion_controller_thread
-        thread.queue.put(
+        thread = self.__get_thread(self.__get_target_drive(args, kwargs))
+        thread.add_task(
             motion_controller_task(
                 action=method,
                 callback=report_callback,
                 args=args,
                 kwargs=kwargs,
+                priority=priority,
+                deadline=None if deadline is None else time.time() + deadline,
+                coalesce_key=coalesce_key,
+                error_callback=error_callback,
             )
         )
 
-    def run_on_thread(func: Callable[..., Any]) -> Callable[..., None]:  # type: ignore
+    @property
+    def coalesce_counts(self) -> dict[Hashable, int]:
+        """The number of tasks that were not executed because a newer task with the
+        same coalesce key replaced them, per coalesce key."""
+        coalesce_counts: dict[Hashable, int] = {}
+        for thread in self.__threads:
+            coalesce_counts.update(thread.coalesce_counts)
+        return coalesce_counts
+
+    def __get_target_drive(
+        self, args: tuple[Any, ...], kwargs: dict[str, Any]
+    ) -> Optional[DriveId]:
+        """Find the drive a task targets, to run it on the thread of that drive.
+
+        Args:
+            args: positional arguments of the task.
+            kwargs: keyword arguments of the task.
+
+        Returns:
+            The target drive, None if the task does not target a single drive.
+        """
+        for arg in [*args, kwargs.get("servo")]:
+            if isinstance(arg, str):
+                arg = DriveId.from_alias(arg)
+            if isinstance(arg, DriveId):
+                return arg
+        return None
+
+    def run_on_thread(  # type: ignore
+        func: Optional[Callable[..., Any]] = None,
+        *,
+        priority: TaskPriority = TaskPriority.Configuration,
+        deadline: Optional[float] = None,
+    ) -> Callable[..., Any]:
         """
         Decorator that wraps a method to be passed to the MotionControllerThread. To use
         this decorator, an inner function should be included and returned in the
@@ -111,20 +333,39 @@ class MotionControllerService(QObject):
 
                 return on_thread
 
+        The priority and deadline of the task can be set with
+        `@run_on_thread(priority=TaskPriority.Control)`, see :meth:`run`.
 
         Args:
             func: function to be wrapped.
+            priority: priority of the task. Defaults to TaskPriority.Configuration.
+            deadline: maximum time in seconds the task can wait in the queue.
+                Defaults to None.
 
         Returns:
             Wrapped function.
         """
 
-        @wraps(func)
-        def wrap(self: "MotionControllerService", *args: Any, **kwargs: Any) -> None:
-            on_thread = func(self, *args, **kwargs)
-            self.run(args[0], on_thread, *args[1:], **kwargs)
+        def decorator(func: Callable[..., Any]) -> Callable[..., None]:
+            @wraps(func)
+            def wrap(
+                self: "MotionControllerService", *args: Any, **kwargs: Any
+            ) -> None:
+                on_thread = func(self, *args, **kwargs)
+                self.run(
+                    args[0],
+                    on_thread,
+                    *args[1:],
+                    priority=priority,
+                    deadline=deadline,
+                    **kwargs,
+                )
+
+            return wrap
 
-        return wrap
+        if func is None:
+            return decorator
+        return decorator(func)
 
     @run_on_thread
     def connect_drives(
@@ -135,6 +376,9 @@ class MotionControllerService(QObject):
         **kwargs: Any,
     ) -> Callable[..., Any]:
         """Connect drives to the program.
+        The drives are connected one after the other, then their configurations
+        are loaded at the same time. The progress of every drive is reported with
+        the connection_stage_update_triggered signal.
 
         Args:
             report_callback: callback to invoke after
@@ -142,81 +386,166 @@ class MotionControllerService(QObject):
             connection_model: model containing the application state.
 
         Raises:
-            ingenialink.exceptions.ILError: If the connection fails
+            ingenialink.exceptions.ILError: If the connection of any drive fails. The
+                error message reports the result of every drive.
         """
 
         def on_thread(
             connection_model: ConnectionModel,
         ) -> Any:
-            if (
-                not connection_model.left_dictionary
-                or not connection_model.right_dictionary
-            ):
+            if not all(connection_model.dictionaries.values()):
                 raise ILError("You need to select a dictionary for each drive.")
-            if (
-                connection_model.left_dictionary_type != connection_model.connection
-                or connection_model.right_dictionary_type != connection_model.connection
+            if any(
+                dictionary_type != connection_model.connection
+                for dictionary_type in connection_model.dictionary_types.values()
             ):
                 raise ILError("Communication type does not match the dictionary type.")
-            if connection_model.left_id == connection_model.right_id:
+            ids = [id for id in connection_model.ids.values() if id is not None]
+            if len(set(ids)) != len(ids):
                 raise ILError("Node IDs cannot be the same.")
-            for drive, id, config, dictionary in [
-                (
-                    Drive.Axis1,
-                    connection_model.left_id,
-                    connection_model.left_config,
-                    connection_model.left_dictionary,
-                ),
+            drives = [
                 (
-                    Drive.Axis2,
-                    connection_model.right_id,
-                    connection_model.right_config,
-                    connection_model.right_dictionary,
-                ),
-            ]:
-                if id is None:
-                    continue
-                if connection_model.connection == ConnectionProtocol.EtherCAT:
-                    self.__mc.communication.connect_servo_ethercat_interface_index(
-                        if_index=self.get_current_interface_index(
-                            connection_model.interface
-                        ),
-                        slave_id=id,
-                        dict_path=dictionary,
-                        alias=drive.name,
-                        servo_status_listener=True,
-                        net_status_listener=True,
-                    )
-                elif connection_model.connection == ConnectionProtocol.CANopen:
-                    self.__mc.communication.connect_servo_canopen(
-                        baudrate=connection_model.can_baudrate,
-                        can_device=stringify_can_device_enum(
-                            connection_model.can_device
-                        ),
-                        dict_path=dictionary,
-                        node_id=id,
-                        alias=drive.name,
-                        servo_status_listener=True,
-                        net_status_listener=True,
-                    )
-                else:
-                    raise ILError("Connection type not implemented.")
-
-                self.__mc.communication.subscribe_servo_status(
-                    partial(self.servo_status_callback, drive), drive.name
+                    drive,
+                    id,
+                    connection_model.configs[drive],
+                    str(connection_model.dictionaries[drive]),
+                )
+                for drive, id in connection_model.ids.items()
+                if id is not None
+            ]
+            errors: dict[DriveId, Exception] = {}
+            # Connect one drive at a time: the drives share the network, and
+            # ingenialink does not protect its creation from concurrent connections.
+            start_time = time.perf_counter()
+            for drive, id, _, dictionary in drives:
+                self.connection_stage_update_triggered.emit(
+                    drive, ConnectionStage.Connecting
                 )
-                self.__mc.communication.subscribe_net_status(
-                    partial(self.net_status_callback, drive), drive.name
+                try:
+                    self.__connect_drive(connection_model, drive, id, dictionary)
+                except TASK_EXCEPTIONS as e:
+                    errors[drive] = e
+            logger.info(
+                f"Connected {len(drives) - len(errors)} of {len(drives)} drives in"
+                f" {time.perf_counter() - start_time:.3f} s."
+            )
+            # Loading the configuration takes most of the time, so it is done for
+            # several drives at the same time.
+            configurations = {
+                drive: config
+                for drive, _, config, _ in drives
+                if drive not in errors and config is not None
+            }
+            with ThreadPoolExecutor(
+                max_workers=max(1, min(len(configurations), self.__worker_threads)),
+                thread_name_prefix="load_configuration",
+            ) as executor:
+                futures = {
+                    drive: executor.submit(self.__load_configuration, drive, config)
+                    for drive, config in configurations.items()
+                }
+            for drive, future in futures.items():
+                exception = future.exception()
+                if exception is not None:
+                    if not isinstance(exception, TASK_EXCEPTIONS):
+                        raise exception
+                    errors[drive] = exception
+            for drive, *_ in drives:
+                self.connection_stage_update_triggered.emit(
+                    drive,
+                    (
+                        ConnectionStage.Failed
+                        if drive in errors
+                        else ConnectionStage.Connected
+                    ),
                 )
-                if config is not None:
-                    self.__mc.configuration.load_configuration(
-                        config_path=config, servo=drive.name
+            if errors:
+                raise ILError(
+                    "\n".join(
+                        f"{drive.name}: "
+                        + (f"{errors[drive]}" if drive in errors else "connected.")
+                        for drive, *_ in drives
                     )
+                )
 
         return on_thread
 
+    def __connect_drive(
+        self,
+        connection_model: ConnectionModel,
+        drive: DriveId,
+        id: int,
+        dictionary: str,
+    ) -> None:
+        """Connect a drive and subscribe to its status. Must be called from a
+        MotionControllerThread.
+
+        Args:
+            connection_model: model containing the application state.
+            drive: the drive to connect.
+            id: the slave / node ID of the drive.
+            dictionary: path to the dictionary of the drive.
+
+        Raises:
+            ingenialink.exceptions.ILError: If the connection fails
+        """
+        start_time = time.perf_counter()
+        if connection_model.connection == ConnectionProtocol.EtherCAT:
+            self.__mc.communication.connect_servo_ethercat_interface_index(
+                if_index=self.get_current_interface_index(connection_model.interface),
+                slave_id=id,
+                dict_path=dictionary,
+                alias=drive.name,
+                servo_status_listener=True,
+                net_status_listener=True,
+            )
+        elif connection_model.connection == ConnectionProtocol.CANopen:
+            self.__mc.communication.connect_servo_canopen(
+                baudrate=connection_model.can_baudrate,
+                can_device=stringify_can_device_enum(connection_model.can_device),
+                dict_path=dictionary,
+                node_id=id,
+                alias=drive.name,
+                servo_status_listener=True,
+                net_status_listener=True,
+            )
+        else:
+            raise ILError("Connection type not implemented.")
+        # Connections with a dictionary that was used before in this session are warm.
+        warm = dictionary in self.__connected_dictionaries
+        self.__connected_dictionaries.add(dictionary)
+        logger.info(
+            f"{drive.name} connected in {time.perf_counter() - start_time:.3f} s"
+            f" ({'warm' if warm else 'cold'})."
+        )
+
+        try:
+            self.__error_indexes[drive] = self.dictionary_cache.get_error_index(
+                dictionary
+            )
+        except ILError as e:
+            # The errors are decoded by the drive instead.
+            logger.warning(f"Could not read the errors of {dictionary}: {e}")
+            self.__error_indexes.pop(drive, None)
+        self.__mc.communication.subscribe_servo_status(
+            partial(self.servo_status_callback, drive), drive.name
+        )
+        self.__mc.communication.subscribe_net_status(
+            partial(self.net_status_callback, drive), drive.name
+        )
+
+    def __load_configuration(self, drive: DriveId, config: str) -> None:
+        """Load a configuration file into a drive.
+
+        Args:
+            drive: the target drive.
+            config: path to the configuration file.
+        """
+        self.connection_stage_update_triggered.emit(drive, ConnectionStage.Configuring)
+        self.__mc.configuration.load_configuration(config_path=config, servo=drive.name)
+
     def servo_status_callback(
-        self, drive: Drive, state: SERVO_STATE, _: None, subnode: int
+        self, drive: DriveId, state: SERVO_STATE, _: None, subnode: int
     ) -> None:
         """Callback when the state of the drive changes
 
@@ -226,9 +555,11 @@ class MotionControllerService(QObject):
             _ (None): (unused)
             subnode: subnode, unused
         """
+        # The drive may have changed its registers, e.g. after a fault.
+        self.registers_cache.invalidate(servo=drive.name)
         self.servo_state_update_triggered.emit(drive, state)
 
-    def net_status_callback(self, drive: Drive, state: NET_DEV_EVT) -> None:
+    def net_status_callback(self, drive: DriveId, state: NET_DEV_EVT) -> None:
         """Callback when the state of the network changes
 
         Args:
@@ -260,14 +591,14 @@ class MotionControllerService(QObject):
         **kwargs: Any,
     ) -> Callable[..., list[int]]:
         """Scan for servos in the network.
+        On CANopen, the IDs found in the last scan of the same adapter are checked
+        first, and the whole network is only scanned if any of them does not answer.
 
         Args:
             report_callback: callback to invoke after
                 completing the operation.
-            base_model: Contains information about the connection
-            minimum_nodes: the minimum number of nodes we expect to find (e.g.
-                installing firmware only requires one, while connect to drives needs
-                two).
+            base_model: Contains information about the connection. At least one
+                node per drive of its collection is expected.
 
         Raises:
             ingenialink.exceptions.ILError: If we find less than the expected number of
@@ -278,35 +609,54 @@ class MotionControllerService(QObject):
         """
 
         def on_thread(base_model: BaseModel) -> list[int]:
+            if base_model.connection == ConnectionProtocol.CANopen:
+                adapter = (
+                    f"{base_model.connection.name}/{base_model.can_device.name}"
+                    f"/{base_model.can_baudrate.name}"
+                )
+            elif base_model.connection == ConnectionProtocol.EtherCAT:
+                adapter = f"{base_model.connection.name}/{base_model.interface}"
+            else:
+                raise ILError("Connection type not implemented.")
+            # Usually the same drives are found again: check the IDs that were found
+            # last time before scanning the whole network.
+            cached_ids = self.topology_cache.get(adapter)
+            if (
+                len(cached_ids) >= len(base_model.drives)
+                and base_model.connection == ConnectionProtocol.CANopen
+                and check_canopen_nodes(base_model, cached_ids, self.__mc.net.values())
+            ):
+                return cached_ids
             if base_model.connection == ConnectionProtocol.CANopen:
                 result = self.__mc.communication.scan_servos_canopen(
                     can_device=stringify_can_device_enum(base_model.can_device),
                     baudrate=base_model.can_baudrate,
                 )
-            elif base_model.connection == ConnectionProtocol.EtherCAT:
+            else:
                 result = self.__mc.communication.scan_servos_ethercat_interface_index(
                     self.get_current_interface_index(base_model.interface)
                 )
-            else:
-                raise ILError("Connection type not implemented.")
-            if len(result) < EXPECTED_NODE_NR_SCAN:
+            self.topology_cache.put(adapter, result)
+            if len(result) < len(base_model.drives):
                 nodes_found = result if len(result) > 0 else "(none)"
                 raise ILError(
-                    f"Scan expected to find at least {EXPECTED_NODE_NR_SCAN} nodes. "
+                    f"Scan expected to find at least {len(base_model.drives)} nodes. "
                     + f"Nodes found: {nodes_found}"
                 )
             return result
 
         return on_thread
 
-    @run_on_thread
     def disconnect_drives(
         self,
         report_callback: Callable[[thread_report], Any],
         *args: Any,
         **kwargs: Any,
-    ) -> Callable[..., Any]:
+    ) -> None:
         """Disconnect the drives if they are connected.
+        The tasks that are waiting in the queues are cancelled, as they would fail
+        against the disconnected drives, and the drives are disconnected once no
+        task is being executed (see :meth:`run_exclusively`).
 
         Args:
             report_callback: callback to invoke after
@@ -319,30 +669,118 @@ class MotionControllerService(QObject):
                     self.__mc.motion.motor_disable(servo=servo)
                     self.stop_poller_thread(servo)
                     self.__mc.communication.disconnect(servo=servo)
+                self.registers_cache.invalidate(servo=servo)
+            self.__error_indexes.clear()
 
-        return on_thread
+        self.run_exclusively(report_callback, on_thread, cancel_pending_tasks=True)
 
-    @run_on_thread
     def emergency_stop(
         self,
         report_callback: Callable[[thread_report], Any],
         *args: Any,
         **kwargs: Any,
-    ) -> Callable[..., Any]:
+    ) -> None:
         """Disable the motors of the drives that are connected.
+        The tasks that are waiting in the queues are cancelled, so no queued
+        command, e.g. enabling a motor, is executed after the emergency stop. The
+        motors are disabled by the worker of each drive as soon as it finishes the
+        task it is executing, without waiting for the other threads, e.g. for a
+        connection or a firmware installation on the general purpose thread.
 
         Args:
             report_callback: callback to invoke after
-                completing the operation.
+                completing the operation, i.e. once every worker disabled the
+                motors of its drives.
         """
+        for thread in self.__threads:
+            thread.cancel_pending_tasks()
+        pending_workers = len(self.__workers)
 
-        def on_thread() -> Any:
-            for servo in self.__mc.servos:
+        def on_motors_disabled(report: thread_report) -> None:
+            nonlocal pending_workers
+            pending_workers -= 1
+            if pending_workers == 0:
+                report_callback(report)
+
+        def on_thread(worker: MotionControllerThread) -> Any:
+            for servo in list(self.__mc.servos):
+                if self.__get_thread(DriveId.from_alias(servo)) is not worker:
+                    continue
                 if self.__mc.is_alive(servo):
                     self.__mc.motion.motor_disable(servo=servo)
                     self.stop_poller_thread(servo)
 
-        return on_thread
+        for worker in self.__workers:
+            worker.add_task(
+                motion_controller_task(
+                    action=on_thread,
+                    callback=on_motors_disabled,
+                    args=(worker,),
+                    kwargs={},
+                    priority=TaskPriority.Control,
+                )
+            )
+
+    def run_exclusively(
+        self,
+        report_callback: Callable[[thread_report], Any],
+        action: Callable[[], Any],
+        cancel_pending_tasks: bool = False,
+    ) -> None:
+        """Run a task on the general purpose thread while no worker executes a task.
+        Every worker finishes the task it is executing and then waits until the
+        task has been executed, so it is ordered against the tasks of all the
+        drives. If a worker does not finish its task in time, the task is executed
+        anyway.
+
+        Args:
+            report_callback: callback to invoke after completing the operation.
+            action: the task to run.
+            cancel_pending_tasks: cancel the tasks that are waiting in the queues
+                of every thread first. Defaults to False.
+        """
+        if cancel_pending_tasks:
+            for thread in self.__threads:
+                thread.cancel_pending_tasks()
+        workers_waiting = threading.Barrier(len(self.__workers) + 1)
+        released = threading.Event()
+
+        def wait_for_task() -> None:
+            try:
+                workers_waiting.wait(EXCLUSIVE_TASK_TIMEOUT)
+            except threading.BrokenBarrierError:
+                return
+            released.wait()
+
+        def run_task() -> Any:
+            try:
+                workers_waiting.wait(EXCLUSIVE_TASK_TIMEOUT)
+            except threading.BrokenBarrierError:
+                logger.warning("The workers are busy, running the task anyway.")
+            try:
+                return action()
+            finally:
+                released.set()
+
+        for worker in self.__workers:
+            worker.add_task(
+                motion_controller_task(
+                    action=wait_for_task,
+                    callback=lambda report: None,
+                    args=(),
+                    kwargs={},
+                    priority=TaskPriority.Control,
+                )
+            )
+        self.__general_thread.add_task(
+            motion_controller_task(
+                action=run_task,
+                callback=report_callback,
+                args=(),
+                kwargs={},
+                priority=TaskPriority.Control,
+            )
+        )
 
     @Slot()
     def execute_callback(
@@ -358,46 +796,152 @@ class MotionControllerService(QObject):
         """
         callback(thread_report)
 
-    def create_poller_thread(
+    def subscribe_registers(
         self,
         alias: str,
         registers: list[dict[str, Union[int, str]]],
+        callback: Callable[..., Any],
         sampling_time: float = 0.125,
         refresh_time: float = 0.125,
-        buffer_size: int = 100,
-    ) -> PollerThread:
-        """Create an instance of the PollerThread.
+    ) -> int:
+        """Subscribe to a set of registers of a drive. All the subscriptions to the
+        drives of a network share the same poller, see
+        :class:`~services.telemetry_service.TelemetryService`.
 
         Args:
-            alias:  Drive alias.
-            registers: Register to be read.
+            alias: DriveId alias.
+            registers: Registers to be read.
+            callback: receives the timestamps and the values (one row per register)
+                of every polled batch.
             sampling_time: Poller sampling time. Defaults to 0.125.
             refresh_time: Poller refresh period. Defaults to 0.125.
-            buffer_size: Poller buffer size. Defaults to 100.
 
         Returns:
-            PollerThread: the newly created PollerThread
+            int: the subscription ID, needed to unsubscribe.
         """
-        self.__poller_threads[alias] = PollerThread(
-            self.__mc,
+        return self.telemetry.subscribe(
             alias,
             registers,
+            callback,
             sampling_time=sampling_time,
             refresh_time=refresh_time,
-            buffer_size=buffer_size,
         )
-        return self.__poller_threads[alias]
+
+    def unsubscribe_registers(self, subscription_id: int) -> None:
+        """Cancel a subscription to the registers of a drive.
+
+        Args:
+            subscription_id: the ID returned by :meth:`subscribe_registers`.
+        """
+        self.telemetry.unsubscribe(subscription_id)
+
+    def start_monitoring(
+        self,
+        alias: str,
+        registers: list[dict[str, Union[int, str]]],
+        callback: Callable[..., Any],
+        prescaler: int = 1,
+        block_duration: float = 0.1,
+    ) -> int:
+        """Capture a set of registers of a drive at a high rate with its monitoring
+        buffer, as an alternative to :meth:`subscribe_registers`, see
+        :class:`~services.monitoring_thread.MonitoringThread`.
+
+        Args:
+            alias: DriveId alias.
+            registers: Registers to be captured.
+            callback: receives the timestamps and the values (one row per register)
+                of every block.
+            prescaler: the sampling rate is the position & velocity loop rate of
+                the drive divided by the prescaler. Defaults to 1.
+            block_duration: duration of every block, in seconds. Defaults to 0.1.
+
+        Raises:
+            ingeniamotion.exceptions.IMException: If the drive is already being
+                captured.
+
+        Returns:
+            int: the capture ID, needed to stop it.
+        """
+        return self.telemetry.start_monitoring(
+            alias,
+            registers,
+            callback,
+            prescaler=prescaler,
+            block_duration=block_duration,
+        )
+
+    def stop_monitoring(self, monitoring_id: int) -> None:
+        """Stop a capture of the registers of a drive.
+
+        Args:
+            monitoring_id: the ID returned by :meth:`start_monitoring`.
+        """
+        self.telemetry.stop_monitoring(monitoring_id)
 
     def stop_poller_thread(self, alias: str) -> None:
-        """Stop the poller thread for the given drive."""
-        if alias in self.__poller_threads and self.__poller_threads[alias].isRunning():
-            self.disconnect(self.__poller_threads[alias])
-            self.__poller_threads[alias].stop()
-            self.__poller_threads[alias].quit()
+        """Stop the poller thread for the given drive, cancelling all the
+        subscriptions to its registers and stopping its recordings."""
+        self.telemetry.unsubscribe_drive(alias)
+        for subscription_id, recorder in list(self.__recorders.items()):
+            if recorder.drive == alias:
+                self.stop_recording(subscription_id)
+
+    def start_recording(
+        self,
+        alias: str,
+        registers: list[dict[str, Union[int, str]]],
+        path: str,
+        sampling_time: float = 0.125,
+    ) -> int:
+        """Record registers of a drive to a file, see
+        :class:`~services.recorder_thread.RecorderThread`.
+
+        Args:
+            alias: DriveId alias.
+            registers: Registers to be recorded.
+            path: the file to record to. It is overwritten if it exists.
+            sampling_time: Poller sampling time. Defaults to 0.125.
+
+        Raises:
+            OSError: If the file can not be created.
+
+        Returns:
+            int: the recording ID, needed to stop the recording.
+        """
+        recorder = RecorderThread(path, alias, registers)
+        recorder.start()
+        subscription_id = self.subscribe_registers(
+            alias, registers, recorder.record, sampling_time=sampling_time
+        )
+        self.__recorders[subscription_id] = recorder
+        return subscription_id
+
+    def stop_recording(self, recording_id: int) -> None:
+        """Stop a recording. The data that was already polled is still written to
+        the file.
+
+        Args:
+            recording_id: the ID returned by :meth:`start_recording`.
+        """
+        self.unsubscribe_registers(recording_id)
+        recorder = self.__recorders.pop(recording_id, None)
+        if recorder is not None:
+            recorder.stop()
+            recorder.wait()
+            logger.info(
+                f"Recorded {recorder.recorded_samples} samples to {recorder.path}."
+            )
+
+    def stop_recordings(self) -> None:
+        """Stop every recording."""
+        for recording_id in list(self.__recorders):
+            self.stop_recording(recording_id)
 
     def check_dictionary_format(self, filepath: str) -> ConnectionProtocol:
         """Identifies if the provided dictionary file is for CANopen or
-        ETHERcat connections.
+        ETHERcat connections. Only the beginning of the file is read, and the result
+        is cached until the file changes.
 
         Args:
             filepath: path to the file to check
@@ -409,13 +953,9 @@ class MotionControllerService(QObject):
         Returns:
             utils.enums.ConnectionProtocol: The connection type the file is meant for.
         """
-        tree = ET.parse(filepath)
-        parsed_data = tree.getroot()
-
-        device = parsed_data.find(DEVICE_NODE)
-        if not isinstance(device, ET.Element):
-            raise ILError("Invalid file format")
-        interface = device.attrib["Interface"]
+        interface = self.dictionary_cache.get_device_attributes(filepath).get(
+            "Interface"
+        )
         if interface == INTERFACE_CAN:
             return ConnectionProtocol.CANopen
         elif interface == INTERFACE_ETH:
@@ -423,11 +963,50 @@ class MotionControllerService(QObject):
         else:
             raise ILError("Connection type not supported.")
 
-    @run_on_thread
+    @run_on_thread(priority=TaskPriority.Diagnostics)
+    def load_error_index(
+        self,
+        report_callback: Callable[[thread_report], Any],
+        filepath: str,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Callable[..., Any]:
+        """Read the errors defined in a dictionary in the background, so they are
+        already cached when a drive that uses it is connected.
+
+        Args:
+            report_callback: callback to invoke after
+                completing the operation.
+            filepath: path to the dictionary.
+
+        """
+
+        def on_thread(filepath: str) -> Any:
+            return len(self.dictionary_cache.get_error_index(filepath))
+
+        return on_thread
+
+    def describe_error(self, drive: DriveId, code: int) -> Optional[error_description]:
+        """Look up an error code in the dictionary of a connected drive, without
+        accessing the drive.
+
+        Args:
+            drive: the drive.
+            code: the error code, as read from the error buffer of the drive.
+
+        Returns:
+            The definition of the error, None if it is not in the dictionary.
+        """
+        error_index = self.__error_indexes.get(drive)
+        if error_index is None:
+            return None
+        return error_index.get(code & Errors.ERROR_CODE_BITS)
+
+    @run_on_thread(priority=TaskPriority.Control)
     def enable_motor(
         self,
         report_callback: Callable[[thread_report], Any],
-        drive: Drive,
+        drive: DriveId,
         *args: Any,
         **kwargs: Any,
     ) -> Callable[..., Any]:
@@ -439,7 +1018,7 @@ class MotionControllerService(QObject):
             drive: the drive to enable
         """
 
-        def on_thread(drive: Drive) -> Any:
+        def on_thread(drive: DriveId) -> Any:
             self.__mc.motion.set_operation_mode(
                 OperationMode.PROFILE_VELOCITY, servo=drive.name
             )
@@ -448,11 +1027,13 @@ class MotionControllerService(QObject):
         return on_thread
 
     def stop_motion_controller_thread(self) -> None:
-        """Stops the MotionControllerThread that was created upon initialization."""
-        self.disconnect(self.__motion_controller_thread)
-        self.__motion_controller_thread.stop()
-        self.__motion_controller_thread.quit()
-        self.__motion_controller_thread.wait()
+        """Stops the MotionControllerThreads that were created upon initialization."""
+        for thread in self.__threads:
+            self.disconnect(thread)
+            thread.stop()
+            thread.quit()
+        for thread in self.__threads:
+            thread.wait()
 
     @run_on_thread
     def install_firmware(
@@ -461,74 +1042,282 @@ class MotionControllerService(QObject):
         progress_callback: Callable[[int], Any],
         bootloader_model: BootloaderModel,
         firmware: str,
-        left_id: int,
-        right_id: int,
+        node_ids: list[int],
         *args: Any,
         **kwargs: Any,
     ) -> Callable[..., Any]:
-        """Install firmware to a given drive.
+        """Install firmware to the given drives.
+        On CANopen, the drives are connected and ingeniamotion updates every drive
+        the firmware file is for.
+        On EtherCAT, the slaves are updated one after the other and the stage of
+        every slave is reported with the firmware_stage_update_triggered signal.
 
         Args:
             report_callback: callback to invoke after completing the operation.
             progress_callback: callback for when the installation progress updates.
             bootloader_model: the model with the application state.
             firmware: the file containing the firmware.
-            left_id: the node id of the left drive.
-            right_id: the node id of the right drive.
+            node_ids: the node / slave IDs of the drives.
+
+        Raises:
+            ingenialink.exceptions.ILError: If the firmware can not be installed to
+                the drives (see :meth:`check_firmware`), or if the installation of
+                any EtherCAT slave fails. The error message reports the result of
+                every slave.
         """
 
         def on_thread(
             progress_callback: Callable[[int], Any],
             bootloader_model: BootloaderModel,
             firmware: str,
-            left_id: int,
-            right_id: int,
+            node_ids: list[int],
         ) -> Any:
+            # Usually already checked when the firmware was selected.
+            self.firmware_cache.check_image(
+                firmware, bootloader_model.connection, node_ids
+            )
             if bootloader_model.connection == ConnectionProtocol.CANopen:
-                self.__mc.communication.connect_servo_canopen(
-                    baudrate=bootloader_model.can_baudrate,
-                    can_device=stringify_can_device_enum(bootloader_model.can_device),
-                    dict_path=DEFAULT_DICTIONARY_PATH,
-                    node_id=left_id,
-                    alias=Drive.Axis1.name,
-                )
-                self.__mc.communication.connect_servo_canopen(
-                    baudrate=bootloader_model.can_baudrate,
-                    can_device=stringify_can_device_enum(bootloader_model.can_device),
-                    dict_path=DEFAULT_DICTIONARY_PATH,
-                    node_id=right_id,
-                    alias=Drive.Axis2.name,
-                )
-                # We pass one of the two drive aliases to the function. It should
-                # automatically detect that we have a two drive setup based on the
-                # firmware file type and update both drives.
+                drives = DriveId.axes(len(node_ids))
+                for drive, node_id in zip(drives, node_ids):
+                    self.__mc.communication.connect_servo_canopen(
+                        baudrate=bootloader_model.can_baudrate,
+                        can_device=stringify_can_device_enum(
+                            bootloader_model.can_device
+                        ),
+                        dict_path=DEFAULT_DICTIONARY_PATH,
+                        node_id=node_id,
+                        alias=drive.name,
+                    )
+                # We pass the alias of the first drive to the function. It should
+                # automatically detect that we have a multi drive setup based on the
+                # firmware file type and update all the drives.
                 self.__mc.communication.load_firmware_canopen(
-                    servo=Drive.Axis1.name,
+                    servo=drives[0].name,
                     fw_file=firmware,
                     progress_callback=progress_callback,
                 )
-                self.__mc.communication.disconnect(servo=Drive.Axis1.name)
-                self.__mc.communication.disconnect(servo=Drive.Axis2.name)
+                for drive in drives:
+                    self.__mc.communication.disconnect(servo=drive.name)
             elif bootloader_model.connection == ConnectionProtocol.EtherCAT:
-                self.__mc.communication.load_firmware_ecat_interface_index(
-                    fw_file=firmware,
-                    if_index=self.get_current_interface_index(
-                        bootloader_model.interface
-                    ),
-                    slave=left_id,
+                self.__install_firmware_ecat(
+                    progress_callback, bootloader_model, firmware, node_ids
                 )
 
         return on_thread
 
-    @run_on_thread
-    def set_max_velocity(
+    @run_on_thread(priority=TaskPriority.Diagnostics)
+    def check_firmware(
         self,
         report_callback: Callable[[thread_report], Any],
-        drive: Drive,
-        max_velocity: float,
+        firmware: str,
+        connection: ConnectionProtocol,
+        node_ids: list[int],
         *args: Any,
         **kwargs: Any,
     ) -> Callable[..., Any]:
+        """Parse a firmware file and verify its checksums in the background, and
+        check that it can be installed to the given drives, so a wrong or damaged
+        file is found before the installation starts. The parsed file is cached by
+        the hash of its contents, so installing it again only requires hashing it.
+
+        Args:
+            report_callback: callback to invoke after completing the operation.
+            firmware: the file containing the firmware.
+            connection: the protocol the drives are updated with.
+            node_ids: the node / slave IDs of the drives.
+
+        Raises:
+            FileNotFoundError: If the file was not found.
+            ingenialink.exceptions.ILError: If the file is not a firmware file, it is
+                truncated or corrupt, it can not be installed with the protocol or
+                it is for more drives than the given ones.
+
+        Returns:
+            utils.types.firmware_image: the parsed firmware file.
+        """
+
+        def on_thread(
+            firmware: str, connection: ConnectionProtocol, node_ids: list[int]
+        ) -> Any:
+            return self.firmware_cache.check_image(firmware, connection, node_ids)
+
+        return on_thread
+
+    def __install_firmware_ecat(
+        self,
+        progress_callback: Callable[[int], Any],
+        bootloader_model: BootloaderModel,
+        firmware: str,
+        slaves: list[int],
+    ) -> None:
+        """Install firmware to a list of EtherCAT slaves. Must be called from a
+        MotionControllerThread.
+        Every FoE transfer opens its own master on the interface, so the slaves of
+        one interface can not be updated at the same time. They are updated one
+        after the other in a single task, and a failure does not stop the next
+        slaves. An ensemble (.zfu) firmware is installed to all the slaves of an
+        ensemble at once, so it is loaded once per group of consecutive slaves,
+        through the first slave of the group; the firmware was checked before, so
+        the slaves make complete ensembles. The stage of every slave is reported
+        with the firmware_stage_update_triggered signal, and the progress covers
+        the whole list.
+
+        Args:
+            progress_callback: callback for when the installation progress updates.
+            bootloader_model: the model with the application state.
+            firmware: the file containing the firmware.
+            slaves: the slave IDs.
+
+        Raises:
+            ingenialink.exceptions.ILError: If the installation of any slave fails.
+                The error message reports the result of every slave.
+        """
+        if_index = self.get_current_interface_index(bootloader_model.interface)
+        image = self.firmware_cache.get_image(firmware)
+        for slave in slaves:
+            self.firmware_stage_update_triggered.emit(slave, FirmwareStage.Pending)
+        errors: dict[int, Exception] = {}
+        installed = 0
+        for group in ensemble_groups(image, slaves):
+            for slave in group:
+                self.firmware_stage_update_triggered.emit(
+                    slave, FirmwareStage.Installing
+                )
+            try:
+                self.__mc.communication.load_firmware_ecat_interface_index(
+                    fw_file=firmware, if_index=if_index, slave=group[0]
+                )
+            except TASK_EXCEPTIONS as e:
+                errors.update((slave, e) for slave in group)
+            for slave in group:
+                self.firmware_stage_update_triggered.emit(
+                    slave,
+                    (
+                        FirmwareStage.Failed
+                        if slave in errors
+                        else FirmwareStage.Installed
+                    ),
+                )
+            installed += len(group)
+            progress_callback(installed * 100 // len(slaves))
+        if errors:
+            raise ILError(
+                "\n".join(
+                    f"Slave {slave}: "
+                    + (f"{errors[slave]}" if slave in errors else "installed.")
+                    for slave in slaves
+                )
+            )
+
+    def set_velocity(
+        self,
+        report_callback: Callable[[thread_report], Any],
+        drive: DriveId,
+        velocity: float,
+    ) -> None:
+        """Set the target velocity of a given drive.
+        Setpoints are coalesced: if a previous setpoint of the drive has not been
+        sent yet, it is replaced, so only the newest one reaches the drive. The
+        newest setpoint is never dropped, however long it waits.
+        If the velocity of the drive is exchanged through PDOs (see
+        :meth:`start_process_data`), the setpoint is sent in the next PDO cycle
+        instead.
+
+        Args:
+            report_callback: callback to invoke after
+                completing the operation.
+            drive: the target drive.
+            velocity: the target velocity.
+        """
+        if self.process_data.is_active and drive.name in self.process_data.drives:
+            self.process_data.set_velocity(drive.name, velocity)
+            self.__get_thread(drive).task_completed.emit(
+                report_callback,
+                thread_report(
+                    drive,
+                    getattr(report_callback, "__qualname__", ""),
+                    None,
+                    time.time(),
+                    0,
+                    None,
+                ),
+            )
+            return
+        self.run(
+            report_callback,
+            "motion.set_velocity",
+            velocity,
+            servo=drive.name,
+            priority=TaskPriority.Control,
+            coalesce_key=(drive, "motion.set_velocity"),
+        )
+
+    def start_process_data(
+        self,
+        report_callback: Callable[[thread_report], Any],
+        drives: list[DriveId],
+        refresh_rate: float = DEFAULT_REFRESH_RATE,
+    ) -> None:
+        """Start exchanging the velocity setpoints and the velocity feedback of
+        some drives through cyclic PDOs, see
+        :class:`~services.process_data_service.ProcessDataService`. The velocity
+        subscriptions of the drives are then served from the received PDOs.
+        Only drives connected through EtherCAT support PDOs.
+
+        Args:
+            report_callback: callback to invoke after
+                completing the operation.
+            drives: the drives.
+            refresh_rate: PDO cycle time, in seconds. Defaults to 0.01.
+        """
+
+        def on_started(report: thread_report) -> None:
+            for drive in drives:
+                self.telemetry.refresh_drive(drive.name)
+            report_callback(report)
+
+        self.run(
+            on_started,
+            self.process_data.start,
+            [drive.name for drive in drives],
+            refresh_rate=refresh_rate,
+            priority=TaskPriority.Control,
+        )
+
+    def stop_process_data(
+        self, report_callback: Callable[[thread_report], Any]
+    ) -> None:
+        """Stop exchanging PDOs. The subscriptions of the drives are polled again.
+
+        Args:
+            report_callback: callback to invoke after
+                completing the operation.
+        """
+        drives = self.process_data.drives
+
+        def on_stopped(report: thread_report) -> None:
+            for drive in drives:
+                self.telemetry.refresh_drive(drive)
+            report_callback(report)
+
+        self.run(on_stopped, self.process_data.stop, priority=TaskPriority.Control)
+
+    def __process_data_errored(self, exception: Exception) -> None:
+        """Report that the PDO exchange stopped because of an error.
+
+        Args:
+            exception: the error.
+        """
+        self.error_triggered.emit(
+            thread_report(None, "ProcessDataService", None, time.time(), 0, exception)
+        )
+
+    def set_max_velocity(
+        self,
+        report_callback: Callable[[thread_report], Any],
+        drive: DriveId,
+        max_velocity: float,
+    ) -> None:
         """Set the maximum velocity of the given drive. There are two registers that
         have an effect on this property - we are simply setting them both to the given
         value to keep things simple in this application.
@@ -540,48 +1329,236 @@ class MotionControllerService(QObject):
             max_velocity: the new maximum velocity.
 
         """
+        self.set_registers(
+            report_callback,
+            [
+                register_write(drive, MAX_VELOCITY_REGISTER, max_velocity),
+                register_write(drive, MAX_PROFILER_VELOCITY_REGISTER, max_velocity),
+            ],
+            priority=TaskPriority.Control,
+        )
+
+    def set_registers(
+        self,
+        report_callback: Callable[[thread_report], Any],
+        writes: list[register_write],
+        priority: TaskPriority = TaskPriority.Configuration,
+    ) -> None:
+        """Write a batch of registers. The writes to each drive are executed as a
+        single task on the thread of that drive, back to back and in order, so a
+        batch only takes one queue slot per drive. Every write is attempted even if
+        a previous one failed.
+        Once all the writes are done, a single report is sent back. Its output is
+        the list of writes, each with the exception it raised, if any. If any write
+        failed, the report is emitted with the error_triggered signal instead, and
+        its exception is the first one raised.
 
-        def on_thread(drive: Drive, max_velocity: float) -> Any:
-            self.__mc.communication.set_register(
-                MAX_VELOCITY_REGISTER, max_velocity, drive.name
+        Args:
+            report_callback: callback to invoke after
+                completing the operation.
+            writes: the registers to write.
+            priority: priority of the tasks. Defaults to TaskPriority.Configuration.
+
+        Raises:
+            ValueError: If there are no registers to write.
+        """
+        if not writes:
+            raise ValueError("There are no registers to write.")
+        batches: dict[DriveId, list[register_write]] = {}
+        for write in writes:
+            batches.setdefault(write.drive, []).append(write)
+        reports: list[thread_report] = []
+
+        def on_batch_written(report: thread_report) -> None:
+            reports.append(report)
+            if len(reports) < len(batches):
+                return
+            exceptions = [
+                write.exception for write in writes if write.exception is not None
+            ]
+            end = max(report.timestamp + report.duration for report in reports)
+            timestamp = min(report.timestamp for report in reports)
+            # Name the report after the callback of the caller.
+            callback = getattr(report_callback, "func", report_callback)
+            consolidated_report = thread_report(
+                writes[0].drive if len(batches) == 1 else None,
+                callback.__qualname__,
+                writes,
+                timestamp,
+                end - timestamp,
+                exceptions[0] if exceptions else None,
             )
-            self.__mc.communication.set_register(
-                MAX_PROFILER_VELOCITY_REGISTER, max_velocity, drive.name
+            if exceptions:
+                logger.error(consolidated_report)
+                self.error_triggered.emit(consolidated_report)
+            else:
+                report_callback(consolidated_report)
+
+        for drive, batch in batches.items():
+            self.run(
+                on_batch_written,
+                self.__write_registers,
+                drive,
+                batch,
+                priority=priority,
             )
 
+    @run_on_thread
+    def get_register(
+        self,
+        report_callback: Callable[[thread_report], Any],
+        drive: DriveId,
+        register: str,
+        axis: int = 1,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Callable[..., Any]:
+        """Read a register of a given drive. The value of a configuration or limit
+        register (see REGISTER_CACHE_TTLS) is served from the registers_cache if it
+        has not expired, otherwise it is read from the drive and cached. Other
+        registers are always read from the drive.
+
+        Args:
+            report_callback: callback to invoke after
+                completing the operation.
+            drive: the target drive.
+            register: the register UID.
+            axis: the axis of the register. Defaults to 1.
+
+        """
+
+        def on_thread(
+            drive: DriveId, register: str, axis: int = 1
+        ) -> Optional[register_value]:
+            value = self.registers_cache.get(drive.name, axis, register)
+            if value is None:
+                value = self.__mc.communication.get_register(
+                    register, servo=drive.name, axis=axis
+                )
+                if value is not None:
+                    self.registers_cache.put(drive.name, axis, register, value)
+            return value
+
         return on_thread
 
     @run_on_thread
-    def get_last_error_message(
+    def set_register(
         self,
         report_callback: Callable[[thread_report], Any],
-        drive: Drive,
+        drive: DriveId,
+        register: str,
+        value: register_value,
+        axis: int = 1,
         *args: Any,
         **kwargs: Any,
     ) -> Callable[..., Any]:
-        """Get the last error of a given drive.
+        """Write a register of a given drive. The cached value of the register is
+        invalidated.
 
         Args:
             report_callback: callback to invoke after
                 completing the operation.
             drive: the target drive.
+            register: the register UID.
+            value: the new value.
+            axis: the axis of the register. Defaults to 1.
 
         """
 
-        def on_thread(drive: Drive) -> Any:
-            error_code, *_ = self.__mc.errors.get_last_buffer_error(servo=drive.name)
-            *_, error_msg = self.__mc.errors.get_error_data(
-                error_code, servo=drive.name
-            )
-            return error_msg
+        def on_thread(
+            drive: DriveId, register: str, value: register_value, axis: int = 1
+        ) -> Any:
+            self.__write_register(drive, register, value, axis)
 
         return on_thread
 
-    @run_on_thread
+    def __write_registers(self, drive: DriveId, writes: list[register_write]) -> None:
+        """Write a batch of registers of a drive, storing in every write the
+        exception it raised, if any. Must be called from a MotionControllerThread.
+
+        Args:
+            drive: the target drive.
+            writes: the registers to write.
+        """
+        for write in writes:
+            try:
+                self.__write_register(drive, write.register, write.value, write.axis)
+            except TASK_EXCEPTIONS as e:
+                write.exception = e
+
+    def __write_register(
+        self, drive: DriveId, register: str, value: register_value, axis: int = 1
+    ) -> None:
+        """Write a register and invalidate its cached value. Must be called from a
+        MotionControllerThread.
+
+        Args:
+            drive: the target drive.
+            register: the register UID.
+            value: the new value.
+            axis: the axis of the register. Defaults to 1.
+        """
+        try:
+            self.__mc.communication.set_register(register, value, drive.name, axis)
+        finally:
+            # Even a failed write may have changed the value.
+            self.registers_cache.invalidate(drive.name, axis, register)
+
+    @run_on_thread(priority=TaskPriority.Diagnostics, deadline=ERROR_SNAPSHOT_DEADLINE)
+    def get_error_snapshot(
+        self,
+        report_callback: Callable[[thread_report], Any],
+        drive: DriveId,
+        known_errors: int,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Callable[..., Any]:
+        """Get the number of errors of a given drive and every error that is newer
+        than the known ones, in a single task. Errors that occur together are all
+        reported, instead of only the last one.
+        The output of the report is an :class:`~utils.types.error_snapshot`.
+        A snapshot that waited for more than ERROR_SNAPSHOT_DEADLINE is dropped.
+
+        Args:
+            report_callback: callback to invoke after
+                completing the operation.
+            drive: the target drive.
+            known_errors: the number of errors of the drive that were already
+                read. If the drive has fewer errors, e.g. because it was restarted,
+                all its errors are read.
+
+        """
+
+        def on_thread(drive: DriveId, known_errors: int) -> error_snapshot:
+            count = self.__mc.errors.get_number_total_errors(servo=drive.name)
+            new_errors = count - known_errors if count >= known_errors else count
+            # Only the newest errors are kept in the buffer, the newest at index 0.
+            errors = []
+            for index in reversed(range(min(new_errors, Errors.MAXIMUM_ERROR_INDEX))):
+                code, subnode, is_warning = self.__mc.errors.get_buffer_error_by_index(
+                    index, servo=drive.name
+                )
+                indexed_error = self.describe_error(drive, code)
+                if indexed_error is not None:
+                    description = indexed_error.description
+                else:
+                    try:
+                        *_, description = self.__mc.errors.get_error_data(
+                            code, servo=drive.name
+                        )
+                    except KeyError:
+                        # Not in the dictionary, e.g. a newer firmware.
+                        description = f"Unknown error 0x{code:08X}."
+                errors.append(drive_error(code, subnode, is_warning, description))
+            return error_snapshot(count, errors)
+
+        return on_thread
+
+    @run_on_thread(priority=TaskPriority.Diagnostics)
     def get_number_of_errors(
         self,
         report_callback: Callable[[thread_report], Any],
-        drive: Drive,
+        drive: DriveId,
         *args: Any,
         **kwargs: Any,
     ) -> Callable[..., Any]:
@@ -594,10 +1571,64 @@ class MotionControllerService(QObject):
 
         """
 
-        def on_thread(drive: Drive) -> Any:
+        def on_thread(drive: DriveId) -> Any:
             num_current_errors = self.__mc.errors.get_number_total_errors(
                 servo=drive.name
             )
             return num_current_errors
 
         return on_thread
+
+
+def check_canopen_nodes(
+    base_model: BaseModel, node_ids: list[int], networks: Iterable[Any]
+) -> bool:
+    """Check that the given nodes answer in a CANopen network, without scanning
+    the whole network: the device type of every node is read with a single SDO
+    request.
+    The check opens its own bus on the channel. Some devices (e.g. PCAN) do not
+    allow two handles on one channel, so the nodes are not checked while any
+    CANopen network of the MotionController holds a connection.
+
+    Args:
+        base_model: Contains information about the connection
+        node_ids: the nodes to check.
+        networks: the networks of the MotionController.
+
+    Returns:
+        True if every node answered, False otherwise.
+    """
+    if any(
+        isinstance(net, CanopenNetwork)
+        and (len(net.servos) > 0 or net._connection is not None)
+        for net in networks
+    ):
+        return False
+    can_device = stringify_can_device_enum(base_model.can_device).value
+    connection_args: dict[str, Any] = {
+        "interface": can_device,
+        "channel": CAN_CHANNELS[can_device][CANOPEN_CHANNEL],
+        "bitrate": base_model.can_baudrate.value,
+    }
+    if can_device == CAN_DEVICE.PCAN.value:
+        connection_args["auto_reset"] = True
+    network = canopen.Network()
+    try:
+        network.connect(**connection_args)
+    except (can.CanError, ILError, OSError) as e:
+        logger.warning(f"Could not check the nodes {node_ids}: {e}")
+        return False
+    try:
+        for node_id in node_ids:
+            node = network.add_node(node_id)
+            node.sdo.RESPONSE_TIMEOUT = CANOPEN_PING_TIMEOUT
+            node.sdo.upload(CANOPEN_DEVICE_TYPE_INDEX, 0)
+        return True
+    except (canopen.SdoAbortedError, canopen.SdoCommunicationError):
+        # An aborted request is still an answer, but the node is not a drive.
+        return False
+    except (can.CanError, ILError, OSError) as e:
+        logger.warning(f"Could not check the nodes {node_ids}: {e}")
+        return False
+    finally:
+        network.disconnect()
@@ -1,19 +1,70 @@
+import itertools
+import threading
 import time
+from concurrent.futures import CancelledError
 from functools import partial
-from queue import Queue
-from typing import Union
+from queue import Empty, PriorityQueue
+from typing import Any, Hashable, Optional
 
 import ingenialogger
 from ingenialink.exceptions import ILError
 from ingeniamotion.exceptions import IMException
 from PySide6.QtCore import QThread, Signal
 
+from k2basecamp.services.task_metrics import TaskMetrics
 from k2basecamp.utils.types import motion_controller_task, thread_report
-from k2basecamp.utils.enums import Drive
+from k2basecamp.utils.enums import DriveId, TaskPriority
+
+# Exceptions raised by failed tasks, which are reported instead of crashing the thread.
+TASK_EXCEPTIONS = (
+    IMException,
+    ILError,
+    ValueError,
+    KeyError,
+    FileNotFoundError,
+    ConnectionError,
+)
+
+# Priority of the stop request, so every task queued before it is executed before
+# stopping.
+STOP_PRIORITY = max(priority.value for priority in TaskPriority) + 1
 
 logger = ingenialogger.get_logger(__name__)
 
 
+def task_method_name(task: motion_controller_task) -> str:
+    """Name of the method a task executes, e.g. "Communication.get_register".
+    Functions defined inside a method are named after the method.
+
+    Args:
+        task: the task.
+
+    Returns:
+        The name of the method.
+    """
+    action = task.action.func if isinstance(task.action, partial) else task.action
+    name = getattr(action, "__qualname__", type(action).__qualname__)
+    return str(name).split(".<locals>")[0]
+
+
+def task_drive(task: motion_controller_task) -> Optional[DriveId]:
+    """The drive a task targets.
+
+    Args:
+        task: the task.
+
+    Returns:
+        The first drive in the arguments of the task or its servo keyword argument,
+        None if there is none.
+    """
+    for arg in [*task.args, task.kwargs.get("servo")]:
+        if isinstance(arg, str):
+            arg = DriveId.from_alias(arg)
+        if isinstance(arg, DriveId):
+            return arg
+    return None
+
+
 class MotionControllerThread(QThread):
     """
     Thread to run ingeniamotion native functions or custom functions defined in the
@@ -33,19 +84,74 @@ class MotionControllerThread(QThread):
     """Signal emitted when a task is completed.
     A report [thread_report] is returned by the thread"""
 
-    queue: Queue[Union[motion_controller_task, None]]
+    task_dropped: Signal = Signal(thread_report, arguments=["thread_report"])
+    """Signal emitted when a task is dropped because its deadline expired before it
+    could be executed."""
+
+    queue: PriorityQueue[tuple[int, int, Optional[motion_controller_task]]]
     """Task queue - the thread will work until the queue is empty and then
-    wait for new tasks.
+    wait for new tasks. Tasks are executed by priority, and in the order they were
+    added within the same priority.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        metrics: Optional[TaskMetrics] = None,
+        drive: Optional[DriveId] = None,
+        name: Optional[str] = None,
+    ) -> None:
         """
         The constructor for MotionControllerThread class
+
+        Args:
+            metrics: where the wait and execution times of the tasks, the depth of
+                the queue and the outcome of the tasks are recorded. Defaults to
+                None, i.e. no metrics.
+            drive: the drive whose tasks the thread executes, used to label the
+                metrics. Defaults to None, i.e. a general purpose thread.
+            name: label of the metrics of the queue, e.g. for a thread that is
+                shared by several drives. Defaults to None, i.e. the name of the
+                drive. The outcomes of the tasks that target a drive are always
+                labelled with the drive.
         """
-        self.__running = False
-        self.queue = Queue()
+        self.__metrics = metrics
+        if name is None:
+            name = "general" if drive is None else drive.name
+        self.__metrics_label = name
+        self.queue = PriorityQueue()
+        self.__sequence = itertools.count()
+        self.__coalesce_lock = threading.Lock()
+        self.__pending_coalesced_tasks: dict[Hashable, motion_controller_task] = {}
+        self.__coalesce_counts: dict[Hashable, int] = {}
         super().__init__()
 
+    @property
+    def coalesce_counts(self) -> dict[Hashable, int]:
+        """The number of tasks that were replaced by a newer task with the same
+        coalesce key, and therefore never executed, per coalesce key."""
+        with self.__coalesce_lock:
+            return dict(self.__coalesce_counts)
+
+    def add_task(self, task: motion_controller_task) -> None:
+        """Add a task to the queue.
+        If the task has a coalesce key and a task with the same key is still
+        waiting in the queue, the waiting task is replaced instead.
+
+        Args:
+            task: the task to execute.
+        """
+        task.queued_at = time.time()
+        key = task.coalesce_key
+        if key is not None:
+            with self.__coalesce_lock:
+                replaced = key in self.__pending_coalesced_tasks
+                self.__pending_coalesced_tasks[key] = task
+                if replaced:
+                    self.__coalesce_counts[key] = self.__coalesce_counts.get(key, 0) + 1
+                    return
+        self.queue.put((task.priority.value, next(self.__sequence), task))
+        self.__observe_queue_depth()
+
     def run(self) -> None:
         """Run function.
         Emit a signal when it starts (started). Emits a report of
@@ -55,53 +161,183 @@ class MotionControllerThread(QThread):
         callback, if any.
         If the task fails, a task_errored signal with the error message is emitted
         instead.
+        Tasks whose deadline has expired are not executed, a task_dropped signal is
+        emitted instead.
+        The report of a task with an error callback is always sent with the
+        task_completed signal, to the error callback if the task failed or was
+        dropped.
+        The thread runs until the stop request is taken from the queue, i.e. after
+        every task that was queued before it.
 
         """
-        self.__running = True
-        while self.__running:
-            task = self.queue.get()
+        while True:
+            *_, task = self.queue.get()
             if task is None:
+                self.queue.task_done()
                 break
+            self.__observe_queue_depth()
+            if task.coalesce_key is not None:
+                with self.__coalesce_lock:
+                    # Execute the newest task with the same key.
+                    task = self.__pending_coalesced_tasks.pop(task.coalesce_key)
             timestamp = time.time()
+            if task.deadline is not None and timestamp > task.deadline:
+                report = self.__create_report(
+                    task,
+                    None,
+                    timestamp,
+                    0,
+                    TimeoutError(
+                        f"Deadline expired {timestamp - task.deadline:.3f} s ago."
+                    ),
+                )
+                logger.warning(f"Dropped task: {report}")
+                self.__observe_task(task, timestamp, None, "dropped")
+                if task.error_callback is not None:
+                    self.task_completed.emit(task.error_callback, report)
+                else:
+                    self.task_dropped.emit(report)
+                self.queue.task_done()
+                continue
             raised_exception = None
             output = None
             try:
                 output = task.action(*task.args, **task.kwargs)
-            except (
-                IMException,
-                ILError,
-                ValueError,
-                KeyError,
-                FileNotFoundError,
-                ConnectionError,
-            ) as e:
+            except TASK_EXCEPTIONS as e:
                 raised_exception = e
             duration = time.time() - timestamp
-            if isinstance(task.callback, partial):
-                func_name = task.callback.func.__qualname__
-            else:
-                func_name = task.callback.__qualname__
-            drive = None
-            if task.args:
-                for arg in task.args:
-                    if isinstance(arg, Drive):
-                        drive = arg
-                        break
-            report = thread_report(
-                drive,
-                func_name,
-                output,
+            report = self.__create_report(
+                task, output, timestamp, duration, raised_exception
+            )
+            self.__observe_task(
+                task,
                 timestamp,
                 duration,
-                raised_exception,
+                "completed" if raised_exception is None else "errored",
             )
             if raised_exception is None:
                 self.task_completed.emit(task.callback, report)
             else:
                 logger.error(report)
-                self.task_errored.emit(report)
+                if task.error_callback is not None:
+                    self.task_completed.emit(task.error_callback, report)
+                else:
+                    self.task_errored.emit(report)
+            self.queue.task_done()
+
+    def cancel_pending_tasks(self) -> int:
+        """Remove every task that is waiting in the queue, e.g. before an emergency
+        stop, so no queued command is executed after it. The task that is being
+        executed is not interrupted. Cancelled tasks are recorded as dropped in the
+        metrics and reported as failed, with a CancelledError, so whoever is waiting
+        for them is notified.
+
+        Returns:
+            The number of cancelled tasks.
+        """
+        cancelled = 0
+        stop_requests = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except Empty:
+                break
+            *_, task = item
+            if task is None:
+                stop_requests.append(item)
+            else:
+                if task.coalesce_key is not None:
+                    with self.__coalesce_lock:
+                        task = self.__pending_coalesced_tasks.pop(
+                            task.coalesce_key, task
+                        )
+                timestamp = time.time()
+                report = self.__create_report(
+                    task,
+                    None,
+                    timestamp,
+                    0,
+                    CancelledError("Cancelled before it was executed."),
+                )
+                self.__observe_task(task, timestamp, None, "dropped")
+                if task.error_callback is not None:
+                    self.task_completed.emit(task.error_callback, report)
+                else:
+                    self.task_errored.emit(report)
+                cancelled += 1
             self.queue.task_done()
+        for item in stop_requests:
+            self.queue.put(item)
+        self.__observe_queue_depth()
+        if cancelled:
+            logger.warning(f"Cancelled {cancelled} queued tasks.")
+        return cancelled
 
     def stop(self) -> None:
-        self.__running = False
-        self.queue.put(item=None)
+        """Stop the thread once the tasks that are already queued are executed."""
+        self.queue.put(item=(STOP_PRIORITY, next(self.__sequence), None))
+
+    def __observe_queue_depth(self) -> None:
+        """Record the number of tasks waiting in the queue."""
+        if self.__metrics is not None:
+            self.__metrics.observe_queue_depth(self.__metrics_label, self.queue.qsize())
+
+    def __observe_task(
+        self,
+        task: motion_controller_task,
+        timestamp: float,
+        duration: Optional[float],
+        outcome: str,
+    ) -> None:
+        """Record a task that left the queue.
+
+        Args:
+            task: the task.
+            timestamp: when the task was started (or dropped).
+            duration: how long the task took, None if it was dropped.
+            outcome: "completed", "errored" or "dropped".
+        """
+        if self.__metrics is None:
+            return
+        wait_time = 0.0 if task.queued_at is None else timestamp - task.queued_at
+        drive = task_drive(task)
+        self.__metrics.observe_task(
+            self.__metrics_label if drive is None else drive.name,
+            task_method_name(task),
+            max(0.0, wait_time),
+            duration,
+            outcome,
+        )
+
+    def __create_report(
+        self,
+        task: motion_controller_task,
+        output: Any,
+        timestamp: float,
+        duration: float,
+        raised_exception: Optional[Exception],
+    ) -> thread_report:
+        """Create the report of a task.
+
+        Args:
+            task: the task.
+            output: the output of the action of the task.
+            timestamp: when the task was started.
+            duration: how long the task took.
+            raised_exception: the exception raised by the task, if any.
+
+        Returns:
+            The report of the task.
+        """
+        if isinstance(task.callback, partial):
+            func_name = task.callback.func.__qualname__
+        else:
+            func_name = task.callback.__qualname__
+        return thread_report(
+            task_drive(task),
+            func_name,
+            output,
+            timestamp,
+            duration,
+            raised_exception,
+        )
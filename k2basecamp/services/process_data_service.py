@@ -0,0 +1,355 @@
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional, Union
+
+import ingenialogger
+from ingeniamotion import MotionController
+from ingeniamotion.enums import COMMUNICATION_TYPE
+from ingeniamotion.exceptions import IMException
+
+VELOCITY_SET_POINT_REGISTER = "CL_VEL_SET_POINT_VALUE"
+VELOCITY_FEEDBACK_REGISTER = "CL_VEL_FBK_VALUE"
+DEFAULT_REFRESH_RATE = 0.01
+FEEDBACK_BUFFER_SIZE = 10000
+
+logger = ingenialogger.get_logger(__name__)
+
+
+class ProcessDataPoller:
+    """Poller that reads the feedback received through the PDOs of a drive,
+    instead of reading the registers one by one. It has the same interface as the
+    ingeniamotion pollers, so it can be read by a BusPollerThread. The samples are
+    taken every PDO cycle, the sampling time is not used.
+    """
+
+    def __init__(
+        self,
+        service: "ProcessDataService",
+        drive: str,
+        registers: list[dict[str, Union[int, str]]],
+    ) -> None:
+        """The constructor for ProcessDataPoller class
+
+        Args:
+            service: the ProcessDataService that exchanges the PDOs.
+            drive: drive alias.
+            registers: the polled registers, which must be mapped to the PDOs.
+        """
+        self.__service = service
+        self.__drive = drive
+        self.__registers = [str(register["name"]) for register in registers]
+        self.__start_time: Optional[float] = None
+        self.__last_sequence = -1
+
+    def start(self) -> None:
+        """Start sampling."""
+        self.__start_time = time.monotonic()
+        self.__last_sequence = self.__service.last_sequence(self.__drive)
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self.__start_time = None
+
+    @property
+    def data(self) -> tuple[list[float], list[list[float]], bool]:
+        """The samples received since the last read.
+
+        Returns:
+            The timestamps of the samples (relative to the start of the poller), the
+            values of every register and whether samples were lost because the
+            feedback buffer was full.
+        """
+        data: list[list[float]] = [[] for _ in self.__registers]
+        if self.__start_time is None:
+            return [], data, False
+        samples = self.__service.feedback_since(self.__drive, self.__last_sequence)
+        if not samples:
+            return [], data, False
+        lost_samples = samples[0][0] > self.__last_sequence + 1
+        self.__last_sequence = samples[-1][0]
+        timestamps = [timestamp - self.__start_time for _, timestamp, _ in samples]
+        for values, register in zip(data, self.__registers):
+            values.extend(float(sample[register]) for _, _, sample in samples)
+        return timestamps, data, lost_samples
+
+
+class ProcessDataService:
+    """Service to exchange the velocity setpoints and the feedback of the drives
+    through cyclic PDOs, instead of one request per setpoint or register read.
+    The target velocity of every drive is mapped to a RPDO and the feedback
+    registers to a TPDO. Every PDO cycle, the newest setpoint of each drive is sent
+    and the received feedback is added to a buffer, so the rate of the control and
+    of the telemetry does not depend on the latency of the requests.
+    Only EtherCAT supports PDOs.
+    """
+
+    def __init__(
+        self,
+        mc: MotionController,
+        buffer_size: int = FEEDBACK_BUFFER_SIZE,
+        exception_callback: Optional[Callable[[IMException], Any]] = None,
+    ) -> None:
+        """The constructor for ProcessDataService class
+
+        Args:
+            mc: MotionController instance.
+            buffer_size: number of feedback samples kept per drive. Defaults to
+                10000.
+            exception_callback: called, from the PDO thread, if the exchange stops
+                because of an error. Defaults to None.
+        """
+        self.__mc = mc
+        self.__buffer_size = buffer_size
+        self.__exception_callback = exception_callback
+        self.__lock = threading.Lock()
+        self.__started = False
+        self.__setpoints: dict[str, float] = {}
+        self.__rpdo_items: dict[str, Any] = {}
+        self.__tpdo_items: dict[str, dict[str, Any]] = {}
+        self.__feedback: dict[str, deque[tuple[int, float, dict[str, float]]]] = {}
+        self.__sequences: dict[str, int] = {}
+
+    @property
+    def is_active(self) -> bool:
+        """Whether the PDOs are being exchanged."""
+        return self.__started and bool(self.__mc.capture.pdo.is_active)
+
+    @property
+    def drives(self) -> list[str]:
+        """The drives whose setpoints and feedback are exchanged through PDOs."""
+        with self.__lock:
+            return list(self.__rpdo_items)
+
+    def start(
+        self,
+        drives: list[str],
+        feedback_registers: Optional[list[str]] = None,
+        refresh_rate: float = DEFAULT_REFRESH_RATE,
+    ) -> None:
+        """Map the PDOs of the drives and start exchanging them. Must be called from
+        a MotionControllerThread.
+
+        Args:
+            drives: drive aliases.
+            feedback_registers: the registers to map to the TPDOs. Defaults to None,
+                i.e. the velocity feedback.
+            refresh_rate: PDO cycle time, in seconds. Defaults to 0.01.
+
+        Raises:
+            ingeniamotion.exceptions.IMException: If the PDOs are already being
+                exchanged.
+            ValueError: If a drive is not connected through EtherCAT.
+        """
+        if self.__started:
+            raise IMException("The PDOs are already active.")
+        if feedback_registers is None:
+            feedback_registers = [VELOCITY_FEEDBACK_REGISTER]
+        pdo = self.__mc.capture.pdo
+        try:
+            self.__map_drives(drives, feedback_registers)
+        except Exception:
+            self.__clear()
+            raise
+        pdo.subscribe_to_send_process_data(self.__send_process_data)
+        pdo.subscribe_to_receive_process_data(self.__receive_process_data)
+        pdo.subscribe_to_exceptions(self.__handle_exception)
+        pdo.start_pdos(COMMUNICATION_TYPE.Ethercat, refresh_rate)
+        self.__started = True
+        logger.info(f"Exchanging PDOs with {', '.join(drives)} every {refresh_rate} s.")
+
+    def __map_drives(self, drives: list[str], feedback_registers: list[str]) -> None:
+        """Map the velocity setpoint of the drives to a RPDO, and the feedback
+        registers to a TPDO.
+
+        Args:
+            drives: drive aliases.
+            feedback_registers: the registers to map to the TPDOs.
+        """
+        pdo = self.__mc.capture.pdo
+        with self.__lock:
+            for drive in drives:
+                self.__setpoints[drive] = 0.0
+                rpdo_item: Any = pdo.create_pdo_item(
+                    VELOCITY_SET_POINT_REGISTER, servo=drive, value=0.0
+                )
+                tpdo_items: dict[str, Any] = {
+                    register: pdo.create_pdo_item(register, servo=drive)
+                    for register in feedback_registers
+                }
+                rpdo_map, tpdo_map = pdo.create_pdo_maps(
+                    [rpdo_item], list(tpdo_items.values())
+                )
+                pdo.set_pdo_maps_to_slave(rpdo_map, tpdo_map, servo=drive)
+                self.__rpdo_items[drive] = rpdo_item
+                self.__tpdo_items[drive] = tpdo_items
+                self.__feedback[drive] = deque(maxlen=self.__buffer_size)
+                self.__sequences[drive] = -1
+
+    def stop(self) -> None:
+        """Stop exchanging the PDOs and remove the PDO mapping of the drives. Must be
+        called from a MotionControllerThread."""
+        pdo = self.__mc.capture.pdo
+        if self.__started:
+            self.__started = False
+            pdo.stop_pdos()
+        pdo.unsubscribe_to_send_process_data(self.__send_process_data)
+        pdo.unsubscribe_to_receive_process_data(self.__receive_process_data)
+        pdo.unsubscribe_to_exceptions(self.__handle_exception)
+        drives = self.drives
+        self.__clear()
+        for drive in drives:
+            pdo.clear_pdo_mapping(servo=drive)
+
+    def __clear(self) -> None:
+        """Forget the mapped drives, their setpoints and their feedback."""
+        with self.__lock:
+            self.__rpdo_items.clear()
+            self.__tpdo_items.clear()
+            self.__setpoints.clear()
+            self.__feedback.clear()
+            self.__sequences.clear()
+
+    def maps(self, drive: str, registers: list[dict[str, Union[int, str]]]) -> bool:
+        """Check whether some registers of a drive are received through the PDOs.
+
+        Args:
+            drive: drive alias.
+            registers: the registers.
+
+        Returns:
+            True if all the registers are mapped to the TPDO of the drive.
+        """
+        with self.__lock:
+            tpdo_items = self.__tpdo_items.get(drive)
+            return (
+                self.__started
+                and tpdo_items is not None
+                and all(str(register["name"]) in tpdo_items for register in registers)
+            )
+
+    def set_velocity(self, drive: str, velocity: float) -> None:
+        """Set the target velocity of a drive. It is sent in the next PDO cycle.
+
+        Args:
+            drive: drive alias.
+            velocity: the target velocity.
+
+        Raises:
+            KeyError: If the velocity of the drive is not mapped to a PDO.
+        """
+        with self.__lock:
+            if drive not in self.__setpoints:
+                raise KeyError(f"The velocity of {drive} is not mapped to a PDO.")
+            self.__setpoints[drive] = velocity
+
+    def latest(self, drive: str, register: str) -> Optional[float]:
+        """The last received value of a register.
+
+        Args:
+            drive: drive alias.
+            register: register UID.
+
+        Returns:
+            The value, None if it has not been received yet.
+        """
+        with self.__lock:
+            feedback = self.__feedback.get(drive)
+            if not feedback:
+                return None
+            return feedback[-1][2].get(register)
+
+    def last_sequence(self, drive: str) -> int:
+        """The sequence number of the last feedback sample of a drive.
+
+        Args:
+            drive: drive alias.
+
+        Returns:
+            The sequence number, -1 if no sample has been received.
+        """
+        with self.__lock:
+            feedback = self.__feedback.get(drive)
+            return feedback[-1][0] if feedback else -1
+
+    def feedback_since(
+        self, drive: str, sequence: int
+    ) -> list[tuple[int, float, dict[str, float]]]:
+        """The feedback samples of a drive received after a given sample.
+
+        Args:
+            drive: drive alias.
+            sequence: the sequence number of the last sample already read.
+
+        Returns:
+            The sequence number, time.monotonic timestamp and register values of
+            every newer sample still in the buffer.
+        """
+        with self.__lock:
+            feedback = self.__feedback.get(drive)
+            if not feedback or feedback[-1][0] <= sequence:
+                return []
+            # Sequence numbers are consecutive, so the newer samples are the last
+            # ones of the buffer.
+            first_new = max(0, len(feedback) - (feedback[-1][0] - sequence))
+            return list(itertools.islice(feedback, first_new, None))
+
+    def create_poller(
+        self,
+        registers: list[dict[str, Union[int, str]]],
+        servo: str,
+        sampling_time: float = DEFAULT_REFRESH_RATE,
+        buffer_size: int = FEEDBACK_BUFFER_SIZE,
+        start: bool = True,
+    ) -> ProcessDataPoller:
+        """Create a poller that reads the feedback received through the PDOs. Same
+        interface as ingeniamotion's capture.create_poller.
+
+        Args:
+            registers: the polled registers, which must be mapped to the PDOs.
+            servo: drive alias.
+            sampling_time: not used, the samples are taken every PDO cycle.
+            buffer_size: not used, the feedback buffer of the service is used.
+            start: whether to start the poller. Defaults to True.
+
+        Returns:
+            The poller.
+        """
+        poller = ProcessDataPoller(self, servo, registers)
+        if start:
+            poller.start()
+        return poller
+
+    def __send_process_data(self) -> None:
+        """Update the RPDOs with the newest setpoints, before they are sent."""
+        with self.__lock:
+            for drive, rpdo_item in self.__rpdo_items.items():
+                rpdo_item.value = self.__setpoints[drive]
+
+    def __receive_process_data(self) -> None:
+        """Add the values of the received TPDOs to the feedback buffers."""
+        timestamp = time.monotonic()
+        with self.__lock:
+            for drive, tpdo_items in self.__tpdo_items.items():
+                self.__sequences[drive] += 1
+                self.__feedback[drive].append(
+                    (
+                        self.__sequences[drive],
+                        timestamp,
+                        {
+                            register: tpdo_item.value
+                            for register, tpdo_item in tpdo_items.items()
+                        },
+                    )
+                )
+
+    def __handle_exception(self, exception: IMException) -> None:
+        """Handle an error of the PDO thread, which stops the exchange.
+
+        Args:
+            exception: the error.
+        """
+        logger.error(exception)
+        if self.__exception_callback is not None:
+            self.__exception_callback(exception)
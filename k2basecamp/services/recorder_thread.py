@@ -0,0 +1,246 @@
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Any, Iterator, Optional, Union
+
+import ingenialogger
+import numpy as np
+import numpy.typing as npt
+from PySide6.QtCore import QThread
+
+MAGIC = b"K2BCREC1"
+VERSION = 1
+# Size of the header, followed by the header itself, padded to ALIGNMENT bytes.
+HEADER_SIZE_FORMAT = "<I"
+# Number of samples and number of columns of a chunk.
+CHUNK_HEADER_FORMAT = "<II"
+ALIGNMENT = 8
+DTYPE = np.dtype("<f8")
+CHUNK_SAMPLES = 4096
+FLUSH_INTERVAL = 1.0
+MAX_QUEUED_BATCHES = 1024
+
+logger = ingenialogger.get_logger(__name__)
+
+
+class RecorderThread(QThread):
+    """Thread that writes every batch of polled data to an append-only file.
+
+    The file starts with a header (a magic number and the metadata of the recording,
+    e.g. the registers, in JSON format). It is followed by chunks, each one made of
+    the number of samples and columns of the chunk and then the data of the chunk,
+    column by column: first the timestamps, then one column per register. All the
+    values are little endian float64 and aligned, so the columns can be memory
+    mapped, see :func:`read_chunks`.
+
+    Batches are queued by :meth:`record`, which is cheap enough to be called from
+    the GUI thread, and written in the background. The queue is bounded: if the
+    disk can not keep up, new batches are dropped instead of filling the memory.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        drive: str,
+        registers: list[dict[str, Union[int, str]]],
+        max_queued_batches: int = MAX_QUEUED_BATCHES,
+    ) -> None:
+        """The constructor for RecorderThread class. The file is created, and its
+        header written, right away.
+
+        Args:
+            path: the file to record to. It is overwritten if it exists.
+            drive: drive alias.
+            registers: the recorded registers, in the order of the rows of the
+                recorded data.
+            max_queued_batches: maximum number of batches waiting to be written.
+                Defaults to 1024.
+
+        Raises:
+            OSError: If the file can not be created.
+        """
+        super().__init__()
+        self.path = path
+        self.drive = drive
+        self.__queue: queue.Queue[
+            Optional[tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]]
+        ] = queue.Queue(maxsize=max_queued_batches)
+        self.__columns = len(registers) + 1
+        self.__stopped = threading.Event()
+        self.__dropped_batches = 0
+        self.__recorded_samples = 0
+        self.__file = open(path, "wb")
+        header = json.dumps(
+            {
+                "version": VERSION,
+                "drive": drive,
+                "registers": registers,
+                "created": time.time(),
+            }
+        ).encode()
+        header += b" " * (-(len(MAGIC) + 4 + len(header)) % ALIGNMENT)
+        self.__file.write(MAGIC + struct.pack(HEADER_SIZE_FORMAT, len(header)) + header)
+        self.__file.flush()
+
+    @property
+    def dropped_batches(self) -> int:
+        """The number of batches that were dropped because the queue was full."""
+        return self.__dropped_batches
+
+    @property
+    def recorded_samples(self) -> int:
+        """The number of samples written to the file."""
+        return self.__recorded_samples
+
+    def record(
+        self, timestamps: npt.NDArray[np.float64], data: npt.NDArray[np.float64]
+    ) -> None:
+        """Queue a batch of data to be written. Can be used as the callback of a
+        telemetry subscription.
+
+        Args:
+            timestamps: contains the timestamps of the new data points.
+            data: contains the values of the new data points, one row per register.
+        """
+        if self.__stopped.is_set():
+            return
+        try:
+            self.__queue.put_nowait((timestamps, data))
+        except queue.Full:
+            self.__dropped_batches += 1
+            if self.__dropped_batches == 1:
+                logger.warning(f"Recording to {self.path} is not keeping up.")
+
+    def run(self) -> None:
+        """Write the queued batches, in chunks of up to CHUNK_SAMPLES samples or
+        every FLUSH_INTERVAL seconds, until the thread is stopped."""
+        pending: list[npt.NDArray[np.float64]] = []
+        pending_samples = 0
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                batch = self.__queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                batch = None
+            # The stop sentinel is not queued if the queue was full: the thread also
+            # stops once the queue is empty after stop was called.
+            running = not (self.__stopped.is_set() and self.__queue.empty())
+            if batch is not None:
+                timestamps, data = batch
+                chunk = np.empty((self.__columns, len(timestamps)), dtype=DTYPE)
+                chunk[0] = timestamps
+                chunk[1:] = data
+                pending.append(chunk)
+                pending_samples += len(timestamps)
+            if pending and (
+                not running
+                or pending_samples >= CHUNK_SAMPLES
+                or time.monotonic() - last_flush >= FLUSH_INTERVAL
+            ):
+                self.__write_chunk(np.concatenate(pending, axis=1))
+                pending, pending_samples = [], 0
+                last_flush = time.monotonic()
+        self.__file.close()
+
+    def stop(self) -> None:
+        """Stop the thread once every queued batch has been written. Batches recorded
+        afterwards are ignored. Does not block, even if the queue is full."""
+        self.__stopped.set()
+        try:
+            # Wake up the thread if it is waiting for a batch.
+            self.__queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def __write_chunk(self, chunk: npt.NDArray[np.float64]) -> None:
+        """Append a chunk to the file.
+
+        Args:
+            chunk: the timestamps and the values of every register, one row each.
+        """
+        columns, samples = chunk.shape
+        self.__file.write(struct.pack(CHUNK_HEADER_FORMAT, samples, columns))
+        self.__file.write(np.ascontiguousarray(chunk, dtype=DTYPE).tobytes())
+        self.__file.flush()
+        self.__recorded_samples += samples
+
+
+def read_header(path: str) -> tuple[dict[str, Any], int]:
+    """Read the header of a recording.
+
+    Args:
+        path: the recording.
+
+    Raises:
+        ValueError: If the file is not a recording.
+
+    Returns:
+        The metadata of the recording and the offset of its first chunk.
+    """
+    with open(path, "rb") as file:
+        prefix_size = len(MAGIC) + struct.calcsize(HEADER_SIZE_FORMAT)
+        prefix = file.read(prefix_size)
+        if len(prefix) < prefix_size or not prefix.startswith(MAGIC):
+            raise ValueError(f"{path} is not a recording.")
+        (header_size,) = struct.unpack_from(HEADER_SIZE_FORMAT, prefix, len(MAGIC))
+        header = json.loads(file.read(header_size))
+    return header, len(prefix) + header_size
+
+
+def read_chunks(path: str) -> Iterator[npt.NDArray[np.float64]]:
+    """Iterate over the chunks of a recording without loading them in memory.
+    A chunk that was not completely written (e.g. because the application was
+    closed while recording) is ignored.
+
+    Args:
+        path: the recording.
+
+    Raises:
+        ValueError: If the file is not a recording.
+
+    Yields:
+        Read-only, memory mapped views of the chunks: the timestamps and the values
+        of every register, one row each.
+    """
+    _, offset = read_header(path)
+    if offset >= os.path.getsize(path):
+        return
+    file = np.memmap(path, dtype=np.uint8, mode="r")
+    chunk_header_size = struct.calcsize(CHUNK_HEADER_FORMAT)
+    while offset + chunk_header_size <= len(file):
+        samples, columns = struct.unpack(
+            CHUNK_HEADER_FORMAT, file[offset : offset + chunk_header_size].tobytes()
+        )
+        offset += chunk_header_size
+        size = samples * columns * DTYPE.itemsize
+        if offset + size > len(file):
+            break
+        yield file[offset : offset + size].view(DTYPE).reshape(columns, samples)
+        offset += size
+
+
+def read_recording(
+    path: str,
+) -> tuple[dict[str, Any], npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+    """Read a whole recording.
+
+    Args:
+        path: the recording.
+
+    Raises:
+        ValueError: If the file is not a recording.
+
+    Returns:
+        The metadata of the recording, the timestamps and the values of the
+        registers, one row per register.
+    """
+    header, _ = read_header(path)
+    chunks = list(read_chunks(path))
+    if not chunks:
+        return header, np.empty(0), np.empty((len(header["registers"]), 0))
+    data = np.concatenate(chunks, axis=1)
+    return header, data[0], data[1:]
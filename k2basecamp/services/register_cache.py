@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+
+DEFAULT_TTL = 0.0
+DEFAULT_CAPACITY = 256
+
+register_value = Union[int, float, str]
+
+
+class RegisterCache:
+    """Cache of register values read from the drives, keyed by drive alias, axis and
+    register.
+    Every entry expires after the time to live of its register. By default registers
+    are not cached, only the registers that are given a time to live are. The least
+    recently used entry is evicted when the cache is full. The cache is thread safe,
+    so it can be shared by the threads that communicate with the drives.
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = DEFAULT_TTL,
+        ttls: Optional[dict[str, float]] = None,
+        capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        """The constructor for RegisterCache class
+
+        Args:
+            default_ttl: time to live, in seconds, of the registers that do not have
+                their own. Defaults to 0, i.e. they are not cached.
+            ttls: time to live, in seconds, of specific registers. Defaults to None.
+            capacity: maximum number of entries. Defaults to 256.
+        """
+        self.default_ttl = default_ttl
+        self.ttls = {} if ttls is None else dict(ttls)
+        self.capacity = capacity
+        self.__lock = threading.Lock()
+        # Value and expiration time of every register, least recently used first.
+        self.__entries: OrderedDict[
+            tuple[str, int, str], tuple[register_value, float]
+        ] = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+    @property
+    def hits(self) -> int:
+        """The number of reads that were served from the cache."""
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """The number of reads that were not in the cache, or had expired."""
+        return self.__misses
+
+    def get(self, servo: str, axis: int, register: str) -> Optional[register_value]:
+        """Get the cached value of a register.
+
+        Args:
+            servo: drive alias.
+            axis: axis of the register.
+            register: register UID.
+
+        Returns:
+            The value of the register, None if it is not cached or has expired.
+        """
+        key = (servo, axis, register)
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                self.__entries.pop(key, None)
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[0]
+
+    def put(self, servo: str, axis: int, register: str, value: register_value) -> None:
+        """Store the value of a register, unless it has no time to live.
+
+        Args:
+            servo: drive alias.
+            axis: axis of the register.
+            register: register UID.
+            value: the value read from the drive.
+        """
+        ttl = self.ttls.get(register, self.default_ttl)
+        if ttl <= 0:
+            return
+        expiration = time.monotonic() + ttl
+        key = (servo, axis, register)
+        with self.__lock:
+            self.__entries[key] = (value, expiration)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.capacity:
+                self.__entries.popitem(last=False)
+
+    def invalidate(
+        self,
+        servo: Optional[str] = None,
+        axis: Optional[int] = None,
+        register: Optional[str] = None,
+    ) -> None:
+        """Remove entries from the cache. Every argument that is given narrows down
+        the entries to remove, if none is given the cache is cleared.
+
+        Args:
+            servo: drive alias. Defaults to None.
+            axis: axis of the register. Defaults to None.
+            register: register UID. Defaults to None.
+        """
+        with self.__lock:
+            for key in list(self.__entries):
+                if (
+                    (servo is None or key[0] == servo)
+                    and (axis is None or key[1] == axis)
+                    and (register is None or key[2] == register)
+                ):
+                    del self.__entries[key]
@@ -0,0 +1,801 @@
+import math
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Optional, Union
+
+from ingenialink import NET_DEV_EVT, SERVO_STATE
+from ingenialink.exceptions import ILError
+from ingeniamotion.errors import Errors
+from ingeniamotion.exceptions import IMException
+
+from k2basecamp.services.firmware_cache import read_ensemble
+from k2basecamp.services.process_data_service import (
+    VELOCITY_FEEDBACK_REGISTER,
+    VELOCITY_SET_POINT_REGISTER,
+)
+from k2basecamp.utils.types import simulation_settings
+
+SIMULATED_INTERFACE = "Simulated interface"
+MAX_VELOCITY_REGISTER = "CL_VEL_REF_MAX"
+MAX_PROFILER_VELOCITY_REGISTER = "PROF_MAX_VEL"
+CURRENT_REGISTER = "CL_CUR_Q_VALUE"
+DEFAULT_REGISTERS: dict[str, Union[int, float, str]] = {
+    MAX_VELOCITY_REGISTER: 20.0,
+    MAX_PROFILER_VELOCITY_REGISTER: 20.0,
+}
+# Current needed per unit of acceleration of the simulated motor.
+CURRENT_PER_ACCELERATION = 0.01
+FIRMWARE_PROGRESS_STEPS = 10
+DEFAULT_PDO_REFRESH_RATE = 0.01
+# Position & velocity loop rate of the simulated drives, in Hz.
+LOOP_RATE = 20000.0
+
+
+class SimulatedServo:
+    """A simulated drive. Its velocity loop is modelled as a first order system:
+    the velocity approaches the target velocity (limited by the maximum velocity)
+    exponentially while the motor is enabled, and zero while it is disabled.
+    """
+
+    def __init__(self, alias: str, node_id: int, time_constant: float) -> None:
+        """The constructor for SimulatedServo class
+
+        Args:
+            alias: drive alias.
+            node_id: the node / slave ID of the drive.
+            time_constant: time constant of the velocity loop, in seconds.
+        """
+        self.alias = alias
+        self.node_id = node_id
+        self.time_constant = time_constant
+        self.registers = dict(DEFAULT_REGISTERS)
+        self.state = SERVO_STATE.DISABLED
+        self.operation_mode: Any = None
+        self.target_velocity = 0.0
+        self.errors: list[tuple[int, str]] = []
+        self.servo_status_listeners: list[Callable[..., Any]] = []
+        self.net_status_listeners: list[Callable[..., Any]] = []
+        self.__lock = threading.Lock()
+        self.__velocity = 0.0
+        self.__current = 0.0
+        self.__last_update = time.monotonic()
+
+    def read(self, register: str, timestamp: Optional[float] = None) -> Any:
+        """Read a register.
+
+        Args:
+            register: register UID.
+            timestamp: when the register is read, in time.monotonic time. Defaults
+                to None, i.e. now.
+
+        Raises:
+            ingenialink.exceptions.ILError: If the register does not exist.
+
+        Returns:
+            The value of the register.
+        """
+        with self.__lock:
+            self.__update(time.monotonic() if timestamp is None else timestamp)
+            if register == VELOCITY_FEEDBACK_REGISTER:
+                return self.__velocity
+            if register == CURRENT_REGISTER:
+                return self.__current
+            if register not in self.registers:
+                raise ILError(f"Register {register} not found.")
+            return self.registers[register]
+
+    def write(self, register: str, value: Any) -> None:
+        """Write a register.
+
+        Args:
+            register: register UID.
+            value: the new value.
+        """
+        with self.__lock:
+            self.__update(time.monotonic())
+            self.registers[register] = value
+            if register == VELOCITY_SET_POINT_REGISTER:
+                self.target_velocity = float(value)
+
+    def set_target_velocity(self, velocity: float) -> None:
+        """Set the velocity the motor approaches while it is enabled.
+
+        Args:
+            velocity: the target velocity.
+        """
+        self.write(VELOCITY_SET_POINT_REGISTER, velocity)
+
+    def set_state(self, state: SERVO_STATE) -> None:
+        """Change the state of the drive and notify the listeners.
+
+        Args:
+            state: the new state.
+        """
+        with self.__lock:
+            self.__update(time.monotonic())
+            self.state = state
+        for listener in list(self.servo_status_listeners):
+            listener(state, None, 1)
+
+    def __update(self, timestamp: float) -> None:
+        """Advance the velocity loop model up to the given time.
+
+        Args:
+            timestamp: time.monotonic time.
+        """
+        elapsed = timestamp - self.__last_update
+        if elapsed <= 0:
+            return
+        target = 0.0
+        if self.state == SERVO_STATE.ENABLED:
+            max_velocity = abs(float(self.registers[MAX_VELOCITY_REGISTER]))
+            target = max(-max_velocity, min(max_velocity, self.target_velocity))
+        velocity = target + (self.__velocity - target) * math.exp(
+            -elapsed / self.time_constant
+        )
+        self.__current = (
+            CURRENT_PER_ACCELERATION * (velocity - self.__velocity) / (elapsed)
+        )
+        self.__velocity = velocity
+        self.__last_update = timestamp
+
+
+class SimulatedPoller:
+    """Simulated ingenialink Poller. Samples the registers of a SimulatedServo every
+    sampling period, and buffers the samples until they are read."""
+
+    def __init__(
+        self,
+        servo: SimulatedServo,
+        registers: list[dict[str, Union[int, str]]],
+        sampling_time: float,
+        buffer_size: int,
+    ) -> None:
+        """The constructor for SimulatedPoller class
+
+        Args:
+            servo: the polled drive.
+            registers: the polled registers.
+            sampling_time: sampling period, in seconds.
+            buffer_size: maximum number of samples kept between reads.
+        """
+        self.__servo = servo
+        self.__registers = [str(register["name"]) for register in registers]
+        self.__sampling_time = sampling_time
+        self.__buffer_size = buffer_size
+        self.__start_time: Optional[float] = None
+        self.__next_sample = 0
+
+    def start(self) -> None:
+        """Start sampling."""
+        self.__start_time = time.monotonic()
+        self.__next_sample = 0
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self.__start_time = None
+
+    @property
+    def data(self) -> tuple[list[float], list[list[float]], bool]:
+        """The samples taken since the last read.
+
+        Returns:
+            The timestamps of the samples (relative to the start of the poller), the
+            values of every register and whether samples were lost because the
+            buffer was full.
+        """
+        if self.__start_time is None:
+            return [], [[] for _ in self.__registers], False
+        elapsed = time.monotonic() - self.__start_time
+        last_sample = int(elapsed / self.__sampling_time)
+        first_sample = max(self.__next_sample, last_sample + 1 - self.__buffer_size)
+        lost_samples = first_sample > self.__next_sample
+        self.__next_sample = last_sample + 1
+        timestamps = [
+            sample * self.__sampling_time
+            for sample in range(first_sample, last_sample + 1)
+        ]
+        data: list[list[float]] = [[] for _ in self.__registers]
+        for timestamp in timestamps:
+            for values, register in zip(data, self.__registers):
+                values.append(
+                    float(self.__servo.read(register, self.__start_time + timestamp))
+                )
+        return timestamps, data, lost_samples
+
+
+class SimulatedMonitoring:
+    """Simulated ingeniamotion Monitoring. Every read waits for the configured
+    duration, then returns the samples the drive would have stored in its monitoring
+    buffer meanwhile."""
+
+    def __init__(
+        self,
+        servo: SimulatedServo,
+        registers: list[dict[str, Union[int, str]]],
+        prescaler: int,
+        sample_time: float,
+    ) -> None:
+        """The constructor for SimulatedMonitoring class
+
+        Args:
+            servo: the monitored drive.
+            registers: the monitored registers.
+            prescaler: divider of the loop rate of the drive.
+            sample_time: duration of every read, in seconds.
+
+        Raises:
+            ValueError: If the prescaler is less than 1.
+        """
+        if prescaler < 1:
+            raise ValueError("prescaler must be 1 or higher")
+        self.__servo = servo
+        self.__registers = [str(register["name"]) for register in registers]
+        self.sampling_freq = round(LOOP_RATE / prescaler, 2)
+        self.samples_number = int(self.sampling_freq * sample_time)
+        self.__stop_event = threading.Event()
+        self.__armed_at = time.monotonic()
+
+    def read_monitoring_data(
+        self, timeout: Optional[float] = None
+    ) -> list[list[Union[int, float]]]:
+        data: list[list[Union[int, float]]] = [[] for _ in self.__registers]
+        self.__stop_event.clear()
+        period = 1 / self.sampling_freq
+        remaining = self.__armed_at + self.samples_number * period - time.monotonic()
+        if self.__stop_event.wait(max(0.0, remaining)):
+            return data
+        for sample in range(self.samples_number):
+            timestamp = self.__armed_at + sample * period
+            for values, register in zip(data, self.__registers):
+                values.append(float(self.__servo.read(register, timestamp)))
+        return data
+
+    def stop_reading_data(self) -> None:
+        self.__stop_event.set()
+
+    def rearm_monitoring(self) -> None:
+        self.__armed_at = time.monotonic()
+
+
+class SimulatedCommunication:
+    """Simulation of the communication module of the MotionController."""
+
+    def __init__(self, mc: "SimulatedMotionController") -> None:
+        self.__mc = mc
+        self.flashed_slaves: list[int] = []
+
+    def get_interface_name_list(self) -> list[str]:
+        return [SIMULATED_INTERFACE]
+
+    def connect_servo_canopen(
+        self,
+        can_device: Any,
+        dict_path: str,
+        node_id: int,
+        baudrate: Any = None,
+        channel: int = 0,
+        alias: str = "default",
+        servo_status_listener: bool = False,
+        net_status_listener: bool = False,
+    ) -> None:
+        self.__mc.simulate_call("communication.connect_servo_canopen")
+        # Same network key as ingeniamotion, so drives on one bus share it.
+        self.__mc.add_servo(
+            alias, node_id, dict_path, net=f"{can_device}_{channel}_{baudrate}"
+        )
+
+    def connect_servo_ethercat_interface_index(
+        self,
+        if_index: int,
+        slave_id: int = 1,
+        dict_path: Optional[str] = None,
+        alias: str = "default",
+        servo_status_listener: bool = False,
+        net_status_listener: bool = False,
+    ) -> None:
+        self.__mc.simulate_call("communication.connect_servo_ethercat_interface_index")
+        if dict_path is None:
+            raise ILError("A dictionary is needed.")
+        self.__mc.add_servo(alias, slave_id, dict_path, net=SIMULATED_INTERFACE)
+
+    def scan_servos_canopen(
+        self, can_device: Any, baudrate: Any = None, channel: int = 0
+    ) -> list[int]:
+        self.__mc.simulate_call("communication.scan_servos_canopen")
+        return list(self.__mc.settings.node_ids)
+
+    def scan_servos_ethercat_interface_index(self, if_index: int) -> list[int]:
+        self.__mc.simulate_call("communication.scan_servos_ethercat_interface_index")
+        return list(self.__mc.settings.node_ids)
+
+    def subscribe_servo_status(
+        self, callback: Callable[..., Any], servo: str = "default"
+    ) -> None:
+        self.__mc.get_servo(servo).servo_status_listeners.append(callback)
+
+    def subscribe_net_status(
+        self, callback: Callable[..., Any], servo: str = "default"
+    ) -> None:
+        self.__mc.get_servo(servo).net_status_listeners.append(callback)
+
+    def disconnect(self, servo: str = "default") -> None:
+        self.__mc.simulate_call("communication.disconnect")
+        self.__mc.servos.pop(servo, None)
+        self.__mc.servo_net.pop(servo, None)
+
+    def get_register(
+        self, register: str, servo: str = "default", axis: int = 1
+    ) -> Union[int, float, str]:
+        self.__mc.simulate_call("communication.get_register")
+        value: Union[int, float, str] = self.__mc.get_servo(servo).read(register)
+        return value
+
+    def set_register(
+        self,
+        register: str,
+        value: Union[int, float, str],
+        servo: str = "default",
+        axis: int = 1,
+    ) -> None:
+        self.__mc.simulate_call("communication.set_register")
+        self.__mc.get_servo(servo).write(register, value)
+
+    def load_firmware_canopen(
+        self,
+        fw_file: str,
+        servo: str = "default",
+        progress_callback: Optional[Callable[[int], Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self.__mc.get_servo(servo)
+        self.__mc.simulate_firmware_load(fw_file, progress_callback)
+
+    def load_firmware_ecat_interface_index(
+        self, if_index: int, fw_file: str, slave: int = 1, **kwargs: Any
+    ) -> None:
+        # An ensemble is installed to all its slaves, the given one being the first.
+        slaves = [slave]
+        if os.path.splitext(fw_file)[1].lower() == ".zfu":
+            with open(fw_file, "rb") as file:
+                offsets = sorted(read_ensemble(os.path.basename(fw_file), file.read()))
+            slaves = [slave + offset - offsets[0] for offset in offsets]
+        for ensemble_slave in slaves:
+            if ensemble_slave not in self.__mc.settings.node_ids:
+                raise ILError(f"Could not find the slave {ensemble_slave}.")
+        self.__mc.simulate_firmware_load(fw_file, None)
+        self.flashed_slaves.extend(slaves)
+
+
+class SimulatedMotion:
+    """Simulation of the motion module of the MotionController."""
+
+    def __init__(self, mc: "SimulatedMotionController") -> None:
+        self.__mc = mc
+
+    def set_operation_mode(
+        self, operation_mode: Any, servo: str = "default", axis: int = 1
+    ) -> None:
+        self.__mc.simulate_call("motion.set_operation_mode")
+        self.__mc.get_servo(servo).operation_mode = operation_mode
+
+    def motor_enable(self, servo: str = "default", axis: int = 1) -> None:
+        self.__mc.simulate_call("motion.motor_enable")
+        simulated_servo = self.__mc.get_servo(servo)
+        if simulated_servo.state == SERVO_STATE.FAULT:
+            raise IMException("The drive is in fault state.")
+        simulated_servo.set_state(SERVO_STATE.ENABLED)
+
+    def motor_disable(self, servo: str = "default", axis: int = 1) -> None:
+        self.__mc.simulate_call("motion.motor_disable")
+        simulated_servo = self.__mc.get_servo(servo)
+        if simulated_servo.state != SERVO_STATE.DISABLED:
+            simulated_servo.set_state(SERVO_STATE.DISABLED)
+
+    def set_velocity(
+        self, velocity: float, servo: str = "default", axis: int = 1, **kwargs: Any
+    ) -> None:
+        self.__mc.simulate_call("motion.set_velocity")
+        self.__mc.get_servo(servo).set_target_velocity(velocity)
+
+
+class SimulatedPDOMapItem:
+    """Simulated PDO map item: a register and its value."""
+
+    def __init__(self, servo: str, register: str, value: Any) -> None:
+        self.servo = servo
+        self.register = register
+        self.value = value
+
+
+class SimulatedPDONetworkManager:
+    """Simulation of the PDO module of the MotionController. Every cycle, the values
+    of the RPDO items are written to the simulated drives and the TPDO items are
+    updated with the values of the simulated drives."""
+
+    def __init__(self, mc: "SimulatedMotionController") -> None:
+        self.__mc = mc
+        self.__rpdo_items: dict[str, list[SimulatedPDOMapItem]] = {}
+        self.__tpdo_items: dict[str, list[SimulatedPDOMapItem]] = {}
+        self.__send_observers: list[Callable[[], None]] = []
+        self.__receive_observers: list[Callable[[], None]] = []
+        self.__exception_observers: list[Callable[[IMException], None]] = []
+        self.__thread: Optional[threading.Thread] = None
+        self.__stop_event = threading.Event()
+
+    def create_pdo_item(
+        self,
+        register_uid: str,
+        axis: int = 1,
+        servo: str = "default",
+        value: Optional[Union[int, float]] = None,
+    ) -> SimulatedPDOMapItem:
+        # Only RPDO items have an initial value.
+        self.__mc.get_servo(servo)
+        return SimulatedPDOMapItem(servo, register_uid, value)
+
+    def create_pdo_maps(
+        self,
+        rpdo_map_items: list[SimulatedPDOMapItem],
+        tpdo_map_items: list[SimulatedPDOMapItem],
+    ) -> tuple[list[SimulatedPDOMapItem], list[SimulatedPDOMapItem]]:
+        return list(rpdo_map_items), list(tpdo_map_items)
+
+    def set_pdo_maps_to_slave(
+        self,
+        rpdo_maps: list[SimulatedPDOMapItem],
+        tpdo_maps: list[SimulatedPDOMapItem],
+        servo: str = "default",
+    ) -> None:
+        self.__mc.simulate_call("capture.pdo.set_pdo_maps_to_slave")
+        self.__rpdo_items[servo] = rpdo_maps
+        self.__tpdo_items[servo] = tpdo_maps
+
+    def clear_pdo_mapping(self, servo: str = "default") -> None:
+        self.__rpdo_items.pop(servo, None)
+        self.__tpdo_items.pop(servo, None)
+
+    def start_pdos(
+        self,
+        network_type: Any = None,
+        refresh_rate: Optional[float] = None,
+        watchdog_timeout: Optional[float] = None,
+    ) -> None:
+        if self.__thread is not None:
+            raise IMException("PDOs are already active.")
+        self.__stop_event.clear()
+        self.__thread = threading.Thread(
+            target=self.__exchange_process_data,
+            args=(DEFAULT_PDO_REFRESH_RATE if refresh_rate is None else refresh_rate,),
+            daemon=True,
+        )
+        self.__thread.start()
+
+    def stop_pdos(self) -> None:
+        if self.__thread is None:
+            raise IMException("The PDO exchange has not started yet.")
+        self.__stop_event.set()
+        self.__thread.join()
+        self.__thread = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def subscribe_to_send_process_data(self, callback: Callable[[], None]) -> None:
+        if callback not in self.__send_observers:
+            self.__send_observers.append(callback)
+
+    def subscribe_to_receive_process_data(self, callback: Callable[[], None]) -> None:
+        if callback not in self.__receive_observers:
+            self.__receive_observers.append(callback)
+
+    def subscribe_to_exceptions(self, callback: Callable[[IMException], None]) -> None:
+        if callback not in self.__exception_observers:
+            self.__exception_observers.append(callback)
+
+    def unsubscribe_to_send_process_data(self, callback: Callable[[], None]) -> None:
+        if callback in self.__send_observers:
+            self.__send_observers.remove(callback)
+
+    def unsubscribe_to_receive_process_data(self, callback: Callable[[], None]) -> None:
+        if callback in self.__receive_observers:
+            self.__receive_observers.remove(callback)
+
+    def unsubscribe_to_exceptions(
+        self, callback: Callable[[IMException], None]
+    ) -> None:
+        if callback in self.__exception_observers:
+            self.__exception_observers.remove(callback)
+
+    def __exchange_process_data(self, refresh_rate: float) -> None:
+        """Exchange the process data every cycle until stopped, or until a drive
+        is disconnected.
+
+        Args:
+            refresh_rate: cycle time, in seconds.
+        """
+        next_cycle = time.monotonic()
+        while not self.__stop_event.is_set():
+            for send_observer in list(self.__send_observers):
+                send_observer()
+            try:
+                for servo, rpdo_items in list(self.__rpdo_items.items()):
+                    simulated_servo = self.__mc.get_servo(servo)
+                    for item in rpdo_items:
+                        simulated_servo.write(item.register, item.value)
+                for servo, tpdo_items in list(self.__tpdo_items.items()):
+                    simulated_servo = self.__mc.get_servo(servo)
+                    for item in tpdo_items:
+                        item.value = simulated_servo.read(item.register)
+            except (IMException, ILError) as e:
+                exception = IMException(
+                    f"Stopping the PDO thread due to the following exception: {e}"
+                )
+                for exception_observer in list(self.__exception_observers):
+                    exception_observer(exception)
+                return
+            for receive_observer in list(self.__receive_observers):
+                receive_observer()
+            next_cycle += refresh_rate
+            self.__stop_event.wait(max(0.0, next_cycle - time.monotonic()))
+
+
+class SimulatedCapture:
+    """Simulation of the capture module of the MotionController."""
+
+    def __init__(self, mc: "SimulatedMotionController") -> None:
+        self.__mc = mc
+        self.pdo = SimulatedPDONetworkManager(mc)
+
+    def create_poller(
+        self,
+        registers: list[dict[str, Union[int, str]]],
+        servo: str = "default",
+        sampling_time: float = 0.125,
+        buffer_size: int = 100,
+        start: bool = True,
+    ) -> SimulatedPoller:
+        self.__mc.simulate_call("capture.create_poller")
+        poller = SimulatedPoller(
+            self.__mc.get_servo(servo), registers, sampling_time, buffer_size
+        )
+        if start:
+            poller.start()
+        return poller
+
+    def create_monitoring(
+        self,
+        registers: list[dict[str, Union[int, str]]],
+        prescaler: int,
+        sample_time: float,
+        servo: str = "default",
+        start: bool = False,
+    ) -> SimulatedMonitoring:
+        self.__mc.simulate_call("capture.create_monitoring")
+        return SimulatedMonitoring(
+            self.__mc.get_servo(servo), registers, prescaler, sample_time
+        )
+
+    def enable_monitoring(self, servo: str = "default") -> None:
+        self.__mc.simulate_call("capture.enable_monitoring")
+        self.__mc.get_servo(servo)
+
+    def disable_monitoring(self, servo: str = "default") -> None:
+        self.__mc.simulate_call("capture.disable_monitoring")
+        self.__mc.get_servo(servo)
+
+
+class SimulatedConfiguration:
+    """Simulation of the configuration module of the MotionController."""
+
+    def __init__(self, mc: "SimulatedMotionController") -> None:
+        self.__mc = mc
+
+    def load_configuration(
+        self, config_path: str, axis: Optional[int] = None, servo: str = "default"
+    ) -> None:
+        if not os.path.isfile(config_path):
+            raise FileNotFoundError(f"{config_path} file does not exist!")
+        self.__mc.get_servo(servo)
+        self.__mc.simulate_call("configuration.load_configuration")
+
+
+class SimulatedErrors:
+    """Simulation of the errors module of the MotionController."""
+
+    def __init__(self, mc: "SimulatedMotionController") -> None:
+        self.__mc = mc
+
+    def get_number_total_errors(
+        self, servo: str = "default", axis: Optional[int] = None
+    ) -> int:
+        self.__mc.simulate_call("errors.get_number_total_errors")
+        return len(self.__mc.get_servo(servo).errors)
+
+    def get_buffer_error_by_index(
+        self, index: int, servo: str = "default", axis: Optional[int] = None
+    ) -> tuple[int, Optional[int], Optional[bool]]:
+        self.__mc.simulate_call("errors.get_buffer_error_by_index")
+        if index >= Errors.MAXIMUM_ERROR_INDEX:
+            raise ValueError(f"index must be less than {Errors.MAXIMUM_ERROR_INDEX}")
+        errors = self.__mc.get_servo(servo).errors
+        if index >= len(errors):
+            return 0, axis, False
+        code, _ = errors[-1 - index]
+        return code, axis, False
+
+    def get_last_buffer_error(
+        self, servo: str = "default", axis: Optional[int] = None
+    ) -> tuple[int, Optional[int], Optional[bool]]:
+        return self.get_buffer_error_by_index(0, servo=servo, axis=axis)
+
+    def get_error_data(
+        self, error_code: int, servo: str = "default"
+    ) -> tuple[str, str, str, str]:
+        for code, message in self.__mc.get_servo(servo).errors:
+            if code == error_code:
+                return f"0x{code:08X}", "Simulation", "cyclic", message
+        raise KeyError(error_code)
+
+
+class SimulatedMotionController:
+    """Simulated backend that can replace the ingeniamotion MotionController, e.g.
+    for development and benchmarking without drives.
+    It implements the calls of the communication, motion, capture, configuration
+    and errors modules that the application uses. Every call takes the configured
+    latency (plus a random jitter) and may fail, see
+    :class:`~utils.types.simulation_settings`.
+    """
+
+    def __init__(self, settings: Optional[simulation_settings] = None) -> None:
+        """The constructor for SimulatedMotionController class
+
+        Args:
+            settings: settings of the simulation. Defaults to None, i.e. the
+                default settings.
+        """
+        self.settings = simulation_settings() if settings is None else settings
+        self.servos: dict[str, SimulatedServo] = {}
+        self.net: dict[str, Any] = {}
+        self.servo_net: dict[str, str] = {}
+        self.communication = SimulatedCommunication(self)
+        self.motion = SimulatedMotion(self)
+        self.capture = SimulatedCapture(self)
+        self.configuration = SimulatedConfiguration(self)
+        self.errors = SimulatedErrors(self)
+        self.__random = random.Random(self.settings.seed)
+        self.__lock = threading.Lock()
+        self.__pending_failures: dict[str, Exception] = {}
+
+    def is_alive(self, servo: str = "default") -> bool:
+        return servo in self.servos
+
+    def get_servo(self, servo: str) -> SimulatedServo:
+        """Get a connected simulated drive.
+
+        Args:
+            servo: drive alias.
+
+        Raises:
+            ingeniamotion.exceptions.IMException: If the drive is not connected.
+
+        Returns:
+            The simulated drive.
+        """
+        simulated_servo = self.servos.get(servo)
+        if simulated_servo is None:
+            raise IMException(f"Servo '{servo}' is not connected")
+        return simulated_servo
+
+    def add_servo(
+        self,
+        alias: str,
+        node_id: int,
+        dictionary: str,
+        net: str = SIMULATED_INTERFACE,
+    ) -> None:
+        """Connect a simulated drive.
+
+        Args:
+            alias: drive alias.
+            node_id: the node / slave ID of the drive.
+            dictionary: path to the dictionary of the drive.
+            net: the network the drive is connected to. Defaults to the simulated
+                interface.
+
+        Raises:
+            FileNotFoundError: If the dictionary does not exist.
+            ingenialink.exceptions.ILError: If there is no drive with the given ID.
+        """
+        if not os.path.isfile(dictionary):
+            raise FileNotFoundError(
+                f"There is not any xdf file in the path: {dictionary}"
+            )
+        if node_id not in self.settings.node_ids:
+            raise ILError(f"Could not find the drive with ID {node_id}.")
+        self.servos[alias] = SimulatedServo(
+            alias, node_id, self.settings.velocity_time_constant
+        )
+        self.servo_net[alias] = net
+
+    def simulate_call(self, name: str) -> None:
+        """Simulate the latency and the failures of a call.
+
+        Args:
+            name: the name of the call, e.g. "motion.set_velocity".
+
+        Raises:
+            ingenialink.exceptions.ILError: If the call fails.
+        """
+        with self.__lock:
+            latency = self.settings.latencies.get(name, self.settings.latency)
+            latency += self.__random.uniform(
+                -self.settings.jitter, self.settings.jitter
+            )
+            failure = self.__pending_failures.pop(name, None)
+            if failure is None and self.__random.random() < self.settings.failure_rate:
+                failure = ILError(f"Simulated failure of {name}.")
+        time.sleep(max(0.0, latency))
+        if failure is not None:
+            raise failure
+
+    def fail_next(self, name: str, exception: Optional[Exception] = None) -> None:
+        """Make the next call with the given name fail.
+
+        Args:
+            name: the name of the call, e.g. "motion.set_velocity".
+            exception: the exception to raise. Defaults to None, i.e. an ILError.
+        """
+        with self.__lock:
+            self.__pending_failures[name] = (
+                ILError(f"Simulated failure of {name}.")
+                if exception is None
+                else exception
+            )
+
+    def inject_error(self, servo: str, code: int, message: str) -> None:
+        """Make a drive fail: the error is added to its error buffer, and the drive
+        goes to fault state.
+
+        Args:
+            servo: drive alias.
+            code: the error code.
+            message: the error description.
+        """
+        simulated_servo = self.get_servo(servo)
+        simulated_servo.errors.append((code, message))
+        simulated_servo.set_state(SERVO_STATE.FAULT)
+
+    def simulate_disconnection(self, servo: str) -> None:
+        """Simulate that the connection with a drive is lost.
+
+        Args:
+            servo: drive alias.
+        """
+        simulated_servo = self.servos.pop(servo, None)
+        if simulated_servo is None:
+            return
+        for listener in list(simulated_servo.net_status_listeners):
+            listener(NET_DEV_EVT.REMOVED)
+
+    def simulate_firmware_load(
+        self, fw_file: str, progress_callback: Optional[Callable[[int], Any]]
+    ) -> None:
+        """Simulate loading a firmware file.
+
+        Args:
+            fw_file: the firmware file.
+            progress_callback: receives the progress, in %. Defaults to None.
+
+        Raises:
+            FileNotFoundError: If the firmware file does not exist.
+        """
+        if not os.path.isfile(fw_file):
+            raise FileNotFoundError(f"Could not find {fw_file}.")
+        for step in range(FIRMWARE_PROGRESS_STEPS + 1):
+            self.simulate_call("communication.load_firmware")
+            if progress_callback is not None:
+                progress_callback(step * 100 // FIRMWARE_PROGRESS_STEPS)
@@ -0,0 +1,347 @@
+import bisect
+import copy
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import ingenialogger
+
+# Upper bounds of the histogram buckets, in seconds.
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUEUE_DEPTH_HISTORY = 1000
+METRICS_PREFIX = "k2basecamp"
+TASK_OUTCOMES = ("completed", "errored", "dropped")
+
+logger = ingenialogger.get_logger(__name__)
+
+
+def escape_label_value(value: str) -> str:
+    """Escape a label value for the Prometheus text exposition format.
+
+    Args:
+        value: the label value.
+
+    Returns:
+        The escaped value.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(**labels: str) -> str:
+    """Format labels for the Prometheus text exposition format.
+
+    Args:
+        labels: the labels, by name.
+
+    Returns:
+        The labels, e.g. '{drive="Axis1"}'.
+    """
+    return (
+        "{"
+        + ",".join(
+            f'{name}="{escape_label_value(value)}"' for name, value in labels.items()
+        )
+        + "}"
+    )
+
+
+class Histogram:
+    """Distribution of a set of observations, counted in cumulative buckets."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """The constructor for Histogram class
+
+        Args:
+            buckets: the upper bounds of the buckets, in increasing order. Defaults
+                to DEFAULT_BUCKETS.
+        """
+        self.buckets = buckets
+        # The last count is for the observations above the highest bound.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Add an observation.
+
+        Args:
+            value: the observed value.
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[tuple[str, int]]:
+        """The number of observations in every bucket, including the lower buckets.
+
+        Returns:
+            The upper bound of every bucket ("+Inf" for the last one) and the number
+            of observations that are less or equal.
+        """
+        bounds = [repr(bucket) for bucket in self.buckets] + ["+Inf"]
+        cumulative_counts = []
+        total = 0
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative_counts.append((bound, total))
+        return cumulative_counts
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket it falls in.
+
+        Args:
+            quantile: the quantile, between 0 and 1.
+
+        Returns:
+            The estimated quantile, None if there are no observations. Infinite if it
+            is above the highest bound.
+        """
+        if self.count == 0:
+            return None
+        rank = quantile * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class TaskMetrics:
+    """Metrics of the tasks executed by the MotionControllerThreads: per method
+    histograms of the time tasks wait in the queue and of the time they take to
+    execute, the depth of every queue over time and the outcome of the tasks of
+    every drive. Comparing the waiting and the execution times tells whether
+    slowness comes from the bus or from the queue.
+    The metrics can be exported in the Prometheus text exposition format.
+    """
+
+    def __init__(
+        self,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        queue_depth_history: int = QUEUE_DEPTH_HISTORY,
+    ) -> None:
+        """The constructor for TaskMetrics class
+
+        Args:
+            buckets: the upper bounds of the histogram buckets, in seconds. Defaults
+                to DEFAULT_BUCKETS.
+            queue_depth_history: number of queue depth samples kept per queue.
+                Defaults to 1000.
+        """
+        self.__buckets = buckets
+        self.__queue_depth_history = queue_depth_history
+        self.__lock = threading.Lock()
+        self.__wait_times: dict[str, Histogram] = {}
+        self.__execution_times: dict[str, Histogram] = {}
+        self.__outcomes: dict[str, dict[str, int]] = {}
+        self.__queue_depths: dict[str, deque[tuple[float, int]]] = {}
+        self.__max_queue_depths: dict[str, int] = {}
+
+    def observe_task(
+        self,
+        drive: str,
+        method: str,
+        wait_time: float,
+        execution_time: Optional[float],
+        outcome: str,
+    ) -> None:
+        """Record a task that left the queue.
+
+        Args:
+            drive: the drive the task was for, or the name of its queue.
+            method: the method the task executed.
+            wait_time: how long the task waited in the queue, in seconds.
+            execution_time: how long the task took, in seconds. None if it was
+                dropped.
+            outcome: "completed", "errored" or "dropped".
+        """
+        with self.__lock:
+            self.__wait_times.setdefault(method, Histogram(self.__buckets)).observe(
+                wait_time
+            )
+            if execution_time is not None:
+                self.__execution_times.setdefault(
+                    method, Histogram(self.__buckets)
+                ).observe(execution_time)
+            outcomes = self.__outcomes.setdefault(
+                drive, dict.fromkeys(TASK_OUTCOMES, 0)
+            )
+            outcomes[outcome] += 1
+
+    def observe_queue_depth(self, queue: str, depth: int) -> None:
+        """Record the number of tasks waiting in a queue.
+
+        Args:
+            queue: the name of the queue.
+            depth: the number of waiting tasks.
+        """
+        with self.__lock:
+            self.__queue_depths.setdefault(
+                queue, deque(maxlen=self.__queue_depth_history)
+            ).append((time.time(), depth))
+            self.__max_queue_depths[queue] = max(
+                depth, self.__max_queue_depths.get(queue, 0)
+            )
+
+    def methods(self) -> list[str]:
+        """The methods executed so far.
+
+        Returns:
+            The names of the methods.
+        """
+        with self.__lock:
+            return sorted(self.__wait_times)
+
+    def wait_time(self, method: str) -> Optional[Histogram]:
+        """The distribution of the time tasks of a method waited in the queue.
+
+        Args:
+            method: the method.
+
+        Returns:
+            The histogram, None if no task of the method was executed.
+        """
+        with self.__lock:
+            return copy.deepcopy(self.__wait_times.get(method))
+
+    def execution_time(self, method: str) -> Optional[Histogram]:
+        """The distribution of the execution time of a method.
+
+        Args:
+            method: the method.
+
+        Returns:
+            The histogram, None if no task of the method was executed.
+        """
+        with self.__lock:
+            return copy.deepcopy(self.__execution_times.get(method))
+
+    def queue_depths(self, queue: str) -> list[tuple[float, int]]:
+        """The latest samples of the depth of a queue.
+
+        Args:
+            queue: the name of the queue.
+
+        Returns:
+            The timestamps (as returned by time.time) and the depths.
+        """
+        with self.__lock:
+            return list(self.__queue_depths.get(queue, []))
+
+    def outcomes(self, drive: str) -> dict[str, int]:
+        """The number of tasks of a drive that completed, errored or were dropped.
+
+        Args:
+            drive: the drive, or the name of the queue.
+
+        Returns:
+            The number of tasks per outcome.
+        """
+        with self.__lock:
+            return dict(self.__outcomes.get(drive, dict.fromkeys(TASK_OUTCOMES, 0)))
+
+    def error_rate(self, drive: str) -> float:
+        """The fraction of the tasks of a drive that failed.
+
+        Args:
+            drive: the drive, or the name of the queue.
+
+        Returns:
+            The error rate, 0 if there were no tasks.
+        """
+        outcomes = self.outcomes(drive)
+        total = sum(outcomes.values())
+        return outcomes["errored"] / total if total else 0.0
+
+    def to_text(self) -> str:
+        """Export the metrics in the Prometheus text exposition format.
+
+        Returns:
+            The metrics.
+        """
+        lines: list[str] = []
+        with self.__lock:
+            for name, description, histograms in [
+                (
+                    "task_wait_seconds",
+                    "Time tasks waited in the queue.",
+                    self.__wait_times,
+                ),
+                (
+                    "task_execution_seconds",
+                    "Time tasks took to execute.",
+                    self.__execution_times,
+                ),
+            ]:
+                metric = f"{METRICS_PREFIX}_{name}"
+                lines += [
+                    f"# HELP {metric} {description}",
+                    f"# TYPE {metric} histogram",
+                ]
+                for method, histogram in sorted(histograms.items()):
+                    for bound, count in histogram.cumulative_counts():
+                        labels = format_labels(method=method, le=bound)
+                        lines.append(f"{metric}_bucket{labels} {count}")
+                    labels = format_labels(method=method)
+                    lines.append(f"{metric}_sum{labels} {histogram.sum!r}")
+                    lines.append(f"{metric}_count{labels} {histogram.count}")
+            metric = f"{METRICS_PREFIX}_tasks_total"
+            lines += [
+                f"# HELP {metric} Tasks that left the queue, by outcome.",
+                f"# TYPE {metric} counter",
+            ]
+            for drive, outcomes in sorted(self.__outcomes.items()):
+                for outcome, count in outcomes.items():
+                    labels = format_labels(drive=drive, outcome=outcome)
+                    lines.append(f"{metric}{labels} {count}")
+            for name, description, values in [
+                (
+                    "queue_depth",
+                    "Tasks waiting in the queue.",
+                    {
+                        queue: depths[-1][1]
+                        for queue, depths in self.__queue_depths.items()
+                    },
+                ),
+                (
+                    "queue_depth_max",
+                    "Maximum number of tasks that waited in the queue.",
+                    self.__max_queue_depths,
+                ),
+            ]:
+                metric = f"{METRICS_PREFIX}_{name}"
+                lines += [f"# HELP {metric} {description}", f"# TYPE {metric} gauge"]
+                for queue, value in sorted(values.items()):
+                    lines.append(f"{metric}{format_labels(queue=queue)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> None:
+        """Write the metrics to a file, in the Prometheus text exposition format.
+        The file is replaced atomically, so it can be scraped at any time.
+
+        Args:
+            path: the file.
+        """
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as metrics_file:
+            metrics_file.write(self.to_text())
+        os.replace(temporary_path, path)
+        logger.debug(f"Exported task metrics to {path}.")
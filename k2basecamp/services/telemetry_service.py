@@ -0,0 +1,472 @@
+import itertools
+import threading
+import time
+from typing import Any, Callable, Optional, Union
+
+import ingenialogger
+import numpy as np
+import numpy.typing as npt
+from ingeniamotion import MotionController
+from ingeniamotion.exceptions import IMException
+from PySide6.QtCore import QObject, QThread, Slot
+
+from k2basecamp.services.bus_poller_thread import (
+    DEFAULT_AXIS,
+    DEFAULT_BUS_BUDGET,
+    DEFAULT_REFRESH_TIME,
+    DEFAULT_SAMPLING_TIME,
+    BusPollerThread,
+)
+from k2basecamp.services.monitoring_thread import (
+    DEFAULT_BLOCK_DURATION,
+    DEFAULT_PRESCALER,
+    MonitoringThread,
+)
+from k2basecamp.services.process_data_service import ProcessDataService
+from k2basecamp.utils.enums import BackpressurePolicy
+from k2basecamp.utils.types import polled_data, telemetry_subscription
+
+logger = ingenialogger.get_logger(__name__)
+
+
+def register_key(register: dict[str, Union[int, str]]) -> tuple[str, int]:
+    """Identify a register by its name and axis.
+
+    Args:
+        register: the register, in the format expected by ingeniamotion pollers.
+
+    Returns:
+        The name and axis of the register.
+    """
+    return str(register["name"]), int(register.get("axis", DEFAULT_AXIS))
+
+
+class TelemetryService(QObject):
+    """Service that shares register pollers between every part of the application
+    that needs telemetry from a drive.
+    The registers of each drive are the union of the registers of all the
+    subscriptions to that drive, and every network gets at most one BusPollerThread,
+    which polls the registers of all its drives within a total bus budget. Every
+    merged batch of data is then split up and fanned out to the subscribers, so
+    adding traces or drives does not add threads, and adding traces does not add
+    bus transactions.
+    High-rate traces are captured with the monitoring buffer of the drive instead,
+    see :meth:`start_monitoring`.
+    """
+
+    def __init__(
+        self,
+        mc: MotionController,
+        backpressure_policy: BackpressurePolicy = BackpressurePolicy.Coalesce,
+        process_data: Optional[ProcessDataService] = None,
+        bus_budget: float = DEFAULT_BUS_BUDGET,
+    ) -> None:
+        """The constructor for TelemetryService class
+
+        Args:
+            mc: MotionController instance.
+            backpressure_policy: What the pollers do with new data while the
+                subscribers are still processing the previous batch. Defaults to
+                BackpressurePolicy.Coalesce.
+            process_data: if set, the registers it receives through PDOs are read
+                from its feedback buffers instead of being polled. Defaults to None.
+            bus_budget: maximum number of register reads per second on each
+                network. Defaults to 500.
+        """
+        super().__init__()
+        self.__mc = mc
+        self.__process_data = process_data
+        self.__backpressure_policy = backpressure_policy
+        self.__bus_budget = bus_budget
+        self.__lock = threading.RLock()
+        self.__subscription_ids = itertools.count()
+        self.__subscriptions: dict[int, telemetry_subscription] = {}
+        self.__bus_pollers: dict[str, BusPollerThread] = {}
+        # The network of every polled drive, which is still needed to stop polling
+        # it once the drive is disconnected.
+        self.__drive_buses: dict[str, str] = {}
+        self.__retired_threads: list[QThread] = []
+        self.__monitorings: dict[
+            int,
+            tuple[
+                MonitoringThread,
+                Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], Any],
+            ],
+        ] = {}
+        self.__start_times: dict[str, float] = {}
+
+    def subscribe(
+        self,
+        drive: str,
+        registers: list[dict[str, Union[int, str]]],
+        callback: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], Any],
+        sampling_time: float = DEFAULT_SAMPLING_TIME,
+        refresh_time: float = DEFAULT_REFRESH_TIME,
+    ) -> int:
+        """Subscribe to a set of registers of a drive.
+
+        Args:
+            drive: drive alias.
+            registers: registers to be read.
+            callback: receives the timestamps and the values (one row per register,
+                in the order of the registers argument) of every polled batch.
+            sampling_time: requested sampling time. The drive is sampled at the
+                fastest rate requested by its subscribers, as far as the bus budget
+                allows. Defaults to 0.125.
+            refresh_time: requested refresh period. The batches of a network are
+                delivered at the fastest rate requested by its subscribers.
+                Defaults to 0.125.
+
+        Returns:
+            int: the subscription ID, needed to unsubscribe.
+        """
+        with self.__lock:
+            subscription_id = next(self.__subscription_ids)
+            self.__subscriptions[subscription_id] = telemetry_subscription(
+                drive, registers, callback, sampling_time, refresh_time
+            )
+            self.__update_drive(drive)
+        return subscription_id
+
+    def unsubscribe(self, subscription_id: int) -> None:
+        """Cancel a subscription. The drive is no longer polled if there are no
+        subscriptions left.
+
+        Args:
+            subscription_id: the ID returned by :meth:`subscribe`.
+        """
+        with self.__lock:
+            subscription = self.__subscriptions.pop(subscription_id, None)
+            if subscription is not None:
+                self.__update_drive(subscription.drive)
+
+    def unsubscribe_drive(self, drive: str) -> None:
+        """Cancel every subscription to a drive and stop polling and capturing it.
+
+        Args:
+            drive: drive alias.
+        """
+        with self.__lock:
+            for subscription_id, subscription in list(self.__subscriptions.items()):
+                if subscription.drive == drive:
+                    del self.__subscriptions[subscription_id]
+            self.__update_drive(drive)
+            for monitoring_id, (monitoring_thread, _) in list(
+                self.__monitorings.items()
+            ):
+                if monitoring_thread.drive == drive:
+                    self.stop_monitoring(monitoring_id)
+
+    def start_monitoring(
+        self,
+        drive: str,
+        registers: list[dict[str, Union[int, str]]],
+        callback: Callable[[npt.NDArray[np.float64], npt.NDArray[np.float64]], Any],
+        prescaler: int = DEFAULT_PRESCALER,
+        block_duration: float = DEFAULT_BLOCK_DURATION,
+    ) -> int:
+        """Capture a set of registers of a drive at a high rate with its monitoring
+        buffer, see :class:`~services.monitoring_thread.MonitoringThread`. A drive
+        has a single monitoring buffer, so only one capture per drive can run at a
+        time.
+
+        Args:
+            drive: drive alias.
+            registers: registers to be captured.
+            callback: receives the timestamps and the values (one row per register,
+                in the order of the registers argument) of every block.
+            prescaler: the sampling rate is the position & velocity loop rate of
+                the drive divided by the prescaler. Defaults to 1.
+            block_duration: duration of every block, in seconds. Defaults to 0.1.
+
+        Raises:
+            ingeniamotion.exceptions.IMException: If the drive is already being
+                captured.
+
+        Returns:
+            int: the capture ID, needed to stop it.
+        """
+        with self.__lock:
+            if drive in self.monitored_drives():
+                raise IMException(f"The monitoring of {drive} is already in use.")
+            monitoring_id = next(self.__subscription_ids)
+            monitoring_thread = MonitoringThread(
+                self.__mc,
+                drive,
+                registers,
+                prescaler=prescaler,
+                block_duration=block_duration,
+            )
+            monitoring_thread.new_data_available_triggered.connect(
+                self.handle_new_monitoring_data
+            )
+            self.__monitorings[monitoring_id] = (monitoring_thread, callback)
+            monitoring_thread.start()
+        return monitoring_id
+
+    def stop_monitoring(self, monitoring_id: int) -> None:
+        """Stop a capture started with :meth:`start_monitoring`.
+
+        Args:
+            monitoring_id: the ID returned by :meth:`start_monitoring`.
+        """
+        with self.__lock:
+            monitoring = self.__monitorings.pop(monitoring_id, None)
+            if monitoring is not None:
+                monitoring_thread, _ = monitoring
+                monitoring_thread.new_data_available_triggered.disconnect(
+                    self.handle_new_monitoring_data
+                )
+                monitoring_thread.stop()
+                self.__retire_thread(monitoring_thread)
+
+    def monitored_drives(self) -> list[str]:
+        """The drives that are being captured with their monitoring buffer.
+
+        Returns:
+            The drive aliases.
+        """
+        with self.__lock:
+            return [
+                monitoring_thread.drive
+                for monitoring_thread, _ in self.__monitorings.values()
+            ]
+
+    def stop(self) -> None:
+        """Cancel every subscription and capture, and wait for all the pollers to
+        finish."""
+        with self.__lock:
+            drives = set(self.__drive_buses)
+            self.__subscriptions.clear()
+            for drive in drives:
+                self.__update_drive(drive)
+            for monitoring_id in list(self.__monitorings):
+                self.stop_monitoring(monitoring_id)
+            retired_threads = list(self.__retired_threads)
+        for retired_thread in retired_threads:
+            retired_thread.wait()
+
+    def refresh_drive(self, drive: str) -> None:
+        """Poll a drive again from scratch, e.g. because its registers started or
+        stopped being received through PDOs.
+
+        Args:
+            drive: drive alias.
+        """
+        with self.__lock:
+            self.__update_drive(drive, force=True)
+
+    def subscribed_registers(self, drive: str) -> list[dict[str, Union[int, str]]]:
+        """The registers that are currently polled for a drive.
+
+        Args:
+            drive: drive alias.
+
+        Returns:
+            The merged registers of all the subscriptions to the drive.
+        """
+        with self.__lock:
+            bus_poller = self.__bus_pollers.get(self.__drive_buses.get(drive, ""))
+            return [] if bus_poller is None else bus_poller.drive_registers(drive)
+
+    @Slot()
+    def handle_new_data(self, batch: dict[str, polled_data]) -> None:
+        """Fan out a batch of data coming from a BusPollerThread to the subscribers
+        of every drive, then acknowledge the batch.
+
+        Args:
+            batch: the new data points of every drive, by drive alias.
+        """
+        bus_poller = self.sender()
+        with self.__lock:
+            if (
+                not isinstance(bus_poller, BusPollerThread)
+                or self.__bus_pollers.get(bus_poller.bus) is not bus_poller
+            ):
+                # The data belongs to a poller that was stopped.
+                return
+            targets: list[
+                tuple[
+                    Callable[..., Any],
+                    npt.NDArray[np.float64],
+                    npt.NDArray[np.float64],
+                ]
+            ] = []
+            for drive, drive_data in batch.items():
+                start_time = self.__start_times.get(drive)
+                if start_time is None:
+                    continue
+                rows = {
+                    register_key(register): row
+                    for row, register in enumerate(drive_data.registers)
+                }
+                # The poller of a network outlives the subscriptions of its drives,
+                # keep the timeline of every drive starting at its first subscription.
+                timestamps = drive_data.timestamps + (
+                    bus_poller.start_time - start_time
+                )
+                for subscription in self.__subscriptions.values():
+                    keys = [register_key(r) for r in subscription.registers]
+                    if subscription.drive == drive and all(k in rows for k in keys):
+                        targets.append(
+                            (
+                                subscription.callback,
+                                timestamps,
+                                drive_data.data[[rows[key] for key in keys]],
+                            )
+                        )
+        try:
+            for callback, timestamps, data in targets:
+                callback(timestamps, data)
+        finally:
+            # Let the poller emit its next batch.
+            bus_poller.acknowledge()
+
+    @Slot()
+    def handle_new_monitoring_data(
+        self, timestamps: npt.NDArray[np.float64], data: npt.NDArray[np.float64]
+    ) -> None:
+        """Forward a block of data coming from a MonitoringThread to the callback
+        of its capture.
+
+        Args:
+            timestamps: contains the timestamps of the new data points.
+            data: contains the values of the new data points, one row per register.
+        """
+        monitoring_thread = self.sender()
+        with self.__lock:
+            callbacks = [
+                callback
+                for thread, callback in self.__monitorings.values()
+                if thread is monitoring_thread
+            ]
+        for callback in callbacks:
+            callback(timestamps, data)
+
+    def __update_drive(self, drive: str, force: bool = False) -> None:
+        """Make sure the registers polled for a drive match its subscriptions: the
+        drive is added to the poller of its network, updated or removed from it if
+        needed. The poller of a network is started with its first drive and
+        stopped with its last one.
+
+        Args:
+            drive: drive alias.
+            force: poll the drive from scratch even if its registers did not change.
+                Defaults to False.
+        """
+        subscriptions = [
+            subscription
+            for subscription in self.__subscriptions.values()
+            if subscription.drive == drive
+        ]
+        needed_keys = {
+            register_key(register)
+            for subscription in subscriptions
+            for register in subscription.registers
+        }
+        # The registers that are still needed keep their order, so removing a
+        # subscription does not reorder the rows of the poller. New registers are
+        # appended.
+        polled_registers = self.subscribed_registers(drive)
+        registers: dict[tuple[str, int], dict[str, Union[int, str]]] = {
+            register_key(register): register
+            for register in polled_registers
+            if register_key(register) in needed_keys
+        }
+        for subscription in subscriptions:
+            for register in subscription.registers:
+                key = register_key(register)
+                registers.setdefault(key, {"name": key[0], "axis": key[1]})
+        merged_registers = list(registers.values())
+        polled_keys = {register_key(register) for register in polled_registers}
+        if not force and polled_keys == set(registers):
+            return
+        bus = self.__drive_buses.get(drive) or self.__get_bus(drive)
+        bus_poller = self.__bus_pollers.get(bus)
+        if not merged_registers:
+            self.__drive_buses.pop(drive, None)
+            self.__start_times.pop(drive, None)
+            if bus_poller is not None:
+                bus_poller.remove_drive(drive)
+                self.__update_refresh_time(bus)
+            return
+        if bus_poller is None:
+            bus_poller = BusPollerThread(
+                self.__mc,
+                bus,
+                bus_budget=self.__bus_budget,
+                backpressure_policy=self.__backpressure_policy,
+            )
+            bus_poller.new_data_available_triggered.connect(self.handle_new_data)
+            self.__bus_pollers[bus] = bus_poller
+        self.__drive_buses[drive] = bus
+        self.__start_times.setdefault(drive, time.monotonic())
+        bus_poller.set_drive(
+            drive,
+            merged_registers,
+            sampling_time=min(s.sampling_time for s in subscriptions),
+            poller=(
+                self.__process_data.create_poller(merged_registers, drive, start=False)
+                if self.__process_data is not None
+                and self.__process_data.maps(drive, merged_registers)
+                else None
+            ),
+        )
+        self.__update_refresh_time(bus)
+        if not bus_poller.isRunning():
+            bus_poller.start()
+        logger.debug(f"Polling {len(merged_registers)} registers of {drive} on {bus}.")
+
+    def __update_refresh_time(self, bus: str) -> None:
+        """Deliver the batches of a network at the fastest rate requested by the
+        subscribers of its drives, or stop its poller if it has no drives left.
+
+        Args:
+            bus: the network.
+        """
+        refresh_times = [
+            subscription.refresh_time
+            for subscription in self.__subscriptions.values()
+            if self.__drive_buses.get(subscription.drive) == bus
+        ]
+        if refresh_times:
+            self.__bus_pollers[bus].set_refresh_time(min(refresh_times))
+        else:
+            self.__retire_bus_poller(self.__bus_pollers.pop(bus))
+
+    def __get_bus(self, drive: str) -> str:
+        """The network a drive is connected to.
+
+        Args:
+            drive: drive alias.
+
+        Returns:
+            The key of the network in the MotionController, the drive alias if the
+            drive is not connected.
+        """
+        return str(self.__mc.servo_net.get(drive, drive))
+
+    def __retire_bus_poller(self, bus_poller: BusPollerThread) -> None:
+        """Stop the poller of a network. A reference is kept until the thread has
+        finished.
+
+        Args:
+            bus_poller: the thread to stop.
+        """
+        bus_poller.new_data_available_triggered.disconnect(self.handle_new_data)
+        bus_poller.stop()
+        self.__retire_thread(bus_poller)
+
+    def __retire_thread(self, thread: QThread) -> None:
+        """Keep a reference to a stopped thread until it has finished.
+
+        Args:
+            thread: the stopped thread.
+        """
+        thread.quit()
+        self.__retired_threads = [
+            retired_thread
+            for retired_thread in self.__retired_threads
+            if not retired_thread.isFinished()
+        ]
+        self.__retired_threads.append(thread)
@@ -0,0 +1,89 @@
+import json
+import os
+import threading
+from typing import Optional
+
+import ingenialogger
+from PySide6.QtCore import QStandardPaths
+
+CACHE_FILE_NAME = os.path.join("k2basecamp", "topology.json")
+
+logger = ingenialogger.get_logger(__name__)
+
+
+class TopologyCache:
+    """Remembers the node / slave IDs that were found the last time each adapter
+    (CAN device and baudrate, or EtherCAT interface) was scanned. The topology is
+    stored in a file, so it is still available in the next session.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        """The constructor for TopologyCache class
+
+        Args:
+            path: the file the topology is stored in. Defaults to None, i.e. a file
+                in the cache location of the platform.
+        """
+        if path is None:
+            path = os.path.join(
+                QStandardPaths.writableLocation(
+                    QStandardPaths.StandardLocation.CacheLocation
+                ),
+                CACHE_FILE_NAME,
+            )
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__topology: Optional[dict[str, list[int]]] = None
+
+    def get(self, adapter: str) -> list[int]:
+        """Get the IDs that were found the last time an adapter was scanned.
+
+        Args:
+            adapter: identifies the adapter, e.g. ``CANopen/KVASER/Baudrate_1M``.
+
+        Returns:
+            The IDs, empty if the adapter was never scanned.
+        """
+        with self.__lock:
+            return list(self.__load().get(adapter, []))
+
+    def put(self, adapter: str, ids: list[int]) -> None:
+        """Store the IDs that were found scanning an adapter.
+
+        Args:
+            adapter: identifies the adapter, e.g. ``CANopen/KVASER/Baudrate_1M``.
+            ids: the IDs that were found.
+        """
+        with self.__lock:
+            topology = self.__load()
+            if topology.get(adapter) == ids:
+                return
+            topology[adapter] = list(ids)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "w") as file:
+                    json.dump(topology, file)
+            except OSError as e:
+                logger.warning(f"Could not store the topology in {self.path}: {e}")
+
+    def __load(self) -> dict[str, list[int]]:
+        """Read the stored topology the first time it is needed.
+
+        Returns:
+            The IDs of every adapter.
+        """
+        if self.__topology is None:
+            self.__topology = {}
+            try:
+                with open(self.path) as file:
+                    topology = json.load(file)
+                if isinstance(topology, dict):
+                    self.__topology = {
+                        str(adapter): [int(id) for id in ids]
+                        for adapter, ids in topology.items()
+                    }
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Discarding invalid topology file {self.path}: {e}")
+        return self.__topology
@@ -1,4 +1,6 @@
+import re
 from enum import Enum, auto
+from typing import Optional
 
 from ingenialink import CAN_BAUDRATE, CAN_DEVICE, NET_DEV_EVT, SERVO_STATE
 from PySide6.QtCore import QEnum, QObject
@@ -12,9 +14,66 @@ class ButtonState(Enum):
 
 
 class Drive(Enum):
-    Axis1 = auto()
-    Axis2 = auto()
-    Both = auto()
+    """The drives the views show side by side, the first two of the collection of
+    connected drives (see :class:`DriveId`). ``Both`` refers to every drive of the
+    collection.
+    """
+
+    Both = 0
+    Axis1 = 1
+    Axis2 = 2
+
+
+class DriveId(int):
+    """A drive of the collection of connected drives, identified by its position,
+    starting at 1. Its name is the alias of the drive, e.g. ``Axis3``.
+    """
+
+    def __new__(cls, position: int) -> "DriveId":
+        """Create the ID of a drive.
+
+        Args:
+            position: the position of the drive, starting at 1.
+
+        Raises:
+            ValueError: If the position is less than 1.
+
+        Returns:
+            The ID.
+        """
+        if position < 1:
+            raise ValueError(f"{position} is not a valid drive position.")
+        return super().__new__(cls, position)
+
+    @property
+    def name(self) -> str:
+        """The alias of the drive, e.g. "Axis3"."""
+        return f"Axis{int(self)}"
+
+    @classmethod
+    def axes(cls, number_of_drives: int) -> list["DriveId"]:
+        """The drives of a collection.
+
+        Args:
+            number_of_drives: the number of drives.
+
+        Returns:
+            Axis1 to AxisN.
+        """
+        return [cls(position) for position in range(1, number_of_drives + 1)]
+
+    @classmethod
+    def from_alias(cls, alias: str) -> Optional["DriveId"]:
+        """Find the drive that uses an alias.
+
+        Args:
+            alias: the alias, e.g. "Axis3".
+
+        Returns:
+            The drive, None if the alias is not the name of an axis.
+        """
+        match = re.fullmatch(r"Axis([1-9][0-9]*)", alias)
+        return None if match is None else cls(int(match.group(1)))
 
 
 class ConnectionProtocol(Enum):
@@ -31,6 +90,46 @@ class CanDevice(Enum):
     IXXAT = auto()
 
 
+class BackpressurePolicy(Enum):
+    """What a BusPollerThread does with new data while the previous batch has not been
+    consumed yet."""
+
+    Coalesce = auto()
+    """Merge the new data into the pending batch, so no sample is lost."""
+    Latest = auto()
+    """Replace the pending batch, so only the most recent data is delivered."""
+
+
+class ConnectionStage(Enum):
+    """Progress of the connection of a drive."""
+
+    Connecting = auto()
+    Configuring = auto()
+    Connected = auto()
+    Failed = auto()
+
+
+class FirmwareStage(Enum):
+    """Progress of the firmware installation of a drive."""
+
+    Pending = auto()
+    Installing = auto()
+    Installed = auto()
+    Failed = auto()
+
+
+class TaskPriority(Enum):
+    """Priority of a task in the MotionControllerThread queue. Tasks with a lower
+    value run first."""
+
+    Control = auto()
+    """Commands that act on the motion of the drives, e.g. enabling a motor."""
+    Configuration = auto()
+    """Connecting, scanning and configuring the drives."""
+    Diagnostics = auto()
+    """Reading errors and other information about the drives."""
+
+
 def stringify_can_device_enum(device: CanDevice) -> CAN_DEVICE:
     """QEnum does not support string enums, but our connection function from ingenialink
     expects the can device as a string. This helper converts the integer enum
@@ -67,4 +166,6 @@ class Enums(QObject):
     QEnum(CAN_BAUDRATE)
     QEnum(SERVO_STATE)
     QEnum(ButtonState)
+    QEnum(ConnectionStage)
+    QEnum(FirmwareStage)
     QEnum(NET_DEV_EVT)
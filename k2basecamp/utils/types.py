@@ -1,8 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import partial
-from typing import Any, Callable, Optional, Union
+from typing import Any, Callable, Hashable, Optional, Union
 
-from k2basecamp.utils.enums import Drive
+import numpy as np
+import numpy.typing as npt
+
+from k2basecamp.utils.enums import DriveId, TaskPriority
 
 
 @dataclass
@@ -10,7 +13,7 @@ class thread_report:
     """Type for thread reports that are returned by threads. They contain information
     about the execution result of the thread."""
 
-    drive: Optional[Drive]
+    drive: Optional[DriveId]
     method: str
     output: Optional[Any]
     timestamp: float
@@ -23,9 +26,135 @@ class motion_controller_task:
     """Type for a task that a MotionControllerThread should execute. Contains the action
     (i.e. function) to perform, its arguments, and a callback function to call after
     completing the action.
+    Optionally contains the priority of the task and a deadline (a timestamp, as
+    returned by time.time) after which the task is dropped instead of executed.
+    Tasks with the same coalesce key replace each other while they are waiting in
+    the queue, so only the newest one is executed.
+    If the task has an error callback, the report of a failed or dropped task is
+    sent to it instead of being emitted as an error.
+    The time the task was added to the queue is set when it is queued.
     """
 
     action: Callable[..., Any]
     callback: Union[Callable[..., Any], partial[Callable[..., Any]]]
     args: Any
     kwargs: Any
+    priority: TaskPriority = TaskPriority.Configuration
+    deadline: Optional[float] = None
+    coalesce_key: Optional[Hashable] = None
+    error_callback: Optional[Callable[..., Any]] = None
+    queued_at: Optional[float] = None
+
+
+@dataclass
+class telemetry_subscription:
+    """Type for a subscription to the registers of a drive. Contains the drive alias,
+    the registers to poll, the callback that receives the polled data and the timing
+    the subscriber requested.
+    """
+
+    drive: str
+    registers: list[dict[str, Union[int, str]]]
+    callback: Callable[..., Any]
+    sampling_time: float
+    refresh_time: float
+
+
+@dataclass
+class polled_data:
+    """Type for the data of a drive polled by a BusPollerThread. Contains the polled
+    registers, the timestamps of the samples and their values, one row per register.
+    """
+
+    registers: list[dict[str, Union[int, str]]]
+    timestamps: npt.NDArray[np.float64]
+    data: npt.NDArray[np.float64]
+
+
+@dataclass
+class simulation_settings:
+    """Type for the settings of a SimulatedMotionController. Contains the latency of
+    the calls (by default and per call, e.g. "configuration.load_configuration"), the
+    random jitter added to it, the probability of a call failing, the time constant of
+    the velocity loop of the simulated drives and the IDs of the simulated drives.
+    """
+
+    latency: float = 0.001
+    latencies: dict[str, float] = field(default_factory=dict)
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    velocity_time_constant: float = 0.1
+    node_ids: list[int] = field(default_factory=lambda: [31, 32])
+    seed: Optional[int] = None
+
+
+@dataclass
+class register_write:
+    """Type for a register write of a batch (see
+    :meth:`~services.motion_controller_service.MotionControllerService.set_registers`).
+    Contains the target drive, the register UID, the new value and the axis. Once
+    the batch is executed, it also contains the exception raised by the write, if
+    any.
+    """
+
+    drive: DriveId
+    register: str
+    value: Union[int, float, str]
+    axis: int = 1
+    exception: Optional[Exception] = None
+
+
+@dataclass
+class drive_error:
+    """Type for an error read from the error buffer of a drive. Contains the error
+    code, the subnode (axis) it affects, whether it is only a warning and its
+    description.
+    """
+
+    code: int
+    subnode: Optional[int]
+    is_warning: Optional[bool]
+    description: str
+
+
+@dataclass
+class error_description:
+    """Type for an error defined in the Errors section of a dictionary. Contains the
+    error code, the affected module, the error type (e.g. "cyclic" or "warning")
+    and the description.
+    """
+
+    code: int
+    affected_module: str
+    error_type: str
+    description: str
+
+
+@dataclass
+class error_snapshot:
+    """Type for the errors of a drive read in a single task (see
+    :meth:`~services.motion_controller_service.MotionControllerService.get_error_snapshot`).
+    Contains the total number of errors of the drive and the errors that are newer
+    than a given count, oldest first.
+    """
+
+    count: int
+    errors: list[drive_error]
+
+
+@dataclass
+class firmware_image:
+    """Type for a parsed firmware file (see
+    :class:`~services.firmware_cache.FirmwareCache`). Contains the hash of the contents
+    of the file, its extension and size, and the number of MCB messages of the image.
+    The MCB error of a .lfu image that is not made of valid MCB frames is kept, as it
+    is only an error when the image is installed over CANopen. Ensembles (.zfu files)
+    contain the image of every drive, by slave ID offset.
+    """
+
+    content_hash: str
+    extension: str
+    size: int
+    commands: Optional[int] = None
+    mcb_error: Optional[str] = None
+    ensemble: dict[int, "firmware_image"] = field(default_factory=dict)
@@ -43,6 +43,9 @@ ColumnLayout {
         function onFirmware_installation_started() {
             BootloaderJS.showInstallationProgress();
         }
+        function onFirmware_installation_stage_changed(node_id, stage) {
+            BootloaderJS.setFirmwareStage(node_id, stage);
+        }
     }
 
     Dialog {
@@ -84,6 +87,12 @@ ColumnLayout {
                 text: "Installation in progress.."
                 Layout.fillHeight: true
             }
+            Label {
+                // Stage of every drive, when they are updated one after the other.
+                id: installationStages
+                visible: false
+                Layout.fillHeight: true
+            }
             Components.SpacerH {}
             RowLayout {
                 id: progressDialog
@@ -129,7 +138,7 @@ ColumnLayout {
         title: "Please choose a file"
         defaultSuffix: "zfu"
         fileMode: FileDialog.OpenFile
-        nameFilters: ["ZFU Files (*.zfu)"]
+        nameFilters: ["Firmware Files (*.zfu *.sfu *.lfu)", "ZFU Files (*.zfu)"]
         onAccepted: {
             bootloaderPage.bootloaderController.select_firmware(selectedFile);
         }
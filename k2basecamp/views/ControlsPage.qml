@@ -22,11 +22,16 @@ RowLayout {
 
     Connections {
         target: grid.connectionController
-        function onVelocity_left_changed(timestamp, velocity) {
-            PlotJS.updatePlot(chartL, timestamp, velocity);
-        }
-        function onVelocity_right_changed(timestamp, velocity) {
-            PlotJS.updatePlot(chartR, timestamp, velocity);
+        function onVelocity_changed(timestamp, drive) {
+            // The page plots the first two drives of the collection.
+            switch (drive) {
+            case Enums.Drive.Axis1:
+                PlotJS.updatePlot(chartL, drive, timestamp);
+                break;
+            case Enums.Drive.Axis2:
+                PlotJS.updatePlot(chartR, drive, timestamp);
+                break;
+            }
         }
         function onDrive_connected_triggered() {
             PlotJS.initSeries(chartL, xAxisL, yAxisL, "Axis1");
@@ -128,6 +133,17 @@ RowLayout {
             StateImage {
                 id: leftState
             }
+            CheckBox {
+                id: leftHighRateCheck
+                text: qsTr("High rate")
+                ToolTip.visible: hovered
+                ToolTip.text: qsTr("Capture the velocity with the monitoring buffer of the drive instead of polling it")
+                onToggled: () => {
+                    PlotJS.resetPlot(chartL);
+                    PlotJS.initSeries(chartL, xAxisL, yAxisL, "Axis1");
+                    grid.connectionController.set_high_rate_velocity(Enums.Drive.Axis1, leftHighRateCheck.checked);
+                }
+            }
             SpacerW {
                 Layout.preferredWidth: 2
             }
@@ -151,6 +167,17 @@ RowLayout {
             StateImage {
                 id: rightState
             }
+            CheckBox {
+                id: rightHighRateCheck
+                text: qsTr("High rate")
+                ToolTip.visible: hovered
+                ToolTip.text: qsTr("Capture the velocity with the monitoring buffer of the drive instead of polling it")
+                onToggled: () => {
+                    PlotJS.resetPlot(chartR);
+                    PlotJS.initSeries(chartR, xAxisR, yAxisR, "Axis2");
+                    grid.connectionController.set_high_rate_velocity(Enums.Drive.Axis2, rightHighRateCheck.checked);
+                }
+            }
             SpacerW {
             }
         }
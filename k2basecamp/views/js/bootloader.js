@@ -41,9 +41,30 @@ function resetDialog() {
     progressDialogBar.indeterminate = true;
     progressDialogButtons.visible = true
     isInProgress.visible = false
+    installationStages.visible = false
+    installationStages.text = "";
+    firmwareStages = {};
     installDialog.close();
 }
 
+/**
+ * The stage of every drive during the installation, by node / slave ID.
+ */
+var firmwareStages = {};
+
+/**
+ * Shows the stage of a drive during the installation.
+ * @param {int} nodeID 
+ * @param {str} stage 
+ */
+function setFirmwareStage(nodeID, stage) {
+    firmwareStages[nodeID] = stage.toLowerCase();
+    installationStages.text = Object.keys(firmwareStages).map((id) => {
+        return `Drive ${id}: ${firmwareStages[id]}`
+    }).join("\n");
+    installationStages.visible = true;
+}
+
 /**
  * Updates the progress bar in the GUI when the installation progress gets updated.
  * @param {int[]} drives 
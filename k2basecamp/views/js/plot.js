@@ -1,7 +1,7 @@
 const AXIS_MAXIMUM = 20;
 
 /**
- * Initialize a chart with a spline series.
+ * Initialize a chart with a line series.
  * @param {ChartView} chart
  * @param {ValueAxis} xAxis
  * @param {ValueAxis} yAxis
@@ -9,12 +9,12 @@ const AXIS_MAXIMUM = 20;
  */
 function initSeries(chart, xAxis, yAxis, label) {
     const series = chart.createSeries(
-        ChartView.SeriesTypeSpline,
+        ChartView.SeriesTypeLine,
         label,
         xAxis,
         yAxis
     );
-    series.pointsVisible = true;
+    series.pointsVisible = false;
     series.color = "#80ff00";
 }
 
@@ -46,16 +46,20 @@ function setMaxVelocity(chart, velocity) {
 /**
  * Updates the chart as new values are coming in.
  * Moves the x-axis if the end of the current display has been reached.
+ * The points are stored in the plot model of the drive, only the decimated
+ * points of the visible range are passed to the series.
  * @param {ChartView} chart 
+ * @param {int} drive 
  * @param {float} timestamp 
- * @param {float} velocity 
  */
-function updatePlot(chart, timestamp, velocity) {
+function updatePlot(chart, drive, timestamp) {
     const series = chart.series(0);
+    if (!series)
+        return;
     const xAxis = chart.axisX(series);
     if (timestamp > AXIS_MAXIMUM) {
         xAxis.max = timestamp;
         xAxis.min = timestamp - AXIS_MAXIMUM;
     }
-    series.append(timestamp, velocity);
+    grid.connectionController.update_plot(series, drive, xAxis.min, xAxis.max, Math.round(chart.plotArea.width));
 }
@@ -0,0 +1,129 @@
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+from typing import Any, Generator, cast
+
+import pytest
+from ingeniamotion import MotionController
+from ingeniamotion import __version__ as ingeniamotion_version
+from PySide6 import __version__ as pyside_version
+
+from k2basecamp.services.motion_controller_service import MotionControllerService
+from k2basecamp.services.simulated_motion_controller import SimulatedMotionController
+from k2basecamp.utils.types import simulation_settings
+
+DICTIONARY = Path(__file__).parents[1] / "assets" / "eve-xcr-c_can_2.4.1.xdf"
+
+BENCHMARK_RESULTS_KEY = pytest.StashKey[list[dict[str, Any]]]()
+
+
+class Benchmark:
+    """Collects the measurements of a benchmark."""
+
+    def __init__(self, name: str, results: list[dict[str, Any]]) -> None:
+        """The constructor for Benchmark class
+
+        Args:
+            name: the name of the benchmark.
+            results: where the measurements are stored.
+        """
+        self.name = name
+        self.__results = results
+
+    def record(self, metric: str, samples: list[float], unit: str) -> None:
+        """Store the statistics of a set of measurements.
+
+        Args:
+            metric: what is measured, e.g. "latency".
+            samples: the measurements.
+            unit: the unit of the measurements, e.g. "s".
+        """
+        ordered_samples = sorted(samples)
+        self.__results.append(
+            {
+                "benchmark": self.name,
+                "metric": metric,
+                "unit": unit,
+                "samples": len(samples),
+                "min": ordered_samples[0],
+                "median": statistics.median(ordered_samples),
+                "p95": ordered_samples[int(0.95 * (len(ordered_samples) - 1))],
+                "max": ordered_samples[-1],
+                "mean": statistics.fmean(ordered_samples),
+            }
+        )
+
+    def record_rate(self, metric: str, count: int, duration: float) -> None:
+        """Store a throughput.
+
+        Args:
+            metric: what is counted, e.g. "tasks".
+            count: how many items were processed.
+            duration: how long it took, in seconds.
+        """
+        self.__results.append(
+            {
+                "benchmark": self.name,
+                "metric": metric,
+                "unit": f"{metric}/s",
+                "samples": count,
+                "value": count / duration,
+            }
+        )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    results: list[dict[str, Any]] = []
+    config.stash[BENCHMARK_RESULTS_KEY] = results
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    path = session.config.getoption("--perf-json")
+    results = session.config.stash[BENCHMARK_RESULTS_KEY]
+    if path is None or not results:
+        return
+    with open(path, "w") as benchmark_file:
+        json.dump(
+            {
+                "timestamp": time.time(),
+                "machine": platform.machine(),
+                "system": platform.platform(),
+                "python": platform.python_version(),
+                "pyside": pyside_version,
+                "ingeniamotion": ingeniamotion_version,
+                "results": results,
+            },
+            benchmark_file,
+            indent=4,
+        )
+
+
+@pytest.fixture
+def perf_benchmark(request: pytest.FixtureRequest) -> Generator[Benchmark, None, None]:
+    """Fixture to record the measurements of a benchmark
+
+    Returns:
+        Benchmark: the Benchmark, named after the test
+    """
+    yield Benchmark(
+        request.node.name.removeprefix("test_"),
+        request.config.stash[BENCHMARK_RESULTS_KEY],
+    )
+
+
+@pytest.fixture
+def mcs() -> Generator[MotionControllerService, None, None]:
+    """Fixture to create a MotionControllerService connected to a simulated drive
+    (Axis1) without latency
+
+    Returns:
+        MotionControllerService: the MotionControllerService
+    """
+    mc = SimulatedMotionController(simulation_settings(latency=0))
+    mc.communication.connect_servo_canopen(None, str(DICTIONARY), 31, alias="Axis1")
+    mcs = MotionControllerService(cast(MotionController, mc))
+    yield mcs
+    mcs.telemetry.stop()
+    mcs.stop_motion_controller_thread()
@@ -0,0 +1,79 @@
+import time
+from pathlib import Path
+
+from PySide6.QtCore import QEventLoop, QTimer
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.services.dictionary_cache import DictionaryCache
+from k2basecamp.services.motion_controller_service import MotionControllerService
+from k2basecamp.utils.types import thread_report
+from tests.benchmarks.conftest import DICTIONARY, Benchmark
+
+"""Measure how long it takes for a task queued in the MotionControllerService to
+report back, and how long it takes to identify the format of a dictionary.
+"""
+
+TASKS = 200
+REPETITIONS = 50
+TIMEOUT_MS = 5000
+
+
+def test_run_latency(
+    qtbot: QtBot, mcs: MotionControllerService, perf_benchmark: Benchmark
+) -> None:
+    latencies: list[float] = []
+    loop = QEventLoop()
+    timeout = QTimer()
+    timeout.setSingleShot(True)
+    timeout.timeout.connect(loop.quit)
+    start = 0.0
+
+    def callback(report: thread_report) -> None:
+        latencies.append(time.perf_counter() - start)
+        loop.quit()
+
+    for _ in range(TASKS):
+        start = time.perf_counter()
+        mcs.run(callback, "communication.get_interface_name_list")
+        timeout.start(TIMEOUT_MS)
+        loop.exec()
+    assert len(latencies) == TASKS
+    perf_benchmark.record("queue_to_callback", latencies, "s")
+
+
+def test_run_throughput(
+    qtbot: QtBot, mcs: MotionControllerService, perf_benchmark: Benchmark
+) -> None:
+    completed: list[thread_report] = []
+    loop = QEventLoop()
+    QTimer.singleShot(TIMEOUT_MS, loop.quit)
+
+    def callback(report: thread_report) -> None:
+        completed.append(report)
+        if len(completed) == TASKS:
+            loop.quit()
+
+    start = time.perf_counter()
+    for _ in range(TASKS):
+        mcs.run(callback, "communication.get_register", "CL_VEL_REF_MAX", "Axis1")
+    loop.exec()
+    duration = time.perf_counter() - start
+    assert len(completed) == TASKS
+    perf_benchmark.record_rate("callbacks", TASKS, duration)
+
+
+def test_check_dictionary_format(
+    mcs: MotionControllerService, perf_benchmark: Benchmark, tmp_path: Path
+) -> None:
+    cold: list[float] = []
+    warm: list[float] = []
+    for _ in range(REPETITIONS):
+        mcs.dictionary_cache = DictionaryCache(cache_directory=str(tmp_path))
+        start = time.perf_counter()
+        mcs.check_dictionary_format(str(DICTIONARY))
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        mcs.check_dictionary_format(str(DICTIONARY))
+        warm.append(time.perf_counter() - start)
+    perf_benchmark.record("cold", cold, "s")
+    perf_benchmark.record("cached", warm, "s")
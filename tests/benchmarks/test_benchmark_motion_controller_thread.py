@@ -0,0 +1,34 @@
+import time
+
+from k2basecamp.services.motion_controller_thread import MotionControllerThread
+from k2basecamp.utils.types import motion_controller_task, thread_report
+from tests.benchmarks.conftest import Benchmark
+
+"""Measure how many tasks per second the MotionControllerThread executes when the
+tasks themselves take no time.
+"""
+
+TASKS = 5000
+
+
+def test_tasks_per_second(perf_benchmark: Benchmark) -> None:
+    thread = MotionControllerThread()
+    executed: list[int] = []
+
+    def callback(report: thread_report) -> None:
+        pass
+
+    thread.start()
+    start = time.perf_counter()
+    for index in range(TASKS):
+        thread.add_task(
+            motion_controller_task(
+                action=executed.append, callback=callback, args=(index,), kwargs={}
+            )
+        )
+    thread.queue.join()
+    duration = time.perf_counter() - start
+    thread.stop()
+    thread.wait()
+    assert len(executed) == TASKS
+    perf_benchmark.record_rate("tasks", TASKS, duration)
@@ -0,0 +1,41 @@
+import numpy as np
+import numpy.typing as npt
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.services.motion_controller_service import MotionControllerService
+from tests.benchmarks.conftest import Benchmark
+
+"""Poll a simulated drive as fast as possible and measure how many samples per
+second reach the subscriber.
+"""
+
+DURATION_MS = 1000
+SAMPLING_TIME = 0.0005
+REFRESH_TIME = 0.01
+
+
+def test_samples_per_second(
+    qtbot: QtBot, mcs: MotionControllerService, perf_benchmark: Benchmark
+) -> None:
+    samples: list[int] = []
+
+    def callback(
+        timestamps: npt.NDArray[np.float64], data: npt.NDArray[np.float64]
+    ) -> None:
+        samples.append(timestamps.size)
+
+    mcs.subscribe_registers(
+        "Axis1",
+        [
+            {"name": "CL_VEL_FBK_VALUE", "axis": 1},
+            {"name": "CL_CUR_Q_VALUE", "axis": 1},
+        ],
+        callback,
+        sampling_time=SAMPLING_TIME,
+        refresh_time=REFRESH_TIME,
+    )
+    qtbot.wait(DURATION_MS)
+    mcs.telemetry.stop()
+    assert sum(samples) > 0
+    perf_benchmark.record_rate("samples", sum(samples), DURATION_MS / 1000)
+    perf_benchmark.record_rate("batches", len(samples), DURATION_MS / 1000)
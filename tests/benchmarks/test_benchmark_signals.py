@@ -0,0 +1,56 @@
+import time
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+from pytestqt.qtbot import QtBot
+
+from tests.benchmarks.conftest import Benchmark
+
+"""Emit signals from a worker thread to an object of the main thread, as the
+MotionControllerThread and BusPollerThread do, and measure the cost of emitting them
+and the time they take to be delivered.
+"""
+
+SIGNALS = 2000
+
+
+class EmitterThread(QThread):
+    """Thread that emits its emission time as fast as possible."""
+
+    emitted: Signal = Signal(float)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.duration = 0.0
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        for _ in range(SIGNALS):
+            self.emitted.emit(time.perf_counter())
+        self.duration = time.perf_counter() - start
+
+
+class Receiver(QObject):
+    """Records how long each signal took to arrive."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.latencies: list[float] = []
+
+    @Slot(float)
+    def receive(self, timestamp: float) -> None:
+        self.latencies.append(time.perf_counter() - timestamp)
+
+
+def test_cross_thread_signals(qtbot: QtBot, perf_benchmark: Benchmark) -> None:
+    thread = EmitterThread()
+    receiver = Receiver()
+    thread.emitted.connect(receiver.receive)
+    start = time.perf_counter()
+    thread.start()
+    qtbot.waitUntil(lambda: len(receiver.latencies) == SIGNALS)
+    duration = time.perf_counter() - start
+    thread.wait()
+    # Emissions per second in the worker thread, and deliveries per second.
+    perf_benchmark.record_rate("emissions", SIGNALS, thread.duration)
+    perf_benchmark.record_rate("signals", SIGNALS, duration)
+    perf_benchmark.record("delivery", receiver.latencies, "s")
@@ -17,3 +17,11 @@ def connection_controller() -> Generator[ConnectionController, None, None]:
     connection_controller = ConnectionController(mcs)
     yield connection_controller
     connection_controller.mcs.stop_motion_controller_thread()
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--perf-json",
+        default=None,
+        help="Write the results of the benchmarks to this JSON file.",
+    )
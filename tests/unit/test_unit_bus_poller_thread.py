@@ -0,0 +1,153 @@
+import threading
+import time
+from pathlib import Path
+from typing import Any, Union, cast
+
+import numpy as np
+import numpy.typing as npt
+from ingeniamotion import MotionController
+from pytest_mock import MockerFixture
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.services.bus_poller_thread import BusPollerThread
+from k2basecamp.services.simulated_motion_controller import SimulatedMotionController
+from k2basecamp.utils.enums import BackpressurePolicy
+from k2basecamp.utils.types import polled_data, simulation_settings
+
+"""Poll several simulated drives on one CAN bus with a BusPollerThread and confirm
+that their registers are read by a single thread, in turns and within the bus
+budget, and that every refresh delivers one batch with the data of all the drives.
+Also emit data to a consumer that does not acknowledge it right away and confirm
+that the data is held back according to the backpressure policy.
+"""
+
+VELOCITY: dict[str, Union[int, str]] = {"name": "CL_VEL_FBK_VALUE", "axis": 1}
+BUS_BUDGET = 200.0
+
+
+def test_bus_poller(qtbot: QtBot, mocker: MockerFixture) -> None:
+    node_ids = [31, 32, 33, 34]
+    mc = SimulatedMotionController(simulation_settings(latency=0, node_ids=node_ids))
+    dictionary = Path(__file__).parents[1] / "assets" / "eve-xcr-c_can_2.4.1.xdf"
+    drives = [f"Axis{position}" for position in range(1, len(node_ids) + 1)]
+    for drive, node_id in zip(drives, node_ids):
+        mc.communication.connect_servo_canopen(
+            None, str(dictionary), node_id, alias=drive
+        )
+    (bus,) = set(mc.servo_net.values())
+    reads: list[tuple[int, str]] = []
+    get_register = mc.communication.get_register
+
+    def counting_get_register(register: str, servo: str, axis: int) -> Any:
+        reads.append((threading.get_ident(), servo))
+        return get_register(register, servo=servo, axis=axis)
+
+    mocker.patch.object(
+        mc.communication, "get_register", side_effect=counting_get_register
+    )
+    bus_poller = BusPollerThread(
+        cast(MotionController, mc), bus, bus_budget=BUS_BUDGET, refresh_time=0.05
+    )
+    batches: list[dict[str, polled_data]] = []
+
+    def handle_batch(batch: dict[str, polled_data]) -> None:
+        batches.append(batch)
+        bus_poller.acknowledge()
+
+    bus_poller.new_data_available_triggered.connect(handle_batch)
+    for drive in drives:
+        # Faster than the bus budget allows for four drives.
+        bus_poller.set_drive(drive, [VELOCITY], sampling_time=0.001)
+    bus_poller.start()
+    qtbot.waitUntil(lambda: len(batches) >= 5)
+    bus_poller.stop()
+    bus_poller.wait()
+    elapsed = time.monotonic() - bus_poller.start_time
+
+    assert len({thread for thread, _ in reads}) == 1
+    assert len(reads) <= BUS_BUDGET * elapsed + 1
+    reads_per_drive = [sum(servo == drive for _, servo in reads) for drive in drives]
+    assert max(reads_per_drive) - min(reads_per_drive) <= 1
+    for batch in batches:
+        assert sorted(batch) == drives
+        for drive_data in batch.values():
+            assert drive_data.registers == [VELOCITY]
+            assert drive_data.data.shape == (1, len(drive_data.timestamps))
+
+
+class FakePoller:
+    """Poller that returns one sample per read, whose timestamp is the number of
+    reads."""
+
+    def __init__(self) -> None:
+        self.reads = 0
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    @property
+    def data(self) -> tuple[list[float], list[list[float]], bool]:
+        self.reads += 1
+        return [float(self.reads)], [[float(self.reads)]], False
+
+
+def create_bus_poller(
+    mocker: MockerFixture, policy: BackpressurePolicy, refresh_time: float = 0.005
+) -> tuple[BusPollerThread, list[npt.NDArray[np.float64]]]:
+    bus_poller = BusPollerThread(
+        mocker.MagicMock(),
+        "bus",
+        refresh_time=refresh_time,
+        backpressure_policy=policy,
+    )
+    bus_poller.set_drive("Axis1", [VELOCITY], poller=FakePoller())
+    batches: list[npt.NDArray[np.float64]] = []
+    bus_poller.new_data_available_triggered.connect(
+        lambda batch: batches.append(batch["Axis1"].timestamps)
+    )
+    return bus_poller, batches
+
+
+def test_coalesce(qtbot: QtBot, mocker: MockerFixture) -> None:
+    bus_poller, batches = create_bus_poller(mocker, BackpressurePolicy.Coalesce)
+    bus_poller.start()
+    qtbot.waitUntil(lambda: len(batches) == 1)
+    time.sleep(0.05)
+    qtbot.wait(10)
+    # Nothing else is emitted until the batch is acknowledged.
+    assert len(batches) == 1
+    bus_poller.acknowledge()
+    qtbot.waitUntil(lambda: len(batches) == 2)
+    bus_poller.stop()
+    assert bus_poller.wait(1000)
+    # Every sample read in the meantime is delivered at once.
+    assert len(batches[1]) > 1
+    assert np.allclose(np.diff(batches[1]), 1.0)
+
+
+def test_latest(qtbot: QtBot, mocker: MockerFixture) -> None:
+    bus_poller, batches = create_bus_poller(mocker, BackpressurePolicy.Latest)
+    bus_poller.start()
+    qtbot.waitUntil(lambda: len(batches) == 1)
+    time.sleep(0.05)
+    bus_poller.acknowledge()
+    qtbot.waitUntil(lambda: len(batches) == 2)
+    bus_poller.stop()
+    assert bus_poller.wait(1000)
+    # Only the newest sample is delivered.
+    assert len(batches[1]) == 1
+    assert batches[1][0] > batches[0][-1] + 1
+
+
+def test_stop(qtbot: QtBot, mocker: MockerFixture) -> None:
+    bus_poller, _ = create_bus_poller(
+        mocker, BackpressurePolicy.Coalesce, refresh_time=60
+    )
+    bus_poller.start()
+    qtbot.wait(10)
+    bus_poller.stop()
+    # The thread does not wait for the end of the refresh period.
+    assert bus_poller.wait(1000)
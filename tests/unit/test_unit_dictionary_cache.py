@@ -0,0 +1,111 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from ingenialink.dictionary import Interface
+from ingenialink.exceptions import ILError
+from ingenialink.servo import DictionaryFactory
+
+from k2basecamp.services.dictionary_cache import DictionaryCache
+
+"""Read the Device element of dictionaries and parse dictionaries through the
+DictionaryCache, and confirm that files are only read and parsed again when they
+change, that every request gets its own copy of a parsed dictionary and that the
+drives using the same dictionary share its error index.
+"""
+
+ETHERCAT_DICTIONARY = "tests/assets/cap-net-e_eoe_2.4.1.xdf"
+CANOPEN_DICTIONARY = "tests/assets/eve-xcr-c_can_2.4.1.xdf"
+
+
+def test_device_attributes(tmp_path: Path) -> None:
+    cache = DictionaryCache()
+    assert cache.get_device_attributes(ETHERCAT_DICTIONARY)["Interface"] == "ETH"
+    assert cache.get_device_attributes(CANOPEN_DICTIONARY)["Interface"] == "CAN"
+    assert cache.get_device_attributes(CANOPEN_DICTIONARY)["firmwareVersion"] == "2.4.1"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    dictionary = tmp_path / "dictionary.xdf"
+    shutil.copy(CANOPEN_DICTIONARY, dictionary)
+    cache.get_device_attributes(str(dictionary))
+    dictionary.write_text(
+        dictionary.read_text().replace('Interface="CAN"', 'Interface="ETH"')
+    )
+    os.utime(dictionary, ns=(0, 0))
+    # The file changed, so it is read again.
+    assert cache.get_device_attributes(str(dictionary))["Interface"] == "ETH"
+    assert cache.misses == 4
+
+
+def test_invalid_dictionary(tmp_path: Path) -> None:
+    cache = DictionaryCache()
+    for contents in ["<IngeniaDictionary><Body></Body></IngeniaDictionary>", "<a"]:
+        dictionary = tmp_path / "dictionary.xdf"
+        dictionary.write_text(contents)
+        with pytest.raises(ILError):
+            cache.get_device_attributes(str(dictionary))
+    with pytest.raises(FileNotFoundError):
+        cache.get_device_attributes(str(tmp_path / "missing.xdf"))
+
+
+def test_get_dictionary(tmp_path: Path) -> None:
+    cache = DictionaryCache(cache_directory=str(tmp_path))
+    dictionary = cache.get_dictionary(CANOPEN_DICTIONARY, Interface.CAN)
+    # The second drive gets its own copy: the values of the registers of one drive
+    # do not leak into the other.
+    other_dictionary = cache.get_dictionary(CANOPEN_DICTIONARY, Interface.CAN)
+    assert other_dictionary is not dictionary
+    uid, register = next(iter(dictionary.registers(1).items()))
+    register.storage = 1234
+    assert other_dictionary.registers(1)[uid].storage != 1234
+    assert (
+        cache.get_dictionary(CANOPEN_DICTIONARY, Interface.CAN)
+        .registers(1)[uid]
+        .storage
+        != 1234
+    )
+    assert (cache.dictionaries_parsed, cache.dictionaries_shared) == (1, 2)
+    # ingenialink still parses its own dictionaries.
+    assert (
+        DictionaryFactory.create_dictionary(CANOPEN_DICTIONARY, Interface.CAN)
+        is not dictionary
+    )
+
+    # Another instance (e.g. after restarting the application) loads the
+    # dictionary from the cache directory instead of parsing it.
+    copied_dictionary = tmp_path / "dictionary.xdf"
+    shutil.copy(CANOPEN_DICTIONARY, copied_dictionary)
+    other_cache = DictionaryCache(cache_directory=str(tmp_path))
+    loaded_dictionary = other_cache.get_dictionary(
+        str(copied_dictionary), Interface.CAN
+    )
+    assert (other_cache.dictionaries_parsed, other_cache.dictionaries_loaded) == (0, 1)
+    assert loaded_dictionary.path == str(copied_dictionary)
+    assert loaded_dictionary.registers(1).keys() == dictionary.registers(1).keys()
+    # The copies of the same version have the requested path.
+    assert other_cache.get_dictionary(CANOPEN_DICTIONARY, Interface.CAN).path == (
+        CANOPEN_DICTIONARY
+    )
+
+
+def test_error_index(tmp_path: Path) -> None:
+    cache = DictionaryCache()
+    error_index = cache.get_error_index(CANOPEN_DICTIONARY)
+    assert len(error_index) == 80
+    error = error_index[0x2280]
+    assert (error.affected_module, error.error_type, error.description) == (
+        "Power stage",
+        "cyclic",
+        "HW over current",
+    )
+    # A copy of the dictionary, e.g. selected for the other drive, shares the index.
+    dictionary = tmp_path / "dictionary.xdf"
+    shutil.copy(CANOPEN_DICTIONARY, dictionary)
+    assert cache.get_error_index(str(dictionary)) is error_index
+    assert (cache.error_index_hits, cache.error_index_misses) == (1, 1)
+    assert (cache.hits, cache.misses) == (0, 0)
+
+    dictionary.write_text("<IngeniaDictionary><Body><Errors><Error/>")
+    with pytest.raises(ILError):
+        cache.get_error_index(str(dictionary))
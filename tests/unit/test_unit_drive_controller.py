@@ -1,8 +1,15 @@
+import numpy as np
 from ingenialink import CAN_BAUDRATE
 from PySide6.QtTest import QSignalSpy
 
 from k2basecamp.controllers.connection_controller import ConnectionController
-from k2basecamp.utils.enums import ButtonState, CanDevice, ConnectionProtocol, Drive
+from k2basecamp.utils.enums import (
+    ButtonState,
+    CanDevice,
+    ConnectionProtocol,
+    Drive,
+    DriveId,
+)
 
 """Use the various slots (functions) in the ConnectionController to change the
 application state and confirm that it has been changed as expected.
@@ -93,3 +100,19 @@ def test_connect_button(connection_controller: ConnectionController) -> None:
     )
     # The button state was checked every time something was selected in the controller.
     assert connect_button_spy.count() == 7
+
+
+def test_velocity_batch(connection_controller: ConnectionController) -> None:
+    velocity_spy = QSignalSpy(connection_controller.velocity_changed)
+    timestamps = np.array([0.1, 0.2, 0.3])
+    data = np.array([[1.0, 2.0, 3.0]])
+    connection_controller.handle_new_velocity_data(DriveId(1), timestamps, data)
+    # The whole batch is stored and the UI is notified with a single signal.
+    assert velocity_spy.count() == 1
+    assert velocity_spy.at(0)[0] == 0.3
+    assert velocity_spy.at(0)[1] == Drive.Axis1.value
+    stored_timestamps, stored_values = connection_controller.plot_models[
+        DriveId(1)
+    ].data()
+    assert stored_timestamps.tolist() == [0.1, 0.2, 0.3]
+    assert stored_values.tolist() == [1.0, 2.0, 3.0]
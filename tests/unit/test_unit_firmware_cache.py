@@ -0,0 +1,171 @@
+import io
+import json
+import os
+import zipfile
+from pathlib import Path
+from typing import cast
+
+import pytest
+from ingenialink.exceptions import ILError
+from ingenialink.utils.mcb import MCB
+from ingeniamotion import MotionController
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.controllers.bootloader_controller import BootloaderController
+from k2basecamp.services.firmware_cache import FirmwareCache
+from k2basecamp.services.motion_controller_service import MotionControllerService
+from k2basecamp.services.simulated_motion_controller import SimulatedMotionController
+from k2basecamp.utils.enums import ButtonState, ConnectionProtocol, Drive
+from k2basecamp.utils.types import simulation_settings, thread_report
+
+"""Parse firmware files through the FirmwareCache and confirm that their checksums
+are verified, that truncated or corrupt files and files for other protocols or more
+drives are rejected, and that a file is only parsed once per version. The
+BootloaderController only enables the installation once the selected file passed the
+check, and only reports the failures of the newest check.
+"""
+
+SFU_FIRMWARE = "74 67 00 00 00 00 00 00 00 00\n00 10 01 02 03 04\n"
+
+
+def write_lfu(path: Path) -> bytes:
+    mcb = MCB()
+    with open(path, "wb") as file:
+        mcb.add_cmd(10, 0, 0x6774, bytes(8), file)
+        # An extended frame, followed by its data.
+        mcb.add_cmd(10, 1, 0x1000, bytes(range(32)), file)
+    return path.read_bytes()
+
+
+def write_zfu(path: Path, drives: int) -> None:
+    mapping = {
+        "drives": [
+            {
+                "slave_id_offset": offset,
+                "fw_file": f"drive_{offset}.sfu",
+                "product_code": 0x1,
+                "revision_number": 0x1,
+            }
+            for offset in range(drives)
+        ]
+    }
+    with zipfile.ZipFile(path, "w") as ensemble:
+        ensemble.writestr("mapping.json", json.dumps(mapping))
+        for offset in range(drives):
+            ensemble.writestr(f"drive_{offset}.sfu", SFU_FIRMWARE)
+
+
+def test_firmware_cache(tmp_path: Path) -> None:
+    cache = FirmwareCache()
+    firmware = tmp_path / "firmware.sfu"
+    firmware.write_text(SFU_FIRMWARE)
+    image = cache.check_image(str(firmware), ConnectionProtocol.CANopen, [32])
+    assert (image.extension, image.commands) == (".sfu", 2)
+    assert cache.check_image(str(firmware), ConnectionProtocol.EtherCAT, [1]) is image
+    # The same contents under another name are not parsed again.
+    copied_firmware = tmp_path / "copy.sfu"
+    copied_firmware.write_text(SFU_FIRMWARE)
+    assert cache.get_image(str(copied_firmware)) is image
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # The file changed, so it is parsed again.
+    firmware.write_text(SFU_FIRMWARE + "00 10 05\n")
+    os.utime(firmware, ns=(0, 0))
+    assert cache.get_image(str(firmware)).commands == 3
+    assert cache.misses == 3
+
+
+def test_lfu_firmware(tmp_path: Path) -> None:
+    cache = FirmwareCache()
+    firmware = tmp_path / "firmware.lfu"
+    contents = write_lfu(firmware)
+    assert cache.check_image(str(firmware), ConnectionProtocol.CANopen, [32]).commands
+    for damaged_contents in [contents[:-1], contents[:5] + b"\xff" + contents[6:]]:
+        firmware.write_bytes(damaged_contents)
+        os.utime(firmware, ns=(0, 0))
+        with pytest.raises(ILError):
+            cache.check_image(str(firmware), ConnectionProtocol.CANopen, [32])
+        # Over EtherCAT the file is transferred as it is.
+        cache.check_image(str(firmware), ConnectionProtocol.EtherCAT, [1])
+
+
+def test_invalid_firmware(tmp_path: Path) -> None:
+    cache = FirmwareCache()
+    for name, contents in [
+        ("firmware.sfu", SFU_FIRMWARE[:-3].encode() + b"0\n"),
+        ("firmware.sfu", b""),
+        ("firmware.sfu", b"\xff\xfe"),
+        ("firmware.bin", SFU_FIRMWARE.encode()),
+    ]:
+        firmware = tmp_path / name
+        firmware.write_bytes(contents)
+        os.utime(firmware, ns=(0, 0))
+        with pytest.raises(ILError):
+            cache.get_image(str(firmware))
+    with pytest.raises(FileNotFoundError):
+        cache.get_image(str(tmp_path / "missing.sfu"))
+
+
+def test_ensemble_firmware(tmp_path: Path) -> None:
+    cache = FirmwareCache()
+    firmware = tmp_path / "firmware.zfu"
+    write_zfu(firmware, drives=2)
+    image = cache.check_image(str(firmware), ConnectionProtocol.EtherCAT, [2, 1])
+    assert sorted(image.ensemble) == [0, 1]
+    assert image.commands == 4
+    with pytest.raises(ILError, match="only 1 are selected"):
+        cache.check_image(str(firmware), ConnectionProtocol.EtherCAT, [1])
+    with pytest.raises(ILError, match="the drives 2 are not selected"):
+        cache.check_image(str(firmware), ConnectionProtocol.EtherCAT, [1, 3])
+
+    # A truncated ensemble, and an ensemble with a corrupt image.
+    contents = firmware.read_bytes()
+    firmware.write_bytes(contents[: len(contents) // 2])
+    with pytest.raises(ILError):
+        cache.get_image(str(firmware))
+    damaged_ensemble = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(contents)) as ensemble, zipfile.ZipFile(
+        damaged_ensemble, "w"
+    ) as damaged:
+        for member in ensemble.namelist():
+            data = ensemble.read(member)
+            damaged.writestr(member, data[:-2] if member == "drive_1.sfu" else data)
+    firmware.write_bytes(damaged_ensemble.getvalue())
+    with pytest.raises(ILError, match="drive_1.sfu is truncated"):
+        cache.get_image(str(firmware))
+
+
+def test_bootloader_controller(qtbot: QtBot, tmp_path: Path) -> None:
+    mc = SimulatedMotionController(simulation_settings(latency=0))
+    mcs = MotionControllerService(cast(MotionController, mc))
+    bootloader_controller = BootloaderController(mcs)
+    button_states: list[int] = []
+    errors: list[str] = []
+    bootloader_controller.install_button_state_changed.connect(button_states.append)
+    bootloader_controller.error_triggered.connect(errors.append)
+    task_errors: list[thread_report] = []
+    mcs.error_triggered.connect(task_errors.append)
+    firmware = tmp_path / "firmware.zfu"
+    write_zfu(firmware, drives=2)
+    bootloader_controller.select_node_id(1, Drive.Axis1.value)
+    bootloader_controller.select_node_id(3, Drive.Axis2.value)
+    bootloader_controller.select_firmware(str(firmware))
+    qtbot.waitUntil(lambda: len(errors) == 1)
+    assert "the drives 2 are not selected" in errors[0]
+    assert task_errors == []
+    assert bootloader_controller.bootloader_model.install_button_state() == (
+        ButtonState.Disabled
+    )
+
+    bootloader_controller.select_node_id(2, Drive.Axis2.value)
+    qtbot.waitUntil(lambda: button_states[-1] == ButtonState.Enabled.value)
+    assert bootloader_controller.bootloader_model.firmware_image is not None
+    assert len(errors) == 1
+
+    # The failure of a check that was superseded is ignored.
+    bootloader_controller.check_firmware_error_callback(
+        (str(firmware), ConnectionProtocol.EtherCAT, (1, 3)),
+        thread_report(None, "check_firmware", None, 0, 0, ILError("Stale check.")),
+    )
+    assert len(errors) == 1
+    mcs.stop_motion_controller_thread()
@@ -0,0 +1,99 @@
+from pathlib import Path
+from typing import Union, cast
+
+import numpy as np
+import numpy.typing as npt
+import pytest
+from ingeniamotion import MotionController
+from ingeniamotion.exceptions import IMException
+from pytest_mock import MockerFixture
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.services.monitoring_thread import MAX_EMPTY_BLOCKS, MonitoringThread
+from k2basecamp.services.motion_controller_service import MotionControllerService
+from k2basecamp.services.simulated_motion_controller import (
+    LOOP_RATE,
+    SimulatedMonitoring,
+    SimulatedMotionController,
+)
+from k2basecamp.utils.types import simulation_settings
+
+"""Capture the velocity of a simulated drive with its monitoring buffer and confirm
+that it is delivered in blocks at the sampling rate of the drive, without reading
+the registers one by one, timestamped from when the monitoring was armed, and that
+a drive that sends no data is rearmed and eventually given up.
+"""
+
+VELOCITY: dict[str, Union[int, str]] = {"name": "CL_VEL_FBK_VALUE", "axis": 1}
+
+
+def create_motion_controller() -> SimulatedMotionController:
+    """Create a simulated MotionController with a drive (Axis1).
+
+    Returns:
+        SimulatedMotionController: the MotionController
+    """
+    mc = SimulatedMotionController(
+        simulation_settings(latency=0, velocity_time_constant=0.01)
+    )
+    dictionary = Path(__file__).parents[1] / "assets" / "eve-xcr-c_can_2.4.1.xdf"
+    mc.communication.connect_servo_canopen(None, str(dictionary), 31, alias="Axis1")
+    return mc
+
+
+def test_monitoring(qtbot: QtBot, mocker: MockerFixture) -> None:
+    mc = create_motion_controller()
+    mc.motion.motor_enable("Axis1")
+    mc.get_servo("Axis1").set_target_velocity(10.0)
+    mcs = MotionControllerService(cast(MotionController, mc))
+    blocks: list[tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]] = []
+
+    def callback(
+        timestamps: npt.NDArray[np.float64], data: npt.NDArray[np.float64]
+    ) -> None:
+        blocks.append((timestamps, data))
+
+    get_register = mocker.spy(mc.communication, "get_register")
+    create_poller = mocker.spy(mc.capture, "create_poller")
+    monitoring_id = mcs.start_monitoring(
+        "Axis1", [VELOCITY], callback, prescaler=4, block_duration=0.05
+    )
+    assert mcs.telemetry.monitored_drives() == ["Axis1"]
+    with pytest.raises(IMException):
+        mcs.start_monitoring("Axis1", [VELOCITY], callback)
+    qtbot.waitUntil(lambda: len(blocks) >= 3)
+    mcs.stop_monitoring(monitoring_id)
+    assert mcs.telemetry.monitored_drives() == []
+
+    samples = int(LOOP_RATE / 4 * 0.05)
+    for timestamps, data in blocks:
+        assert data.shape == (1, samples)
+        assert np.allclose(np.diff(timestamps), 4 / LOOP_RATE)
+    # Blocks are in order and do not overlap.
+    for (previous_timestamps, _), (timestamps, _) in zip(blocks, blocks[1:]):
+        assert timestamps[0] > previous_timestamps[-1]
+    assert blocks[-1][1][0, -1] == pytest.approx(10.0, abs=0.1)
+    get_register.assert_not_called()
+    create_poller.assert_not_called()
+    mcs.telemetry.stop()
+    mcs.stop_motion_controller_thread()
+
+
+def test_monitoring_without_data(qtbot: QtBot, mocker: MockerFixture) -> None:
+    mc = create_motion_controller()
+    mocker.patch.object(SimulatedMonitoring, "read_monitoring_data", return_value=[[]])
+    rearm_monitoring = mocker.spy(SimulatedMonitoring, "rearm_monitoring")
+    disable_monitoring = mocker.spy(mc.capture, "disable_monitoring")
+    monitoring_thread = MonitoringThread(
+        cast(MotionController, mc), "Axis1", [VELOCITY], block_duration=0.01
+    )
+    blocks: list[npt.NDArray[np.float64]] = []
+    monitoring_thread.new_data_available_triggered.connect(
+        lambda timestamps, data: blocks.append(data)
+    )
+    monitoring_thread.start()
+    # The thread gives up by itself.
+    assert monitoring_thread.wait(5000)
+    assert rearm_monitoring.call_count == MAX_EMPTY_BLOCKS - 1
+    disable_monitoring.assert_called_once()
+    assert blocks == []
@@ -0,0 +1,516 @@
+import json
+import threading
+import time
+import zipfile
+from concurrent.futures import CancelledError
+from pathlib import Path
+from typing import Any, cast
+
+import pytest
+
+from ingenialink import CAN_BAUDRATE, SERVO_STATE
+from ingenialink.canopen.network import CAN_DEVICE, CanopenNetwork
+from ingenialink.exceptions import ILError
+from ingeniamotion import MotionController
+from pytest_mock import MockerFixture
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.controllers.connection_controller import ConnectionController
+from k2basecamp.models.bootloader_model import BootloaderModel
+from k2basecamp.models.connection_model import ConnectionModel
+from k2basecamp.services.motion_controller_service import (
+    MotionControllerService,
+    check_canopen_nodes,
+)
+from k2basecamp.services.topology_cache import TopologyCache
+from k2basecamp.services.simulated_motion_controller import (
+    SIMULATED_INTERFACE,
+    SimulatedMotionController,
+)
+from k2basecamp.utils.enums import (
+    ConnectionProtocol,
+    ConnectionStage,
+    DriveId,
+    FirmwareStage,
+    TaskPriority,
+)
+from k2basecamp.utils.types import (
+    error_snapshot,
+    register_write,
+    simulation_settings,
+    thread_report,
+)
+
+"""Run tasks on the MotionControllerService and confirm that the drives are
+serviced concurrently: a blocked task of one drive does not delay the tasks of the
+other drive, the configurations of both drives are loaded at the same time, any
+number of drives share a fixed number of workers, a batch of register writes is
+reported once, the firmware of several EtherCAT slaves is installed and reported
+per slave, an ensemble firmware is loaded once per ensemble, errors that occur
+together are read and reported at once, the newest setpoint is sent however long
+it waited, a late diagnostics task is dropped without an error, no queued command
+is executed after an emergency stop, which reports the cancelled commands and does
+not wait for the general purpose thread, and a CANopen scan only checks the nodes
+found last time unless they do not answer, without opening a second handle on a
+busy channel.
+"""
+
+
+def test_worker_per_drive(
+    qtbot: QtBot, connection_controller: ConnectionController
+) -> None:
+    mcs = connection_controller.mcs
+    release = threading.Event()
+    reports: list[thread_report] = []
+
+    def report_callback(report: thread_report) -> None:
+        reports.append(report)
+
+    def blocking_task(drive: DriveId) -> str:
+        release.wait(5)
+        return "blocking"
+
+    mcs.run(report_callback, blocking_task, DriveId(1))
+    mcs.run(report_callback, lambda servo: "Axis1 task", servo=DriveId(1).name)
+    mcs.run(report_callback, lambda drive: "Axis2 task", DriveId(2))
+    mcs.run(report_callback, lambda: "general task")
+    qtbot.waitUntil(lambda: len(reports) == 2)
+    assert {report.output for report in reports} == {"Axis2 task", "general task"}
+    release.set()
+    qtbot.waitUntil(lambda: len(reports) == 4)
+    assert [report.output for report in reports[2:]] == ["blocking", "Axis1 task"]
+    assert reports[2].drive == DriveId(1)
+
+
+def test_late_setpoint(qtbot: QtBot) -> None:
+    mc = SimulatedMotionController(simulation_settings(latency=0))
+    mc.communication.connect_servo_canopen(
+        None, "tests/assets/eve-xcr-c_can_2.4.1.xdf", 31, alias=DriveId(1).name
+    )
+    mcs = MotionControllerService(cast(MotionController, mc))
+    started = threading.Event()
+    release = threading.Event()
+    reports: list[thread_report] = []
+    errors: list[thread_report] = []
+    mcs.error_triggered.connect(errors.append)
+
+    def blocking_task(drive: DriveId) -> bool:
+        started.set()
+        return release.wait(5)
+
+    mcs.run(reports.append, blocking_task, DriveId(1))
+    assert started.wait(5)
+    mcs.set_velocity(reports.append, DriveId(1), 10.0)
+    mcs.set_velocity(reports.append, DriveId(1), 20.0)
+    time.sleep(0.05)
+    release.set()
+    # The newest setpoint is sent however long it waited.
+    qtbot.waitUntil(lambda: len(reports) == 2)
+    assert reports[1].drive == DriveId(1)
+    assert mc.get_servo(DriveId(1).name).target_velocity == 20.0
+    assert errors == []
+    with pytest.raises(ValueError):
+        mcs.run(
+            reports.append,
+            "motion.set_velocity",
+            0.0,
+            servo=DriveId(1).name,
+            priority=TaskPriority.Control,
+            deadline=1.0,
+        )
+    mcs.stop_motion_controller_thread()
+
+
+def test_dropped_diagnostics(qtbot: QtBot) -> None:
+    mc = SimulatedMotionController(simulation_settings(latency=0))
+    mcs = MotionControllerService(cast(MotionController, mc))
+    started = threading.Event()
+    release = threading.Event()
+    reports: list[thread_report] = []
+    errors: list[thread_report] = []
+    mcs.error_triggered.connect(errors.append)
+
+    def blocking_task(drive: DriveId) -> bool:
+        started.set()
+        return release.wait(5)
+
+    mcs.run(reports.append, blocking_task, DriveId(1))
+    assert started.wait(5)
+    mcs.run(
+        reports.append,
+        lambda drive: "diagnostics",
+        DriveId(1),
+        priority=TaskPriority.Diagnostics,
+        deadline=0.01,
+    )
+    time.sleep(0.05)
+    release.set()
+    qtbot.waitUntil(lambda: mcs.task_metrics.outcomes("Axis1")["dropped"] == 1)
+    # A dropped task is only logged and recorded in the metrics.
+    qtbot.wait(50)
+    assert [report.output for report in reports] == [True]
+    assert errors == []
+    mcs.stop_motion_controller_thread()
+
+
+def test_emergency_stop(qtbot: QtBot) -> None:
+    mc = SimulatedMotionController(simulation_settings(latency=0))
+    dictionary = "tests/assets/eve-xcr-c_can_2.4.1.xdf"
+    for drive, node_id in [(DriveId(1), 31), (DriveId(2), 32)]:
+        mc.communication.connect_servo_canopen(
+            None, dictionary, node_id, alias=drive.name
+        )
+    mcs = MotionControllerService(cast(MotionController, mc))
+    started = threading.Event()
+    release = threading.Event()
+    release_general_thread = threading.Event()
+    reports: list[thread_report] = []
+    stop_reports: list[thread_report] = []
+    errors: list[thread_report] = []
+    mcs.error_triggered.connect(errors.append)
+    mcs.enable_motor(reports.append, DriveId(2))
+    qtbot.waitUntil(lambda: len(reports) == 1)
+
+    def blocking_task(drive: DriveId) -> bool:
+        started.set()
+        return release.wait(5)
+
+    def general_task() -> bool:
+        return release_general_thread.wait(5)
+
+    mcs.run(reports.append, general_task)
+    mcs.run(reports.append, blocking_task, DriveId(1))
+    assert started.wait(5)
+    mcs.enable_motor(reports.append, DriveId(1))
+    mcs.emergency_stop(stop_reports.append)
+    release.set()
+    # The emergency stop waited for the task of the worker of the drive, but not
+    # for the task of the general purpose thread.
+    qtbot.waitUntil(lambda: len(stop_reports) == 1)
+    assert stop_reports[0].drive is None and stop_reports[0].exceptions is None
+    assert not release_general_thread.is_set()
+    for drive in [DriveId(1), DriveId(2)]:
+        assert mc.get_servo(drive.name).state == SERVO_STATE.DISABLED
+    # The enable command that was still queued was cancelled and reported.
+    qtbot.waitUntil(lambda: len(errors) == 1)
+    assert errors[0].drive == DriveId(1)
+    assert isinstance(errors[0].exceptions, CancelledError)
+    release_general_thread.set()
+    qtbot.waitUntil(lambda: len(reports) == 3)
+    assert reports[1].output is True and reports[2].output is True
+    qtbot.wait(50)
+    assert len(reports) == 3
+    mcs.stop_motion_controller_thread()
+
+
+def test_connect_drives(qtbot: QtBot, mocker: MockerFixture) -> None:
+    mc = mocker.patch(
+        "k2basecamp.services.motion_controller_service.MotionController"
+    ).return_value
+    mcs = MotionControllerService()
+    dictionary = "tests/assets/eve-xcr-c_can_2.4.1.xdf"
+    connection_model = ConnectionModel(
+        left_dictionary=dictionary,
+        left_dictionary_type=ConnectionProtocol.CANopen,
+        right_dictionary=dictionary,
+        right_dictionary_type=ConnectionProtocol.CANopen,
+        left_config="left.xcf",
+        right_config="right.xcf",
+    )
+    connection_model.left_id = 1
+    connection_model.right_id = 2
+    # Only returns if both configurations are loaded at the same time.
+    barrier = threading.Barrier(2, timeout=5)
+    mc.configuration.load_configuration.side_effect = lambda **kwargs: barrier.wait()
+    stages: list[tuple[DriveId, ConnectionStage]] = []
+    mcs.connection_stage_update_triggered.connect(
+        lambda drive, stage: stages.append((drive, stage))
+    )
+    reports: list[thread_report] = []
+    errors: list[thread_report] = []
+    mcs.error_triggered.connect(errors.append)
+
+    mcs.connect_drives(reports.append, connection_model)
+    qtbot.waitUntil(lambda: len(reports) == 1)
+    assert reports[0].exceptions is None
+    assert mc.communication.connect_servo_canopen.call_count == 2
+    qtbot.waitUntil(lambda: len(stages) == 6)
+    assert (DriveId(1), ConnectionStage.Connected) in stages
+    assert (DriveId(2), ConnectionStage.Connected) in stages
+    # Both drives decode their errors with the index of the shared dictionary.
+    error = mcs.describe_error(DriveId(2), 0x00012280)
+    assert error is not None and error.description == "HW over current"
+    assert mcs.dictionary_cache.error_index_misses == 1
+    assert mcs.dictionary_cache.error_index_hits == 1
+
+    # A failure of one drive is reported together with the result of the other.
+    def connect_servo_canopen(**kwargs: Any) -> None:
+        if kwargs["alias"] == DriveId(2).name:
+            raise ILError("Drive not found.")
+
+    mc.communication.connect_servo_canopen.side_effect = connect_servo_canopen
+    mc.configuration.load_configuration.side_effect = None
+    stages.clear()
+    mcs.connect_drives(reports.append, connection_model)
+    qtbot.waitUntil(lambda: len(errors) == 1)
+    assert str(errors[0].exceptions) == "Axis1: connected.\nAxis2: Drive not found."
+    assert (DriveId(2), ConnectionStage.Failed) in stages
+    mcs.stop_motion_controller_thread()
+
+
+def test_many_drives(qtbot: QtBot) -> None:
+    node_ids = [31, 32, 33, 34]
+    mc = SimulatedMotionController(simulation_settings(latency=0, node_ids=node_ids))
+    mcs = MotionControllerService(cast(MotionController, mc), worker_threads=2)
+    connection_model = ConnectionModel(number_of_drives=len(node_ids))
+    reports: list[thread_report] = []
+    dictionary = "tests/assets/eve-xcr-c_can_2.4.1.xdf"
+    for drive, node_id in zip(connection_model.drives, node_ids):
+        connection_model.ids[drive] = node_id
+        connection_model.dictionaries[drive] = dictionary
+        connection_model.dictionary_types[drive] = ConnectionProtocol.CANopen
+    mcs.connect_drives(reports.append, connection_model)
+    qtbot.waitUntil(lambda: len(reports) == 1)
+    assert reports[0].exceptions is None
+    assert list(mc.servos) == ["Axis1", "Axis2", "Axis3", "Axis4"]
+
+    # The drives share a fixed number of workers: Axis3 waits for Axis1, while
+    # Axis2 and Axis4 are serviced by the other worker.
+    release = threading.Event()
+    reports.clear()
+    mcs.run(reports.append, lambda drive: release.wait(5), DriveId(1))
+    for drive in [DriveId(2), DriveId(3), DriveId(4)]:
+        mcs.run(reports.append, lambda drive: drive, drive)
+    qtbot.waitUntil(lambda: len(reports) == 2)
+    assert [report.output for report in reports] == [DriveId(2), DriveId(4)]
+    release.set()
+    qtbot.waitUntil(lambda: len(reports) == 4)
+    assert reports[3].output == DriveId(3)
+    assert DriveId.from_alias("Axis3") == DriveId(3)
+    assert DriveId(3).name == "Axis3"
+    mcs.stop_motion_controller_thread()
+
+
+def test_scan_servos_cached_nodes(
+    qtbot: QtBot, mocker: MockerFixture, tmp_path: Path
+) -> None:
+    node_ids = [31, 32]
+    mc = SimulatedMotionController(simulation_settings(latency=0, node_ids=node_ids))
+    mcs = MotionControllerService(cast(MotionController, mc))
+    mcs.topology_cache = TopologyCache(str(tmp_path / "topology.json"))
+    check_canopen_nodes = mocker.patch(
+        "k2basecamp.services.motion_controller_service.check_canopen_nodes",
+        return_value=True,
+    )
+    scan_servos_canopen = mocker.spy(mc.communication, "scan_servos_canopen")
+    connection_model = ConnectionModel()
+    reports: list[thread_report] = []
+
+    # Nothing is cached yet: the whole network is scanned.
+    mcs.scan_servos(reports.append, connection_model)
+    qtbot.waitUntil(lambda: len(reports) == 1)
+    assert reports[0].output == node_ids
+    check_canopen_nodes.assert_not_called()
+    assert scan_servos_canopen.call_count == 1
+
+    # The cached nodes answer: the network is not scanned again.
+    mcs.scan_servos(reports.append, connection_model)
+    qtbot.waitUntil(lambda: len(reports) == 2)
+    assert reports[1].output == node_ids
+    assert check_canopen_nodes.call_args.args[1] == node_ids
+    assert scan_servos_canopen.call_count == 1
+
+    # The cache is stale: the whole network is scanned.
+    check_canopen_nodes.return_value = False
+    mcs.scan_servos(reports.append, connection_model)
+    qtbot.waitUntil(lambda: len(reports) == 3)
+    assert reports[2].output == node_ids
+    assert scan_servos_canopen.call_count == 2
+    mcs.stop_motion_controller_thread()
+
+
+def test_check_canopen_nodes_busy_channel(mocker: MockerFixture) -> None:
+    network = CanopenNetwork(
+        device=CAN_DEVICE.PCAN, channel=0, baudrate=CAN_BAUDRATE.Baudrate_1M
+    )
+    canopen_network = mocker.patch(
+        "k2basecamp.services.motion_controller_service.canopen.Network"
+    )
+    connection_model = ConnectionModel()
+    connection_model.connection = ConnectionProtocol.CANopen
+
+    # A second handle on a channel that ingenialink holds is never opened.
+    network._connection = mocker.Mock()
+    assert not check_canopen_nodes(connection_model, [31, 32], [network])
+    canopen_network.assert_not_called()
+
+    network._connection = None
+    canopen_network.return_value.add_node.return_value.sdo = mocker.Mock()
+    assert check_canopen_nodes(connection_model, [31, 32], [network])
+    canopen_network.return_value.disconnect.assert_called_once()
+
+
+def test_set_registers(qtbot: QtBot) -> None:
+    mc = SimulatedMotionController(simulation_settings(latency=0))
+    dictionary = Path(__file__).parents[1] / "assets" / "eve-xcr-c_can_2.4.1.xdf"
+    for drive, node_id in [(DriveId(1), 31), (DriveId(2), 32)]:
+        mc.communication.connect_servo_canopen(
+            None, str(dictionary), node_id, alias=drive.name
+        )
+    mcs = MotionControllerService(cast(MotionController, mc))
+    reports: list[thread_report] = []
+    errors: list[thread_report] = []
+    mcs.error_triggered.connect(errors.append)
+    writes = [
+        register_write(DriveId(1), "CL_VEL_REF_MAX", 10.0),
+        register_write(DriveId(2), "CL_VEL_REF_MAX", 20.0),
+        register_write(DriveId(1), "PROF_MAX_VEL", 30.0),
+    ]
+    mcs.set_registers(reports.append, writes)
+    qtbot.waitUntil(lambda: len(reports) == 1)
+    assert reports[0].output == writes
+    assert reports[0].exceptions is None
+    assert mc.get_servo("Axis1").read("PROF_MAX_VEL") == 30.0
+    assert mc.get_servo("Axis2").read("CL_VEL_REF_MAX") == 20.0
+
+    # A failed write does not prevent the next ones.
+    mc.fail_next("communication.set_register")
+    mcs.set_max_velocity(reports.append, DriveId(2), 5.0)
+    qtbot.waitUntil(lambda: len(errors) == 1)
+    assert isinstance(errors[0].exceptions, ILError)
+    assert errors[0].drive == DriveId(2)
+    assert mc.get_servo("Axis2").read("PROF_MAX_VEL") == 5.0
+    assert len(reports) == 1
+    mcs.stop_motion_controller_thread()
+
+
+def test_install_firmware_ecat(qtbot: QtBot, tmp_path: Path) -> None:
+    mc = SimulatedMotionController(simulation_settings(latency=0, node_ids=[1, 2, 3]))
+    mcs = MotionControllerService(cast(MotionController, mc))
+    firmware = tmp_path / "firmware.sfu"
+    firmware.write_text("74 67 00 00 00 00 00 00 00 00\n")
+    bootloader_model = BootloaderModel()
+    bootloader_model.connection = ConnectionProtocol.EtherCAT
+    bootloader_model.interface = SIMULATED_INTERFACE
+    stages: list[tuple[int, FirmwareStage]] = []
+    mcs.firmware_stage_update_triggered.connect(
+        lambda slave, stage: stages.append((slave, stage))
+    )
+    progress: list[int] = []
+    reports: list[thread_report] = []
+    errors: list[thread_report] = []
+    mcs.error_triggered.connect(errors.append)
+
+    mcs.install_firmware(
+        reports.append, progress.append, bootloader_model, str(firmware), [1, 2, 3]
+    )
+    qtbot.waitUntil(lambda: len(reports) == 1)
+    assert progress == [33, 66, 100]
+    assert [stage for slave, stage in stages if slave == 2] == [
+        FirmwareStage.Pending,
+        FirmwareStage.Installing,
+        FirmwareStage.Installed,
+    ]
+
+    # A slave that fails does not stop the others, and every result is reported.
+    stages.clear()
+    mcs.install_firmware(
+        reports.append, progress.append, bootloader_model, str(firmware), [1, 4, 3]
+    )
+    qtbot.waitUntil(lambda: len(errors) == 1)
+    assert (
+        str(errors[0].exceptions)
+        == "Slave 1: installed.\nSlave 4: Could not find the slave 4.\nSlave 3:"
+        " installed."
+    )
+    assert (4, FirmwareStage.Failed) in stages
+    assert (3, FirmwareStage.Installed) in stages
+    mcs.stop_motion_controller_thread()
+
+
+def test_install_firmware_ecat_ensemble(qtbot: QtBot, tmp_path: Path) -> None:
+    mc = SimulatedMotionController(
+        simulation_settings(latency=0, node_ids=[1, 2, 3, 4, 5])
+    )
+    mcs = MotionControllerService(cast(MotionController, mc))
+    firmware = tmp_path / "firmware.zfu"
+    mapping = {
+        "drives": [
+            {"slave_id_offset": offset, "fw_file": f"drive_{offset}.sfu"}
+            for offset in range(2)
+        ]
+    }
+    with zipfile.ZipFile(firmware, "w") as ensemble:
+        ensemble.writestr("mapping.json", json.dumps(mapping))
+        for offset in range(2):
+            ensemble.writestr(f"drive_{offset}.sfu", "74 67 00 00 00 00 00 00 00 00\n")
+    bootloader_model = BootloaderModel()
+    bootloader_model.connection = ConnectionProtocol.EtherCAT
+    bootloader_model.interface = SIMULATED_INTERFACE
+    stages: list[tuple[int, FirmwareStage]] = []
+    mcs.firmware_stage_update_triggered.connect(
+        lambda slave, stage: stages.append((slave, stage))
+    )
+    progress: list[int] = []
+    reports: list[thread_report] = []
+    errors: list[thread_report] = []
+    mcs.error_triggered.connect(errors.append)
+
+    mcs.install_firmware(
+        reports.append, progress.append, bootloader_model, str(firmware), [3, 1, 2, 4]
+    )
+    qtbot.waitUntil(lambda: len(reports) == 1)
+    assert sorted(mc.communication.flashed_slaves) == [1, 2, 3, 4]
+    assert progress == [50, 100]
+    for slave in [1, 2, 3, 4]:
+        assert [stage for stage_slave, stage in stages if stage_slave == slave] == [
+            FirmwareStage.Pending,
+            FirmwareStage.Installing,
+            FirmwareStage.Installed,
+        ]
+
+    # The slaves of an incomplete ensemble are not flashed.
+    mc.communication.flashed_slaves.clear()
+    stages.clear()
+    mcs.install_firmware(
+        reports.append, progress.append, bootloader_model, str(firmware), [1, 2, 5]
+    )
+    qtbot.waitUntil(lambda: len(errors) == 1)
+    assert "the drives 6 are not selected" in str(errors[0].exceptions)
+    assert mc.communication.flashed_slaves == []
+    assert stages == []
+    mcs.stop_motion_controller_thread()
+
+
+def test_error_snapshot(qtbot: QtBot, mocker: MockerFixture) -> None:
+    mc = SimulatedMotionController(simulation_settings(latency=0))
+    dictionary = Path(__file__).parents[1] / "assets" / "eve-xcr-c_can_2.4.1.xdf"
+    mc.communication.connect_servo_canopen(None, str(dictionary), 31, alias="Axis1")
+    mcs = MotionControllerService(cast(MotionController, mc))
+    connection_controller = ConnectionController(mcs)
+    error_triggered = mocker.patch.object(connection_controller, "error_triggered")
+    reports: list[thread_report] = []
+
+    mc.inject_error("Axis1", 0x1, "Old error.")
+    mcs.get_error_snapshot(reports.append, DriveId(1), 0)
+    qtbot.waitUntil(lambda: len(reports) == 1)
+    snapshot = reports[0].output
+    assert isinstance(snapshot, error_snapshot)
+    assert snapshot.count == 1
+    assert [error.code for error in snapshot.errors] == [0x1]
+    connection_controller.show_new_errors(reports[0])
+    error_triggered.emit.assert_called_once_with("Axis1: Old error.")
+    error_triggered.reset_mock()
+
+    # Two errors occur before the fault is handled.
+    servo = mc.get_servo("Axis1")
+    servo.errors += [(0x2, "Over-voltage."), (0x3, "Over-temperature.")]
+    connection_controller.update_servo_state(DriveId(1), SERVO_STATE.FAULT)
+    connection_controller.update_servo_state(DriveId(1), SERVO_STATE.FAULT)
+    qtbot.waitUntil(lambda: error_triggered.emit.called)
+    qtbot.wait(50)
+    # The second fault notification does not report the errors again.
+    error_triggered.emit.assert_called_once_with(
+        "Axis1: Over-voltage.\nAxis1: Over-temperature."
+    )
+    mcs.stop_motion_controller_thread()
@@ -0,0 +1,193 @@
+import time
+from concurrent.futures import CancelledError
+from typing import Any, Callable, Optional
+
+from ingenialink.exceptions import ILError
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.services.motion_controller_thread import MotionControllerThread
+from k2basecamp.utils.enums import TaskPriority
+from k2basecamp.utils.types import motion_controller_task, thread_report
+
+"""Queue tasks with different priorities and deadlines before the
+MotionControllerThread starts and confirm they are executed by priority and that
+expired tasks are dropped, that the failures of a task with an error callback are
+sent to it, that cancelled tasks are reported as failed, and that a stopped thread
+executes the tasks that were queued before the stop request.
+"""
+
+
+def test_priorities_and_deadlines(qtbot: QtBot) -> None:
+    thread = MotionControllerThread()
+    executed: list[str] = []
+    dropped: list[thread_report] = []
+    thread.task_dropped.connect(dropped.append)
+
+    def callback(report: thread_report) -> None:
+        pass
+
+    for name, priority, deadline in [
+        ("diagnostics", TaskPriority.Diagnostics, None),
+        ("expired", TaskPriority.Diagnostics, time.time() - 1),
+        ("configuration", TaskPriority.Configuration, None),
+        ("control", TaskPriority.Control, None),
+        ("second control", TaskPriority.Control, time.time() + 60),
+    ]:
+        thread.add_task(
+            motion_controller_task(
+                action=executed.append,
+                callback=callback,
+                args=(name,),
+                kwargs={},
+                priority=priority,
+                deadline=deadline,
+            )
+        )
+    with qtbot.waitSignal(thread.task_dropped):
+        thread.start()
+        thread.queue.join()
+    thread.stop()
+    thread.wait()
+    assert executed == ["control", "second control", "configuration", "diagnostics"]
+    assert len(dropped) == 1
+    assert isinstance(dropped[0].exceptions, TimeoutError)
+
+
+def test_coalesce(qtbot: QtBot) -> None:
+    thread = MotionControllerThread()
+    executed: list[float] = []
+
+    def callback(report: thread_report) -> None:
+        pass
+
+    for drive, velocity in [
+        ("Axis1", 1.0),
+        ("Axis2", 5.0),
+        ("Axis1", 2.0),
+        ("Axis1", 3.0),
+    ]:
+        thread.add_task(
+            motion_controller_task(
+                action=executed.append,
+                callback=callback,
+                args=(velocity,),
+                kwargs={},
+                coalesce_key=(drive, "motion.set_velocity"),
+            )
+        )
+    thread.start()
+    thread.queue.join()
+    thread.stop()
+    thread.wait()
+    # Only the newest setpoint of each drive is sent, in the order of the first one.
+    assert executed == [3.0, 5.0]
+    assert thread.coalesce_counts == {("Axis1", "motion.set_velocity"): 2}
+
+
+def test_error_callback(qtbot: QtBot) -> None:
+    thread = MotionControllerThread()
+    errored: list[thread_report] = []
+    completed: list[tuple[Callable[..., Any], thread_report]] = []
+    thread.task_errored.connect(errored.append)
+    thread.task_dropped.connect(errored.append)
+    thread.task_completed.connect(
+        lambda callback, report: completed.append((callback, report))
+    )
+
+    def callback(report: thread_report) -> None:
+        pass
+
+    def error_callback(report: thread_report) -> None:
+        pass
+
+    def fail() -> None:
+        raise ILError("Failed.")
+
+    tasks: list[tuple[Callable[..., Any], Optional[float]]] = [
+        (fail, None),
+        (print, time.time() - 1),
+    ]
+    for action, deadline in tasks:
+        thread.add_task(
+            motion_controller_task(
+                action=action,
+                callback=callback,
+                args=(),
+                kwargs={},
+                deadline=deadline,
+                error_callback=error_callback,
+            )
+        )
+    thread.start()
+    thread.queue.join()
+    thread.stop()
+    thread.wait()
+    qtbot.waitUntil(lambda: len(completed) == 2)
+    assert errored == []
+    assert [callback for callback, _ in completed] == [error_callback] * 2
+    assert isinstance(completed[0][1].exceptions, ILError)
+    assert isinstance(completed[1][1].exceptions, TimeoutError)
+
+
+def test_cancel_pending_tasks(qtbot: QtBot) -> None:
+    thread = MotionControllerThread()
+    executed: list[str] = []
+    errored: list[thread_report] = []
+    completed: list[tuple[Callable[..., Any], thread_report]] = []
+    thread.task_errored.connect(errored.append)
+    thread.task_completed.connect(
+        lambda callback, report: completed.append((callback, report))
+    )
+
+    def callback(report: thread_report) -> None:
+        pass
+
+    def error_callback(report: thread_report) -> None:
+        pass
+
+    for name, task_error_callback in [
+        ("without error callback", None),
+        ("with error callback", error_callback),
+    ]:
+        thread.add_task(
+            motion_controller_task(
+                action=executed.append,
+                callback=callback,
+                args=(name,),
+                kwargs={},
+                error_callback=task_error_callback,
+            )
+        )
+    thread.stop()
+    assert thread.cancel_pending_tasks() == 2
+    qtbot.waitUntil(lambda: len(errored) == 1 and len(completed) == 1)
+    assert isinstance(errored[0].exceptions, CancelledError)
+    assert completed[0][0] == error_callback
+    assert isinstance(completed[0][1].exceptions, CancelledError)
+    # The stop request is kept.
+    thread.start()
+    assert thread.wait(5000)
+    assert executed == []
+
+
+def test_stop_after_queued_tasks(qtbot: QtBot) -> None:
+    thread = MotionControllerThread()
+    executed: list[int] = []
+
+    def callback(report: thread_report) -> None:
+        pass
+
+    for number in range(5):
+        thread.add_task(
+            motion_controller_task(
+                action=executed.append,
+                callback=callback,
+                args=(number,),
+                kwargs={},
+                priority=TaskPriority.Diagnostics,
+            )
+        )
+    thread.stop()
+    thread.start()
+    thread.wait()
+    assert executed == [0, 1, 2, 3, 4]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from k2basecamp.models.plot_model import PlotModel
+
+"""Fill the PlotModel with data and confirm that it keeps a bounded amount of points
+and that the decimated points preserve the shape of the data.
+"""
+
+
+def test_ring_buffer() -> None:
+    plot_model = PlotModel(capacity=10)
+    plot_model.append(np.arange(6, dtype=np.float64), np.arange(6, dtype=np.float64))
+    assert len(plot_model) == 6
+    plot_model.append(np.arange(6, 14, dtype=np.float64), np.zeros(8))
+    # The oldest points are overwritten once the buffer is full.
+    assert len(plot_model) == 10
+    timestamps, values = plot_model.data()
+    assert timestamps.tolist() == list(range(4, 14))
+    assert values.tolist() == [4.0, 5.0] + [0.0] * 8
+    assert plot_model.last_timestamp == 13.0
+    plot_model.clear()
+    assert len(plot_model) == 0
+    assert plot_model.last_timestamp is None
+
+
+def test_decimate() -> None:
+    plot_model = PlotModel(capacity=1000)
+    timestamps = np.linspace(0, 10, 1000, endpoint=False)
+    values = np.sin(timestamps)
+    values[500] = 5.0
+    plot_model.append(timestamps, values)
+    decimated_timestamps, decimated_values = plot_model.decimate(0, 10, 50)
+    # One minimum / maximum pair per column.
+    assert len(decimated_timestamps) == len(decimated_values) == 100
+    # Peaks are not lost.
+    assert decimated_values.max() == 5.0
+    assert decimated_values.min() == values.min()
+    # Only the points in the visible range are returned.
+    window_timestamps, _ = plot_model.decimate(2, 3, 1000)
+    assert window_timestamps[0] >= 2 and window_timestamps[-1] <= 3
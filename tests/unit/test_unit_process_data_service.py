@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import Union, cast
+
+import numpy as np
+import numpy.typing as npt
+import pytest
+from ingeniamotion import MotionController
+from pytest_mock import MockerFixture
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.services.motion_controller_service import MotionControllerService
+from k2basecamp.services.simulated_motion_controller import SimulatedMotionController
+from k2basecamp.utils.enums import DriveId
+from k2basecamp.utils.types import simulation_settings, thread_report
+
+"""Exchange the velocity of a simulated drive through PDOs and confirm that the
+setpoints and the velocity feedback bypass the request queue and the poller.
+"""
+
+VELOCITY: dict[str, Union[int, str]] = {"name": "CL_VEL_FBK_VALUE", "axis": 1}
+
+
+def test_process_data(qtbot: QtBot, mocker: MockerFixture) -> None:
+    mc = SimulatedMotionController(
+        simulation_settings(latency=0, velocity_time_constant=0.01)
+    )
+    dictionary = Path(__file__).parents[1] / "assets" / "cap-net-e_eoe_2.4.1.xdf"
+    mc.communication.connect_servo_ethercat_interface_index(
+        0, 31, str(dictionary), alias="Axis1"
+    )
+    mc.motion.motor_enable("Axis1")
+    mcs = MotionControllerService(cast(MotionController, mc))
+    reports: list[thread_report] = []
+    feedback: list[float] = []
+
+    def callback(
+        timestamps: npt.NDArray[np.float64], data: npt.NDArray[np.float64]
+    ) -> None:
+        feedback.extend(data[0].tolist())
+
+    mcs.subscribe_registers("Axis1", [VELOCITY], callback, refresh_time=0.01)
+    create_poller = mocker.spy(mc.capture, "create_poller")
+    set_velocity = mocker.spy(mc.motion, "set_velocity")
+
+    mcs.start_process_data(reports.append, [DriveId(1)], refresh_rate=0.002)
+    qtbot.waitUntil(lambda: len(reports) == 1)
+    assert mcs.process_data.is_active
+    get_register = mocker.spy(mc.communication, "get_register")
+    mcs.set_velocity(reports.append, DriveId(1), 10.0)
+    # The setpoint is reported like any other task, once control returns to the
+    # event loop.
+    assert len(reports) == 1
+    qtbot.waitUntil(lambda: len(reports) == 2)
+    qtbot.waitUntil(lambda: len(feedback) > 0 and feedback[-1] > 9.9)
+    assert mcs.process_data.latest("Axis1", "CL_VEL_FBK_VALUE") == pytest.approx(
+        10.0, abs=0.1
+    )
+    # Neither the request queue nor a register poller were used.
+    set_velocity.assert_not_called()
+    create_poller.assert_not_called()
+    get_register.assert_not_called()
+
+    mcs.stop_process_data(reports.append)
+    qtbot.waitUntil(lambda: len(reports) == 3)
+    assert not mcs.process_data.is_active
+    # The subscription is polled again.
+    qtbot.waitUntil(lambda: get_register.call_count > 0)
+    mcs.telemetry.stop()
+    mcs.stop_motion_controller_thread()
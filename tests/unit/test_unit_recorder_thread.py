@@ -0,0 +1,71 @@
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+from k2basecamp.services.recorder_thread import (
+    RecorderThread,
+    read_chunks,
+    read_recording,
+)
+
+"""Record batches of data with a RecorderThread and confirm that they can be read
+back, also when the last chunk was not completely written, and that a recorder
+with a full queue can be stopped without blocking.
+"""
+
+REGISTERS: list[dict[str, Union[int, str]]] = [
+    {"name": "CL_VEL_FBK_VALUE", "axis": 1},
+    {"name": "CL_CUR_Q_VALUE", "axis": 1},
+]
+
+
+def test_recording(tmp_path: Path) -> None:
+    path = str(tmp_path / "recording.k2rec")
+    recorder = RecorderThread(path, "Axis1", REGISTERS)
+    recorder.start()
+    for batch in range(10):
+        timestamps = np.arange(batch * 100, (batch + 1) * 100, dtype=np.float64)
+        recorder.record(timestamps, np.vstack([timestamps, -timestamps]))
+    recorder.stop()
+    assert recorder.wait(5000)
+    assert recorder.recorded_samples == 1000
+    assert recorder.dropped_batches == 0
+
+    header, timestamps, data = read_recording(path)
+    assert header["drive"] == "Axis1"
+    assert header["registers"] == REGISTERS
+    assert np.array_equal(timestamps, np.arange(1000))
+    assert np.array_equal(data, np.vstack([timestamps, -timestamps]))
+
+    # Simulate a recording that was interrupted while writing a chunk.
+    with open(path, "ab") as file:
+        file.write(b"\x10\x00\x00\x00\x03\x00\x00\x00" + b"\x00" * 10)
+    assert sum(chunk.shape[1] for chunk in read_chunks(path)) == 1000
+
+
+def test_empty_recording(tmp_path: Path) -> None:
+    path = str(tmp_path / "recording.k2rec")
+    recorder = RecorderThread(path, "Axis1", REGISTERS)
+    recorder.start()
+    recorder.stop()
+    assert recorder.wait(5000)
+    _, timestamps, data = read_recording(path)
+    assert timestamps.shape == (0,)
+    assert data.shape == (2, 0)
+
+
+def test_stop_full_queue(tmp_path: Path) -> None:
+    path = str(tmp_path / "recording.k2rec")
+    recorder = RecorderThread(path, "Axis1", REGISTERS, max_queued_batches=2)
+    timestamps = np.arange(100, dtype=np.float64)
+    for _ in range(3):
+        recorder.record(timestamps, np.vstack([timestamps, -timestamps]))
+    assert recorder.dropped_batches == 1
+    # The queue is full, stop does not wait for room for the sentinel.
+    recorder.stop()
+    recorder.record(timestamps, np.vstack([timestamps, -timestamps]))
+    recorder.start()
+    assert recorder.wait(5000)
+    assert recorder.recorded_samples == 200
+    assert recorder.dropped_batches == 1
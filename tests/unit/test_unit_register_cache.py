@@ -0,0 +1,47 @@
+import time
+
+from k2basecamp.services.register_cache import RegisterCache
+
+"""Store register values in the RegisterCache and confirm that they expire, are
+evicted and invalidated as expected, that registers without a time to live are not
+cached, and that hits and misses are counted.
+"""
+
+
+def test_ttl() -> None:
+    cache = RegisterCache(default_ttl=60, ttls={"CL_VEL_FBK_VALUE": 0.01})
+    cache.put("Axis1", 1, "CL_VEL_REF_MAX", 10)
+    cache.put("Axis1", 1, "CL_VEL_FBK_VALUE", 5.0)
+    assert cache.get("Axis1", 1, "CL_VEL_REF_MAX") == 10
+    assert cache.get("Axis1", 1, "CL_VEL_FBK_VALUE") == 5.0
+    time.sleep(0.02)
+    assert cache.get("Axis1", 1, "CL_VEL_REF_MAX") == 10
+    assert cache.get("Axis1", 1, "CL_VEL_FBK_VALUE") is None
+    assert cache.get("Axis2", 1, "CL_VEL_REF_MAX") is None
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_uncached_by_default() -> None:
+    cache = RegisterCache(ttls={"CL_VEL_REF_MAX": 60})
+    cache.put("Axis1", 1, "CL_VEL_REF_MAX", 10)
+    cache.put("Axis1", 1, "CL_VEL_FBK_VALUE", 5.0)
+    assert len(cache) == 1
+    assert cache.get("Axis1", 1, "CL_VEL_REF_MAX") == 10
+    assert cache.get("Axis1", 1, "CL_VEL_FBK_VALUE") is None
+
+
+def test_lru_and_invalidate() -> None:
+    cache = RegisterCache(default_ttl=60, capacity=2)
+    cache.put("Axis1", 1, "A", 1)
+    cache.put("Axis1", 1, "B", 2)
+    cache.get("Axis1", 1, "A")
+    cache.put("Axis1", 1, "C", 3)
+    # B was the least recently used entry.
+    assert cache.get("Axis1", 1, "B") is None
+    assert cache.get("Axis1", 1, "A") == 1
+    cache.put("Axis2", 1, "A", 4)
+    cache.invalidate(servo="Axis1")
+    assert len(cache) == 1
+    assert cache.get("Axis2", 1, "A") == 4
+    cache.invalidate()
+    assert len(cache) == 0
@@ -0,0 +1,74 @@
+import time
+from pathlib import Path
+
+import pytest
+from ingenialink import SERVO_STATE
+from ingenialink.exceptions import ILError
+
+from k2basecamp.services.simulated_motion_controller import SimulatedMotionController
+from k2basecamp.utils.types import simulation_settings
+
+"""Drive the simulated MotionController like the application does and confirm that
+the velocity feedback follows the target and that failures can be injected.
+"""
+
+
+def connect(mc: SimulatedMotionController, tmp_path: Path) -> None:
+    dictionary = tmp_path / "drive.xdf"
+    dictionary.write_text("<IngeniaDictionary/>")
+    mc.communication.connect_servo_canopen(None, str(dictionary), 31, alias="Axis1")
+
+
+def test_velocity_loop(tmp_path: Path) -> None:
+    mc = SimulatedMotionController(
+        simulation_settings(latency=0, velocity_time_constant=0.01)
+    )
+    connect(mc, tmp_path)
+    states: list[SERVO_STATE] = []
+    mc.communication.subscribe_servo_status(
+        lambda state, *args: states.append(state), "Axis1"
+    )
+    poller = mc.capture.create_poller(
+        [{"name": "CL_VEL_FBK_VALUE", "axis": 1}], "Axis1", 0.001, 1000
+    )
+    # The velocity is clamped to the maximum velocity.
+    mc.communication.set_register("CL_VEL_REF_MAX", 5.0, "Axis1")
+    mc.motion.motor_enable("Axis1")
+    mc.motion.set_velocity(10.0, "Axis1")
+    time.sleep(0.1)
+    assert mc.communication.get_register("CL_VEL_FBK_VALUE", "Axis1") == (
+        pytest.approx(5.0, abs=0.01)
+    )
+    timestamps, data, lost = poller.data
+    assert not lost
+    assert len(timestamps) == len(data[0]) > 0
+    assert data[0] == sorted(data[0])
+    mc.motion.motor_disable("Axis1")
+    time.sleep(0.1)
+    assert mc.communication.get_register("CL_VEL_FBK_VALUE", "Axis1") == (
+        pytest.approx(0.0, abs=0.01)
+    )
+    assert states == [SERVO_STATE.ENABLED, SERVO_STATE.DISABLED]
+
+
+def test_failures(tmp_path: Path) -> None:
+    mc = SimulatedMotionController(simulation_settings(latency=0))
+    with pytest.raises(FileNotFoundError):
+        mc.communication.connect_servo_canopen(None, "missing.xdf", 31)
+    connect(mc, tmp_path)
+    mc.fail_next("motion.motor_enable")
+    with pytest.raises(ILError):
+        mc.motion.motor_enable("Axis1")
+    mc.motion.motor_enable("Axis1")
+
+    mc.inject_error("Axis1", 0x3241, "Over-voltage")
+    assert mc.errors.get_number_total_errors("Axis1") == 1
+    code, _, _ = mc.errors.get_last_buffer_error("Axis1")
+    assert mc.errors.get_error_data(code, "Axis1")[3] == "Over-voltage"
+    assert mc.get_servo("Axis1").state == SERVO_STATE.FAULT
+
+    always_failing_mc = SimulatedMotionController(
+        simulation_settings(latency=0, failure_rate=1.0)
+    )
+    with pytest.raises(ILError):
+        always_failing_mc.communication.scan_servos_canopen(None)
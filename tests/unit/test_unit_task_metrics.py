@@ -0,0 +1,69 @@
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from ingenialink.exceptions import ILError
+
+from k2basecamp.services.motion_controller_thread import MotionControllerThread
+from k2basecamp.services.task_metrics import TaskMetrics
+from k2basecamp.utils.enums import DriveId
+from k2basecamp.utils.types import motion_controller_task, thread_report
+
+"""Run tasks that succeed, fail and expire on a MotionControllerThread and confirm
+that their wait and execution times, the queue depth and their outcomes are recorded
+and exported.
+"""
+
+
+def test_task_metrics(tmp_path: Path) -> None:
+    metrics = TaskMetrics()
+    thread = MotionControllerThread(metrics, DriveId(1))
+
+    def callback(report: thread_report) -> None:
+        pass
+
+    def fail() -> None:
+        raise ILError("Timeout")
+
+    tasks: list[tuple[Callable[..., Any], Optional[float]]] = [
+        (time.sleep, None),
+        (fail, None),
+        (time.sleep, time.time() - 1),
+    ]
+    for action, deadline in tasks:
+        thread.add_task(
+            motion_controller_task(
+                action=action,
+                callback=callback,
+                args=(0.01,) if action is time.sleep else (),
+                kwargs={},
+                deadline=deadline,
+            )
+        )
+    time.sleep(0.02)
+    thread.start()
+    thread.queue.join()
+    thread.stop()
+    thread.wait()
+
+    assert metrics.methods() == ["sleep", "test_task_metrics"]
+    wait_time = metrics.wait_time("sleep")
+    execution_time = metrics.execution_time("sleep")
+    assert wait_time is not None and execution_time is not None
+    # The expired task is only counted as waiting.
+    assert wait_time.count == 2 and execution_time.count == 1
+    assert wait_time.sum >= 0.04
+    assert execution_time.sum >= 0.01
+    assert metrics.outcomes("Axis1") == {"completed": 1, "errored": 1, "dropped": 1}
+    assert metrics.error_rate("Axis1") == 1 / 3
+    assert max(depth for _, depth in metrics.queue_depths("Axis1")) == 3
+
+    path = tmp_path / "metrics.prom"
+    metrics.export(str(path))
+    text = path.read_text()
+    assert 'k2basecamp_task_wait_seconds_count{method="sleep"} 2' in text
+    assert (
+        'k2basecamp_task_execution_seconds_bucket{method="sleep",le="+Inf"} 1' in text
+    )
+    assert 'k2basecamp_tasks_total{drive="Axis1",outcome="errored"} 1' in text
+    assert 'k2basecamp_queue_depth_max{queue="Axis1"} 3' in text
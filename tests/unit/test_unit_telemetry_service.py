@@ -0,0 +1,57 @@
+from typing import Any, Union
+
+import numpy as np
+import numpy.typing as npt
+from pytest_mock import MockerFixture
+from pytestqt.qtbot import QtBot
+
+from k2basecamp.services.bus_poller_thread import BusPollerThread
+from k2basecamp.services.telemetry_service import TelemetryService
+
+"""Subscribe to the registers of a drive from several places and confirm that the
+subscriptions share a single poller and that every subscriber only receives the
+registers it asked for.
+"""
+
+VELOCITY: dict[str, Union[int, str]] = {"name": "CL_VEL_FBK_VALUE", "axis": 1}
+CURRENT: dict[str, Union[int, str]] = {"name": "CL_CUR_Q_VALUE", "axis": 1}
+REGISTER_VALUES = {"CL_VEL_FBK_VALUE": 0.0, "CL_CUR_Q_VALUE": 1.0}
+
+
+def test_shared_poller(qtbot: QtBot, mocker: MockerFixture) -> None:
+    mc = mocker.MagicMock()
+    mc.servo_net = {"Axis1": "can0"}
+    mc.communication.get_register.side_effect = (
+        lambda register, *args, **kwargs: REGISTER_VALUES[register]
+    )
+    telemetry = TelemetryService(mc)
+    received: dict[str, list[npt.NDArray[np.float64]]] = {"a": [], "b": []}
+
+    def callback(name: str) -> Any:
+        return lambda timestamps, data: received[name].append(data)
+
+    subscription_a = telemetry.subscribe(
+        "Axis1", [VELOCITY], callback("a"), sampling_time=0.01, refresh_time=0.01
+    )
+    telemetry.subscribe(
+        "Axis1",
+        [CURRENT, VELOCITY],
+        callback("b"),
+        sampling_time=0.01,
+        refresh_time=0.01,
+    )
+    # Both subscriptions are merged into one poller.
+    assert telemetry.subscribed_registers("Axis1") == [VELOCITY, CURRENT]
+    qtbot.waitUntil(lambda: len(received["a"]) > 0 and len(received["b"]) > 0)
+    # Every subscriber gets its own registers, in the order it requested them.
+    assert received["a"][-1][:, -1].tolist() == [0.0]
+    assert received["b"][-1][:, -1].tolist() == [1.0, 0.0]
+
+    # The remaining registers are not reordered, so the drive is not polled again.
+    set_drive = mocker.spy(BusPollerThread, "set_drive")
+    telemetry.unsubscribe(subscription_a)
+    assert telemetry.subscribed_registers("Axis1") == [VELOCITY, CURRENT]
+    set_drive.assert_not_called()
+    telemetry.unsubscribe_drive("Axis1")
+    assert telemetry.subscribed_registers("Axis1") == []
+    telemetry.stop()
@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from k2basecamp.services.topology_cache import TopologyCache
+
+"""Store the IDs found scanning adapters in the TopologyCache and confirm that they
+are available in a new session.
+"""
+
+
+def test_topology(tmp_path: Path) -> None:
+    path = tmp_path / "cache" / "topology.json"
+    cache = TopologyCache(str(path))
+    assert cache.get("CANopen/KVASER/Baudrate_1M") == []
+    cache.put("CANopen/KVASER/Baudrate_1M", [31, 32])
+    cache.put("EtherCAT/eth0", [1, 2])
+    assert cache.get("CANopen/KVASER/Baudrate_1M") == [31, 32]
+
+    new_session_cache = TopologyCache(str(path))
+    assert new_session_cache.get("CANopen/KVASER/Baudrate_1M") == [31, 32]
+    assert new_session_cache.get("EtherCAT/eth0") == [1, 2]
+
+    path.write_text("not json")
+    assert TopologyCache(str(path)).get("EtherCAT/eth0") == []